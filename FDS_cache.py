@@ -0,0 +1,183 @@
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from FDS_classifier import HEAD_WINDOW, classify_sql_file, classify_sql_text, decode_sql_bytes
+
+CACHE_FILENAME = '.fds_cache.sqlite'
+MAX_ENTRIES = 50000
+
+
+class ClassificationCache:
+    """On-disk cache of framework verdicts and filter decisions, stored next to server.cfg.
+
+    An entry is reused as long as the file's size and mtime are unchanged. When the stat
+    info changes the file is re-hashed, and only a changed hash forces reclassification.
+    Verdicts depend on how much of each file was read, so a different head_window drops
+    every entry. A read_only cache (used by dry runs) must already exist; it is never
+    created, cleared or saved.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int = MAX_ENTRIES, rebuild: bool = False,
+                 head_window: int = HEAD_WINDOW, read_only: bool = False):
+        self.path = cache_dir / CACHE_FILENAME
+        self.max_entries = max_entries
+        self.head_window = head_window
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, dict] = {}
+        self._dirty = set()
+        self._seen = set()
+        self.read_only = read_only
+        if read_only:
+            self._db = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro', uri=True)
+        else:
+            self._db = sqlite3.connect(str(self.path))
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT, '
+                'framework TEXT, decisions TEXT, last_used REAL)'
+            )
+            self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        try:
+            stored = self._db.execute("SELECT value FROM meta WHERE key = 'head_window'").fetchone()
+        except sqlite3.OperationalError:
+            stored = None  # A read-only cache written before head_window was stored.
+        if rebuild or stored != (str(head_window),):
+            if read_only:
+                return
+            self._db.execute('DELETE FROM files')
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('head_window', ?)", (str(head_window),))
+        for path, size, mtime_ns, digest, framework, decisions, last_used in self._db.execute('SELECT * FROM files'):
+            self._entries[path] = dict(
+                size=size, mtime_ns=mtime_ns, digest=digest, framework=framework,
+                decisions=json.loads(decisions or '{}'), last_used=last_used,
+            )
+
+    def _touch(self, key: str, entry: dict):
+        entry['last_used'] = time.time()
+        self._dirty.add(key)
+
+    def _refresh(self, key: str) -> Optional[Tuple[str, Optional[bytes], os.stat_result]]:
+        """Revalidate key against the file; None if its entry still holds, else (digest, data, stat) of the miss."""
+        entry = self._entries.get(key)
+        st = os.stat(key)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            self.hits += 1
+            self._touch(key, entry)
+            return None
+        data = None
+        if st.st_size <= self.head_window:
+            data = Path(key).read_bytes()
+            digest = hashlib.sha1(data).hexdigest()
+        else:
+            # Hash large dumps straight from the page cache instead of reading them into memory.
+            with open(key, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                digest = hashlib.sha1(buf).hexdigest()
+        if entry and entry['digest'] == digest:
+            self.hits += 1
+            entry['size'] = st.st_size
+            entry['mtime_ns'] = st.st_mtime_ns
+            self._touch(key, entry)
+            return None
+        return digest, data, st
+
+    def _store(self, key: str, digest: str, st: os.stat_result, framework: Optional[str]) -> dict:
+        self.misses += 1
+        entry = dict(digest=digest, framework=framework, decisions={}, size=st.st_size, mtime_ns=st.st_mtime_ns)
+        self._entries[key] = entry
+        self._touch(key, entry)
+        return entry
+
+    def _entry(self, sql_path: Path) -> dict:
+        key = os.path.abspath(sql_path)
+        entry = self._entries.get(key)
+        if key in self._seen and entry is not None:
+            return entry
+        self._seen.add(key)
+        miss = self._refresh(key)
+        if miss is None:
+            return self._entries[key]
+        digest, data, st = miss
+        if data is not None:
+            framework = classify_sql_text(sql_path.name.lower(), decode_sql_bytes(data))
+        else:
+            framework = classify_sql_file(sql_path, self.head_window)
+        return self._store(key, digest, st, framework)
+
+    def prefetch(self, sql_paths: Iterable[Path], classify_many: Callable[[List[Path]], List[Optional[str]]]):
+        """Revalidate entries for sql_paths up front and classify every miss with one classify_many call."""
+        misses = []
+        for sql_path in sql_paths:
+            key = os.path.abspath(sql_path)
+            if key in self._seen:
+                continue
+            try:
+                miss = self._refresh(key)
+            except OSError:
+                continue
+            self._seen.add(key)
+            if miss is not None:
+                digest, _, st = miss
+                misses.append((sql_path, key, digest, st))
+        verdicts = classify_many([sql_path for sql_path, _, _, _ in misses])
+        for (_, key, digest, st), framework in zip(misses, verdicts):
+            self._store(key, digest, st, framework)
+
+    def framework_for(self, sql_path: Path) -> Optional[str]:
+        try:
+            return self._entry(sql_path)['framework']
+        except OSError:
+            return None
+
+    def decision_for(self, sql_path: Path, framework: str) -> Optional[bool]:
+        try:
+            return self._entry(sql_path)['decisions'].get(framework)
+        except OSError:
+            return None
+
+    def forget(self, sql_path: Path):
+        """Revalidate sql_path against the file again on its next lookup, e.g. after it was edited."""
+        self._seen.discard(os.path.abspath(sql_path))
+
+    def store_decision(self, sql_path: Path, framework: str, keep: bool):
+        entry = self._entries.get(os.path.abspath(sql_path))
+        if entry is not None:
+            entry['decisions'][framework] = keep
+
+    def close(self):
+        if self.read_only:
+            self._db.close()
+            return
+        # Evict entries for files that vanished, then trim the least recently used.
+        for key in [k for k in self._entries if k not in self._seen and not os.path.exists(k)]:
+            del self._entries[key]
+            self._db.execute('DELETE FROM files WHERE path = ?', (key,))
+        self._db.executemany(
+            'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [
+                (k, e['size'], e['mtime_ns'], e['digest'], e['framework'], json.dumps(e['decisions']), e['last_used'])
+                for k, e in ((k, self._entries[k]) for k in self._dirty if k in self._entries)
+            ],
+        )
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                'DELETE FROM files WHERE path IN (SELECT path FROM files ORDER BY last_used LIMIT ?)', (excess,)
+            )
+        self._db.commit()
+        self._db.close()
+
+
+def open_cache(cache_dir: Path, rebuild: bool = False, head_window: int = HEAD_WINDOW,
+               read_only: bool = False) -> Tuple[Optional[ClassificationCache], Optional[str]]:
+    """(cache, warning): the cache in cache_dir, or None and why it could not be opened (e.g. a read-only tree)."""
+    try:
+        return ClassificationCache(cache_dir, rebuild=rebuild, head_window=head_window, read_only=read_only), None
+    except (OSError, sqlite3.Error) as e:
+        return None, f"Classification cache disabled, could not open {cache_dir / CACHE_FILENAME}: {e}"
@@ -0,0 +1,267 @@
+import mmap
+import os
+import re
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Pattern, Set, Union
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+FRAMEWORKS = {
+    'qbcore': ['qbcore', 'qb'],
+    'qbx': ['qbx'],
+    'ox': ['ox', 'oxcore'],
+    'esx': ['esx'],
+    'other': []  # fallback: run all .sql files
+}
+ALL_KEYWORDS = [kw for kws in FRAMEWORKS.values() for kw in kws]
+# Filename keywords of every framework except the key (and except the 'other' fallback).
+OTHER_KEYWORDS = {
+    framework: [kw for fw, kws in FRAMEWORKS.items() if fw not in (framework, 'other') for kw in kws]
+    for framework in FRAMEWORKS
+}
+
+FRAMEWORK_PATTERNS = {
+    'esx': [
+        r'\besx_', r'\busers\b', r'\bowned_vehicles\b', r'\baddon_account_data\b', r'\bdatastore_data\b', r'\bjobs\b', r'\bjob_grades\b',
+        r'INSERT INTO `users`', r'INSERT INTO `owned_vehicles`', r'INSERT INTO `addon_account_data`', r'INSERT INTO `datastore_data`',
+        r'CREATE TABLE IF NOT EXISTS `users`', r'CREATE TABLE IF NOT EXISTS `owned_vehicles`',
+        r'-- ESX', r'\besx_[a-z0-9_]+',
+        r'INSERT IGNORE [`\"]?items[`\"]?', r'CREATE TABLE IF NOT EXISTS [`\"]?items[`\"]?', r'ALTER TABLE [`\"]?items[`\"]?',
+        r'--.*esx', r'--.*item limit', r'--.*item weight', r'--.*es_extended',
+        r'\bdatastore_data\b', r'\baddon_inventory_items\b', r'\baddon_account_data\b',
+        r'\bowned_properties\b', r'\buser_licenses\b', r'\buser_vehicles\b',
+        r'\buser_inventory\b', r'\buser_accounts\b', r'\buser_.*',
+        r'\bproperty\b', r'\bphone_users_contacts\b',
+    ],
+    'qbcore': [
+        r'\bqbcore_', r'\bqb_', r'\bplayers\b', r'\bplayer_vehicles\b', r'INSERT INTO `players`', r'INSERT INTO `player_vehicles`',
+        r'CREATE TABLE IF NOT EXISTS `players`', r'CREATE TABLE IF NOT EXISTS `player_vehicles`',
+        r'JSON_', r'qbcore framework', r'-- QBCore',
+        r'\bmetadata\b', r'\binventory\b', r'\bplayer_outfits\b',
+        r'\bplayer_houses\b', r'\bplayer_motels\b', r'\bplayer_gangs\b',
+        r'\bplayer_contacts\b', r'\bplayer_.*',
+        r'\btrunkitems\b', r'\bgloveboxitems\b',
+    ],
+    'ox': [
+        r'\box_', r'\boxcore_', r'\box_inventory\b', r'\box_doorlock\b', r'INSERT INTO `ox_inventory`', r'INSERT INTO `ox_doorlock`',
+        r'CREATE TABLE IF NOT EXISTS `ox_inventory`', r'CREATE TABLE IF NOT EXISTS `ox_doorlock`',
+        r'-- OX', r'\box_[a-z0-9_]+',
+        r'\bowned_keys\b', r'\bowned_doors\b',
+        r'\bdoorlock\b', r'\binventory\b',
+    ],
+    'qbx': [
+        r'\bqbx_', r'\bqbx\b', r'-- QBX', r'QBX',
+        r'ox_inventory', r'ox_doorlock', r'qbcore', r'qb_',
+    ],
+}
+
+# Every match of a framework's patterns contains one of its literals (lower-cased), so a file
+# holding none of them can skip that framework's regex scan.
+FRAMEWORK_LITERALS = {
+    'esx': ('esx', 'es_extended', 'item', 'user', 'job', 'owned_vehicles', 'owned_properties', 'addon_',
+            'datastore_data', 'property'),
+    'qbcore': ('qbcore', 'qb_', 'player', 'json_', 'metadata', 'inventory', 'trunkitems', 'gloveboxitems'),
+    'ox': ('ox_', 'oxcore_', '-- ox', 'owned_keys', 'owned_doors', 'doorlock', 'inventory'),
+    'qbx': ('qbx', 'ox_inventory', 'ox_doorlock', 'qbcore', 'qb_'),
+}
+# The only non-ASCII characters IGNORECASE matches to ASCII ones.
+_ASCII_FOLD = {0x130: 'i', 0x131: 'i', 0x17f: 's', 0x212a: 'k'}
+
+# Strong ESX markers that are checked before the generic ESX patterns.
+ESX_MARKERS = [
+    r'only for esx|esx where|esx only|es_extended',
+    r'insert\s+(ignore\s+)?[`\"]?items[`\"]?',
+    r'create table if not exists [`\"]?items[`\"]?',
+]
+ESX_LIMIT_FILES = ('items_limit.sql', 'items_weight.sql')
+PREFIX_CHARS = 4096
+# Files larger than this are memory-mapped and classified from their first HEAD_WINDOW bytes.
+HEAD_WINDOW = 1 << 20
+CLASSIFY_CHUNK = 64
+_UTF8_WORD_BOUNDARY = r"(?:(?<=[\w\x80-\xf4])(?![\w\x80-\xf4])|(?<![\w\x80-\xf4])(?=[\w\x80-\xf4]))"
+
+
+def compile_framework_patterns(patterns: Dict[str, List[str]], as_bytes: bool = False) -> Dict[str, Pattern]:
+    """Fold every framework's pattern list into one case-insensitive alternation."""
+    compiled = {}
+    for fw, pats in patterns.items():
+        if fw == 'esx':
+            pats = ESX_MARKERS + pats
+        alternation = '|'.join(f'(?:{p})' for p in pats)
+        if as_bytes:
+            # Bytes \b only knows ASCII word characters; count UTF-8 multibyte sequences as word
+            # characters too, like str patterns do for accented letters.
+            alternation = alternation.replace(r'\b', _UTF8_WORD_BOUNDARY).encode()
+        compiled[fw] = re.compile(alternation, re.IGNORECASE)
+    return compiled
+
+
+@lru_cache(maxsize=None)
+def compiled_patterns(as_bytes: bool = False) -> Dict[str, Pattern]:
+    """FRAMEWORK_PATTERNS compiled on first use; compiling them at import time dominated startup."""
+    return compile_framework_patterns(FRAMEWORK_PATTERNS, as_bytes)
+
+
+_DATABASE_ITEMS = re.compile(rb'database\.items', re.IGNORECASE)
+_ESX_WORD = re.compile(rb'esx', re.IGNORECASE)
+
+
+def decode_sql_bytes(data: bytes) -> str:
+    """Decode file bytes exactly like open(encoding='utf-8', errors='ignore').read()."""
+    return data.decode('utf-8', errors='ignore').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def read_sql_text(sql_path: Path) -> Optional[str]:
+    try:
+        return decode_sql_bytes(sql_path.read_bytes())
+    except Exception:
+        return None
+
+
+def candidate_frameworks(content: str) -> Set[str]:
+    """Frameworks whose patterns might match content: those with one of their FRAMEWORK_LITERALS in it."""
+    folded = (content if content.isascii() else content.translate(_ASCII_FOLD)).lower()
+    return {fw for fw, literals in FRAMEWORK_LITERALS.items() if any(literal in folded for literal in literals)}
+
+
+def classify_sql_text(name: str, content: Optional[str], compiled: Dict[str, Pattern] = None) -> Optional[str]:
+    """Classify a .sql file from its lower-cased name and full text (None if unreadable).
+
+    Priority: esx, then qbx, then qbcore+ox, then the filename, then the first 4 KB.
+    With the built-in patterns, frameworks none of whose literals occur are never scanned.
+    """
+    if compiled is None:
+        compiled = compiled_patterns()
+        candidates = candidate_frameworks(content) if content is not None else set()
+    else:
+        candidates = set(compiled)
+
+    def matches(fw: str, text: str) -> bool:
+        return fw in candidates and compiled[fw].search(text) is not None
+
+    if content is not None:
+        if matches('esx', content):
+            return 'esx'
+        lowered = content.lower()
+        if name in ESX_LIMIT_FILES and 'esx' in lowered:
+            return 'esx'
+        if 'database.items' in lowered:
+            return 'esx'
+    if 'qbx' in name:
+        return 'qbx'
+    if content is not None:
+        if matches('qbx', content):
+            return 'qbx'
+        if matches('qbcore', content) and matches('ox', content):
+            return 'qbx'
+    for fw, keywords in FRAMEWORKS.items():
+        if fw in ('other', 'qbx'):
+            continue
+        if any(kw in name for kw in keywords):
+            return fw
+    if content is not None:
+        prefix = content[:PREFIX_CHARS]
+        for fw in FRAMEWORK_PATTERNS:
+            if fw == 'qbx':
+                continue
+            if matches(fw, prefix):
+                return fw
+    return None
+
+
+def classify_sql_buffer(name: str, buf: Union[bytes, mmap.mmap], end: Optional[int] = None) -> Optional[str]:
+    """classify_sql_text() on raw bytes (or an mmap), looking only at buf[:end].
+
+    The byte patterns run directly on the buffer, so an mmap is never copied into memory.
+    """
+    compiled = compiled_patterns(as_bytes=True)
+    end = len(buf) if end is None else min(end, len(buf))
+    if compiled['esx'].search(buf, 0, end):
+        return 'esx'
+    if name in ESX_LIMIT_FILES and _ESX_WORD.search(buf, 0, end):
+        return 'esx'
+    if _DATABASE_ITEMS.search(buf, 0, end):
+        return 'esx'
+    if 'qbx' in name:
+        return 'qbx'
+    if compiled['qbx'].search(buf, 0, end):
+        return 'qbx'
+    if compiled['qbcore'].search(buf, 0, end) and compiled['ox'].search(buf, 0, end):
+        return 'qbx'
+    for fw, keywords in FRAMEWORKS.items():
+        if fw in ('other', 'qbx'):
+            continue
+        if any(kw in name for kw in keywords):
+            return fw
+    prefix_end = min(end, PREFIX_CHARS)
+    for fw in FRAMEWORK_PATTERNS:
+        if fw == 'qbx':
+            continue
+        if compiled[fw].search(buf, 0, prefix_end):
+            return fw
+    return None
+
+
+def _head_is_decisive(buf: mmap.mmap, verdict: Optional[str], head_window: int) -> bool:
+    """The head alone settles the verdict when it is ESX (nothing outranks it) or backed by the head's own content."""
+    if verdict is None:
+        return False
+    if verdict == 'esx':
+        return True
+    hits = {fw for fw, pattern in compiled_patterns(as_bytes=True).items() if pattern.search(buf, 0, head_window)}
+    return verdict in hits or (verdict == 'qbx' and {'qbcore', 'ox'} <= hits)
+
+
+def classify_sql_file(sql_path: Path, head_window: int = HEAD_WINDOW) -> Optional[str]:
+    """Classify a .sql file without loading large ones into memory.
+
+    Files up to head_window bytes are read and classified exactly like before. Larger
+    files are memory-mapped and classified from their first head_window bytes; the whole
+    mapping is only scanned when the head is ambiguous (no verdict, or one the head's
+    content does not support).
+    """
+    name = sql_path.name.lower()
+    try:
+        with sql_path.open('rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size <= head_window:
+                return classify_sql_text(name, decode_sql_bytes(f.read()))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                verdict = classify_sql_buffer(name, buf, head_window)
+                if _head_is_decisive(buf, verdict, head_window):
+                    return verdict
+                if hasattr(buf, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    buf.madvise(mmap.MADV_SEQUENTIAL)
+                return classify_sql_buffer(name, buf)
+    except (OSError, ValueError):
+        return classify_sql_text(name, None)
+
+
+def detect_framework_for_file(sql_path: Path, head_window: int = HEAD_WINDOW) -> Optional[str]:
+    return classify_sql_file(sql_path, head_window)
+
+
+def classification_pool(workers: int) -> 'ProcessPoolExecutor':
+    """Process pool for classify_files(); uses forkserver where available so the pool is never forked
+    from a process that is already running scan or pipeline threads."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    context = multiprocessing.get_context('forkserver') if 'forkserver' in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def classify_files(sql_paths: List[Path], workers: int = 1, chunksize: int = CLASSIFY_CHUNK,
+                   head_window: int = HEAD_WINDOW, pool: Optional['ProcessPoolExecutor'] = None) -> List[Optional[str]]:
+    """Verdicts for sql_paths in the same order; workers > 1 spreads chunks over a process pool.
+
+    Pass pool to reuse one across calls; otherwise a pool is started and shut down here.
+    """
+    classify = partial(detect_framework_for_file, head_window=head_window)
+    if workers <= 1 or len(sql_paths) <= chunksize:
+        return [classify(p) for p in sql_paths]
+    if pool is not None:
+        return list(pool.map(classify, sql_paths, chunksize=chunksize))
+    with classification_pool(workers) as pool:
+        return list(pool.map(classify, sql_paths, chunksize=chunksize))
@@ -1,263 +1,28 @@
+import argparse
+import json
 import sys
-import subprocess
-import importlib.util
-import os
-import re
+import time
+from contextlib import redirect_stdout
 from pathlib import Path
-from typing import List, Optional
-from dotenv import load_dotenv
-import mysql.connector
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from FDS_cache import CACHE_FILENAME
+from FDS_classifier import CLASSIFY_CHUNK, FRAMEWORKS, HEAD_WINDOW
+from FDS_deps import REQUIRED, check_dependencies
+from FDS_history import HISTORY_FILENAME
+from FDS_ledger import LEDGER_TABLE
+from FDS_rules import RULES_FILENAME
+from FDS_scan import DEFAULT_EXCLUDES
+from FDS_session import GROUP_FILES
+from FDS_sql import BATCH_BYTES, BATCH_STATEMENTS, BULK_ROWS, FILE_DONE, PREPARED_ROWS, RETRIES
+from FDS_watch import DEBOUNCE, WATCH_MODES
 
-REQUIRED = [
-    ('mysql', 'mysql-connector-python'),
-    ('dotenv', 'python-dotenv'),
-]
-for module, package in REQUIRED:
-    if importlib.util.find_spec(module) is None:
-        print(f"[Auto-Installer] Installing missing package: {package}")
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
+# The engine (and the executor, report and connector modules behind it) is imported where it
+# is used, after the arguments are parsed, so --help and argument errors stay fast.
+if TYPE_CHECKING:
+    from FDS_engine import EngineOptions, Preview, RunResult
+    from FDS_report import RunReport
 
-FRAMEWORKS = {
-    'qbcore': ['qbcore', 'qb'],
-    'qbx': ['qbx'],
-    'ox': ['ox', 'oxcore'],
-    'esx': ['esx'],
-    'other': []
-}
-
-FRAMEWORK_PATTERNS = {
-    'esx': [
-        r'\besx_', r'\busers\b', r'\bowned_vehicles\b', r'\baddon_account_data\b', r'\bdatastore_data\b', r'\bjobs\b', r'\bjob_grades\b',
-        r'INSERT INTO `users`', r'INSERT INTO `owned_vehicles`', r'INSERT INTO `addon_account_data`', r'INSERT INTO `datastore_data`',
-        r'CREATE TABLE IF NOT EXISTS `users`', r'CREATE TABLE IF NOT EXISTS `owned_vehicles`',
-        r'-- ESX', r'\besx_[a-z0-9_]+',
-        r'INSERT IGNORE [`\"]?items[`\"]?', r'CREATE TABLE IF NOT EXISTS [`\"]?items[`\"]?', r'ALTER TABLE [`\"]?items[`\"]?',
-        r'--.*esx', r'--.*item limit', r'--.*item weight', r'--.*es_extended',
-        r'\bdatastore_data\b', r'\baddon_inventory_items\b', r'\baddon_account_data\b',
-        r'\bowned_properties\b', r'\buser_licenses\b', r'\buser_vehicles\b',
-        r'\buser_inventory\b', r'\buser_accounts\b', r'\buser_.*',
-        r'\bproperty\b', r'\bphone_users_contacts\b',
-    ],
-    'qbcore': [
-        r'\bqbcore_', r'\bqb_', r'\bplayers\b', r'\bplayer_vehicles\b', r'INSERT INTO `players`', r'INSERT INTO `player_vehicles`',
-        r'CREATE TABLE IF NOT EXISTS `players`', r'CREATE TABLE IF NOT EXISTS `player_vehicles`',
-        r'JSON_', r'qbcore framework', r'-- QBCore',
-        r'\bmetadata\b', r'\binventory\b', r'\bplayer_outfits\b',
-        r'\bplayer_houses\b', r'\bplayer_motels\b', r'\bplayer_gangs\b',
-        r'\bplayer_contacts\b', r'\bplayer_.*',
-        r'\btrunkitems\b', r'\bgloveboxitems\b',
-    ],
-    'ox': [
-        r'\box_', r'\boxcore_', r'\box_inventory\b', r'\box_doorlock\b', r'INSERT INTO `ox_inventory`', r'INSERT INTO `ox_doorlock`',
-        r'CREATE TABLE IF NOT EXISTS `ox_inventory`', r'CREATE TABLE IF NOT EXISTS `ox_doorlock`',
-        r'-- OX', r'\box_[a-z0-9_]+',
-        r'\bowned_keys\b', r'\bowned_doors\b',
-        r'\bdoorlock\b', r'\binventory\b',
-    ],
-    'qbx': [
-        r'\bqbx_', r'\bqbx\b', r'-- QBX', r'QBX',
-        r'ox_inventory', r'ox_doorlock', r'qbcore', r'qb_',
-    ],
-}
-
-BLACKLISTED_FILES = [
-    os.path.normpath('ox_doorlock/sql/default.sql'),
-    os.path.normpath('ox_doorlock/sql/community_mrpd.sql'),
-]
-WHITELISTED_FILES = [
-    os.path.normpath('ox_doorlock/sql/ox_doorlock.sql'),
-]
-
-def extract_mysql_url_from_cfg(cfg_path: Path) -> Optional[str]:
-    with cfg_path.open(encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            match = re.search(r'set\s+mysql_connection_string\s+(["\'])(.+?)\1', line)
-            if match:
-                url = match.group(2).strip()
-                return url
-            match2 = re.search(r'set\s+mysql_connection_string\s+([^\s#]+)', line)
-            if match2:
-                url = match2.group(1).strip()
-                return url
-    return None
-
-def parse_mysql_url(url: str):
-    from urllib.parse import urlparse, parse_qs
-    parsed = urlparse(url)
-    if parsed.scheme == 'mysql':
-        user = parsed.username or 'root'
-        password = parsed.password or ''
-        host = parsed.hostname or 'localhost'
-        port = parsed.port or 3306
-        database = parsed.path.lstrip('/')
-        params = parse_qs(parsed.query)
-        charset = params.get('charset', ['utf8mb4'])[0]
-        return dict(user=user, password=password, host=host, port=port, database=database, charset=charset)
-    if ';' in url and '=' in url:
-        parts = [p.strip() for p in url.split(';') if p.strip()]
-        kv = dict()
-        for part in parts:
-            if '=' in part:
-                k, v = part.split('=', 1)
-                kv[k.strip().lower()] = v.strip()
-        user = kv.get('user', 'root')
-        password = kv.get('password', '')
-        host = kv.get('host', 'localhost')
-        port = int(kv.get('port', 3306))
-        database = kv.get('database', '')
-        charset = kv.get('charset', 'utf8mb4')
-        if not database:
-            raise ValueError(f"Database name missing in connection string: {url}")
-        return dict(user=user, password=password, host=host, port=port, database=database, charset=charset)
-    raise ValueError(f"Unsupported DB connection string format. Must be mysql://... or user=...;host=...;port=...;database=...; (got: {url})")
-
-def find_files(pattern: str, base: Path) -> List[Path]:
-    return list(base.rglob(pattern))
-
-def find_server_cfg_files_upward(start_dir: Path, max_levels: int = 10) -> list:
-    """Search upward from start_dir for server.cfg, up to max_levels directories above."""
-    current = start_dir.resolve()
-    checked = set()
-    for _ in range(max_levels + 1):
-        if current in checked:
-            break
-        checked.add(current)
-        found = list(current.rglob('server.cfg'))
-        if found:
-            return found
-        if current.parent == current:
-            break
-        print(f"[INFO] No server.cfg found in {current}. Going up to {current.parent}...")
-        current = current.parent
-    return []
-
-def get_db_url_and_cfg_dir(root: Path) -> (Optional[str], Optional[Path]):
-    load_dotenv()
-    env_url = os.getenv('DATABASE_URL')
-    if env_url:
-        return env_url, None
-    cfg_files = find_server_cfg_files_upward(root)
-    for cfg in cfg_files:
-        url = extract_mysql_url_from_cfg(cfg)
-        if url:
-            return url, cfg.parent
-    return None, None
-
-def detect_framework_for_file(sql_path: Path) -> Optional[str]:
-    name = sql_path.name.lower()
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            if re.search(r'only for esx|esx where|esx only|es_extended', content, re.IGNORECASE):
-                return 'esx'
-            if re.search(r'insert\s+(ignore\s+)?[`\"]?items[`\"]?', content, re.IGNORECASE):
-                return 'esx'
-            if re.search(r'create table if not exists [`\"]?items[`\"]?', content, re.IGNORECASE):
-                return 'esx'
-            if (name in ['items_limit.sql', 'items_weight.sql']) and ('esx' in content.lower()):
-                return 'esx'
-            for pat in FRAMEWORK_PATTERNS['esx']:
-                if re.search(pat, content, re.IGNORECASE):
-                    return 'esx'
-            for line in content.splitlines():
-                if 'database.items' in line.lower():
-                    return 'esx'
-    except Exception:
-        pass
-    if 'qbx' in name:
-        return 'qbx'
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            for pat in FRAMEWORK_PATTERNS['qbx']:
-                if re.search(pat, content, re.IGNORECASE):
-                    return 'qbx'
-    except Exception:
-        pass
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            qbcore_match = any(re.search(pat, content, re.IGNORECASE) for pat in FRAMEWORK_PATTERNS['qbcore'])
-            ox_match = any(re.search(pat, content, re.IGNORECASE) for pat in FRAMEWORK_PATTERNS['ox'])
-            if qbcore_match and ox_match:
-                return 'qbx'
-    except Exception:
-        pass
-    for fw, keywords in FRAMEWORKS.items():
-        if fw in ('other', 'qbx'):
-            continue
-        if any(kw in name for kw in keywords):
-            return fw
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read(4096)
-            for fw, patterns in FRAMEWORK_PATTERNS.items():
-                if fw == 'qbx':
-                    continue
-                for pat in patterns:
-                    if re.search(pat, content, re.IGNORECASE):
-                        return fw
-    except Exception:
-        pass
-    return None
-
-def filter_sql_files(sql_files: List[Path], framework: str) -> List[Path]:
-    if framework == 'other':
-        filtered = sql_files
-    else:
-        my_keywords = FRAMEWORKS[framework]
-        other_keywords = [kw for fw, kws in FRAMEWORKS.items() if fw != framework and fw != 'other' for kw in kws]
-        filtered = []
-        for f in sql_files:
-            name = f.name.lower()
-            rel_path = os.path.normpath(str(f.relative_to(f.parents[len(f.parts)-2]))) if len(f.parts) > 1 else f.name
-            detected_fw = detect_framework_for_file(f)
-            if detected_fw == 'esx' and framework != 'esx':
-                continue
-            if detected_fw is None:
-                try:
-                    with f.open(encoding='utf-8', errors='ignore') as file_check:
-                        for line in file_check:
-                            if 'database.items' in line.lower() and framework != 'esx':
-                                continue
-                except Exception:
-                    pass
-            if detected_fw and detected_fw != framework:
-                continue
-            if any(kw in name for kw in other_keywords):
-                continue
-            if (
-                any(kw in name for kw in my_keywords)
-                or not any(kw in name for kw in sum(FRAMEWORKS.values(), []))
-                or detected_fw == framework
-                or detected_fw is None
-            ):
-                filtered.append(f)
-    filtered = [f for f in filtered if os.path.normpath(str(f.as_posix().lower())).replace('\\','/') not in [b.lower().replace('\\','/') for b in BLACKLISTED_FILES]]
-    whitelist_paths = [os.path.normpath(w.lower().replace('\\','/')) for w in WHITELISTED_FILES]
-    filtered_paths = set(os.path.normpath(str(f.as_posix().lower())).replace('\\','/') for f in filtered)
-    for f in sql_files:
-        rel_path = os.path.normpath(str(f.as_posix().lower())).replace('\\','/')
-        if rel_path in whitelist_paths and rel_path not in filtered_paths:
-            filtered.append(f)
-    return filtered
-
-def run_sql_file(sql_path: Path, conn) -> Optional[str]:
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            sql = f.read()
-        cursor = conn.cursor()
-        for statement in filter(None, map(str.strip, sql.split(';'))):
-            if statement:
-                cursor.execute(statement)
-        conn.commit()
-        cursor.close()
-        return None
-    except Exception as e:
-        return str(e)
-
-def main():
-    print(r'''
+BANNER = r'''
  /$$      /$$            /$$$$$$                                         
 | $$$    /$$$           /$$__  $$                                        
 | $$$$  /$$$$  /$$$$$$ | $$  \__/  /$$$$$$   /$$$$$$   /$$$$$$  /$$$$$$$ 
@@ -269,9 +34,75 @@ def main():
                                                                          
                                                                          
                                                                          
-''')
-    print("Made by Mr. Green\n")
-    print("=== Fivem Database Setup ===\n")
+'''
+
+def write_report(report: 'RunReport', args):
+    try:
+        if args.report:
+            report.write()
+            print(f"[INFO] Run report written to {args.report}")
+        if args.prometheus_textfile:
+            report.write_prometheus(args.prometheus_textfile)
+    except OSError as e:
+        print(f"[WARN] Could not write run report: {e}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fivem Database Setup")
+    parser.add_argument('--check-deps', action='store_true', help="Install any missing required packages with pip and exit")
+    parser.add_argument('--framework', choices=list(FRAMEWORKS), help="Framework to set up (prompted for when omitted)")
+    parser.add_argument('--root', metavar='PATH', help="Directory to search for server.cfg (prompted for when omitted)")
+    parser.add_argument('--dsn', metavar='DSN', help="Connection string to use instead of DATABASE_URL/.env or server.cfg; ROOT is then scanned as given")
+    parser.add_argument('--servers', metavar='FILE', help="Provision every server listed in FILE ('-' for stdin): one server root or DSN per line, DSNs use the --root tree")
+    parser.add_argument('--parallel-servers', type=int, metavar='N', help="Servers from --servers provisioned at the same time")
+    parser.add_argument('--json', action='store_true', help="Print the result as JSON on stdout (progress goes to stderr) and never prompt")
+    parser.add_argument('--no-cache', action='store_true', help=f"Classify every .sql file from scratch without reading or writing {CACHE_FILENAME}")
+    parser.add_argument('--rebuild-cache', action='store_true', help=f"Discard {CACHE_FILENAME} and rebuild it during this run")
+    parser.add_argument('--exclude', action='append', default=[], metavar='NAME', help=f"Extra directory name or glob to skip while scanning (defaults: {', '.join(DEFAULT_EXCLUDES)})")
+    parser.add_argument('--rules', metavar='PATH', help=f"Blacklist/whitelist file with [blacklist] and [whitelist] sections (default: {RULES_FILENAME} in the server root)")
+    parser.add_argument('--head-window', type=int, default=HEAD_WINDOW, metavar='BYTES', help="Classify .sql files larger than this from their first BYTES only, scanning the rest only when the head is ambiguous")
+    parser.add_argument('--classify-workers', type=int, default=1, metavar='N', help="Classify .sql files in N worker processes (0 = one per CPU core)")
+    parser.add_argument('--classify-chunksize', type=int, default=CLASSIFY_CHUNK, metavar='N', help="Files handed to a classification worker at a time")
+    parser.add_argument('--max-depth', type=int, default=None, help="Do not descend more than this many directories below the scan root")
+    parser.add_argument('--batch-statements', type=int, default=BATCH_STATEMENTS, help="Statements packed into one round trip (1 disables batching)")
+    parser.add_argument('--batch-bytes', type=int, default=BATCH_BYTES, help="Maximum SQL bytes packed into one round trip")
+    parser.add_argument('--no-insert-rewrite', action='store_true', help="Send INSERTs exactly as written instead of merging single-row INSERTs and splitting ones that exceed max_allowed_packet")
+    parser.add_argument('--prepared', action='store_true', help="Send repeated literal INSERT shapes as server-side prepared statements with bound values")
+    parser.add_argument('--prepared-rows', type=int, default=PREPARED_ROWS, help="Rows bound per prepared INSERT execution")
+    parser.add_argument('--bulk-load', action='store_true', help="Load long runs of literal INSERTs into one table with LOAD DATA LOCAL INFILE (falls back to INSERTs if the server refuses)")
+    parser.add_argument('--bulk-rows', type=int, default=BULK_ROWS, help="Minimum rows in a run of INSERTs before it is bulk-loaded")
+    parser.add_argument('--commit-every', type=int, default=0, metavar='N', help="Also commit inside a file after every N statements (0: only at the end of the file)")
+    parser.add_argument('--commit-bytes', type=int, default=0, metavar='N', help="Also commit inside a file after every N bytes of SQL (0: only at the end of the file)")
+    parser.add_argument('--group-files', type=int, default=GROUP_FILES, metavar='N', help="Run up to N consecutive small files in one transaction (needs --jobs 1)")
+    parser.add_argument('--bulk-session', action='store_true', help="Disable foreign_key_checks, unique_checks and, where permitted, sql_log_bin for the run; previous values are restored afterwards")
+    parser.add_argument('--retries', type=int, default=RETRIES, metavar='N', help="Retry a file up to N times, reconnecting with exponential backoff, after a deadlock, lock wait timeout or lost connection (0 disables)")
+    parser.add_argument('--jobs', type=int, default=1, help="Run files that do not share tables in parallel on up to this many connections")
+    parser.add_argument('--force', action='store_true', help=f"Re-run every matching file, even ones {LEDGER_TABLE} records as already applied")
+    parser.add_argument('--no-schema-check', action='store_true', help="Send every statement, without first skipping DDL that information_schema shows is already applied")
+    parser.add_argument('--drift', action='store_true', help=f"Only report files whose checksum differs from {LEDGER_TABLE}; execute nothing")
+    parser.add_argument('--dry-run', action='store_true', help="Show the files that would run, in order, with their framework, rule decision, statement counts and estimated duration; nothing connects to the database")
+    parser.add_argument('--plan-json', metavar='PATH', help="With --dry-run, also write the plan to PATH as JSON")
+    parser.add_argument('--no-history', action='store_true', help=f"Do not record file timings in {HISTORY_FILENAME}, and estimate --dry-run durations from the built-in model only")
+    parser.add_argument('--watch', action='store_true', help="After the run, keep watching the server for created or modified .sql files and apply just those, on a connection kept open (Ctrl+C stops)")
+    parser.add_argument('--watch-mode', choices=WATCH_MODES, default='auto', help="How --watch notices changes: inotify (Linux), stat polling, or auto (inotify where available)")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE, metavar='SECONDS', help="With --watch, wait until no file changed for this long before applying a burst of edits")
+    parser.add_argument('--report', metavar='PATH', help="Write connect, per-file and per-statement timings to PATH as JSON (NDJSON with every statement if PATH ends in .ndjson or .jsonl)")
+    parser.add_argument('--prometheus-textfile', metavar='PATH', help="Write run metrics to PATH for the node-exporter textfile collector")
+    return parser.parse_args(argv)
+
+def engine_options(args) -> 'EngineOptions':
+    from FDS_engine import EngineOptions
+    return EngineOptions(
+        excludes=args.exclude, max_depth=args.max_depth, rules_file=Path(args.rules) if args.rules else None,
+        use_cache=not args.no_cache, rebuild_cache=args.rebuild_cache, head_window=args.head_window,
+        classify_workers=args.classify_workers, classify_chunksize=args.classify_chunksize, force=args.force,
+        jobs=args.jobs, batch_statements=args.batch_statements, batch_bytes=args.batch_bytes,
+        rewrite=not args.no_insert_rewrite, schema_check=not args.no_schema_check,
+        prepared=args.prepared, prepared_rows=args.prepared_rows, bulk_load=args.bulk_load, bulk_rows=args.bulk_rows,
+        commit_statements=args.commit_every, commit_bytes=args.commit_bytes, group_files=args.group_files,
+        bulk_session=args.bulk_session, retries=args.retries, history=not args.no_history,
+    )
+
+def prompt_framework() -> str:
     print("Select your FiveM framework:")
     fw_options = list(FRAMEWORKS.keys())
     for i, fw in enumerate(fw_options, 1):
@@ -280,11 +111,12 @@ def main():
         try:
             fw_choice = int(input("Enter the number for your framework: ").strip())
             if 1 <= fw_choice <= len(fw_options):
-                framework = fw_options[fw_choice-1]
-                break
+                return fw_options[fw_choice-1]
         except Exception:
             pass
         print("Invalid choice. Please enter a valid number.")
+
+def prompt_root() -> Path:
     root = None
     while not root:
         root_input = input("Enter the root directory to scan for server.cfg (or leave blank for current directory): ").strip()
@@ -292,59 +124,283 @@ def main():
         if not root.exists() or not root.is_dir():
             print("Invalid directory. Please try again.")
             root = None
-    db_url, cfg_dir = get_db_url_and_cfg_dir(root)
-    if not db_url:
-        print("[ERROR] Could not find a MySQL connection string in .env or any server.cfg.")
-        sys.exit(1)
-    try:
-        db_cfg = parse_mysql_url(db_url)
-    except Exception as e:
-        print(f"[ERROR] Error parsing DB URL: {e}")
-        sys.exit(1)
-    # Use the directory where server.cfg was found (or user root if .env was used)
-    scan_root = cfg_dir if cfg_dir else root
-    print(f"\n[INFO] Using framework: {framework.capitalize()} | Scanning for .sql files in: {scan_root.resolve()}")
-    sql_files = find_files('*.sql', scan_root)
-    sql_files = filter_sql_files(sql_files, framework)
-    if not sql_files:
+    return root
+
+def read_targets(args) -> List[Tuple[Path, Optional[str]]]:
+    """(root, dsn) pairs from --servers; DSN lines are paired with --root."""
+    from FDS_engine import is_dsn
+    if args.servers == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        lines = Path(args.servers).read_text(encoding='utf-8').splitlines()
+    targets = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if is_dsn(line):
+            if not args.root:
+                raise ValueError("--servers lists DSNs, so --root must name the resource tree to run against them")
+            targets.append((Path(args.root), line))
+        else:
+            targets.append((Path(line), args.dsn))
+    return targets
+
+def print_cache_stats(server_plan):
+    if server_plan.cache is not None:
+        print(f"[INFO] Classification cache: {server_plan.cache.hits} hit(s), {server_plan.cache.misses} miss(es).")
+
+def print_drift(result: 'RunResult') -> int:
+    from FDS_engine import EXIT_DRIFT, EXIT_OK
+    server_plan = result.plan
+    print_cache_stats(server_plan)
+    if not server_plan.found:
         print("[INFO] No relevant .sql files found for the selected framework.")
-        sys.exit(0)
-    print(f"[INFO] Found {len(sql_files)} .sql files to execute.")
+        return EXIT_OK
+    print("\n=== Checksum Drift Report ===")
+    for _, rel, _, _ in server_plan.to_run:
+        print(f"- {rel}: {'modified since last apply' if server_plan.status[rel] == 'modified' else 'never applied'}")
+    if server_plan.to_run:
+        print(f"\n[INFO] {len(server_plan.to_run)} file(s) differ from {LEDGER_TABLE}.")
+        return EXIT_DRIFT
+    print(f"\n[INFO] All {server_plan.found} file(s) match {LEDGER_TABLE}.")
+    return EXIT_OK
+
+def format_seconds(seconds: float) -> str:
+    if seconds < 10:
+        return f"{seconds:.1f}s"
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s" if minutes else f"{seconds}s"
+
+def print_preview(result: 'Preview'):
+    print(f"\n=== Execution Plan: {result.server or result.root} (dry run, nothing was executed) ===")
+    for f in result.files:
+        note = f", {f['decision']}" if f['decision'] != 'kept' else ''
+        print(f"{f['order']:>4}. {f['path']} [{f['framework'] or 'generic'}{note}]: {f['statements']} statement(s), "
+              f"{f['bytes']} bytes, ~{format_seconds(f['estimate_seconds'])} ({f['estimate_source']})")
+    if result.excluded:
+        print(f"\n{len(result.excluded)} file(s) left out:")
+        for f in result.excluded:
+            print(f"- {f['path']}: {f['decision']} (detected {f['framework'] or 'generic'})")
+    for warning in result.warnings:
+        print(f"[WARN] {warning}")
+    recorded = sum(1 for f in result.files if f['recorded'])
+    print(f"\n[INFO] {len(result.files)} file(s) would run, estimated {format_seconds(result.estimate_seconds)}"
+          + (f", about {format_seconds(result.wall_seconds)} on {result.jobs} connections." if result.jobs > 1 else "."))
+    if recorded:
+        print(f"[INFO] {recorded} of them already ran unchanged from this tree and are likely skipped by {LEDGER_TABLE}; "
+              f"the rest take about {format_seconds(result.to_dict()['unrecorded_estimate_seconds'])}.")
+
+def run_preview(args, framework: str, targets: List[Tuple[Path, Optional[str]]]) -> Tuple[int, object]:
+    """--dry-run for one or more (root, dsn) targets; returns the exit code and the JSON plan(s)."""
+    from FDS_engine import EXIT_ERROR, EXIT_OK, EngineError, RunResult, preview
+    exit_code = EXIT_OK
+    plans = []
+    for root, dsn in targets:
+        try:
+            result = preview(root, framework, dsn, engine_options(args))
+        except EngineError as e:
+            print(f"[ERROR] {root}: {e}")
+            exit_code = EXIT_ERROR
+            plans.append(RunResult(str(root), error=str(e)).to_dict())
+            continue
+        print_preview(result)
+        plans.append(result.to_dict())
+    summary = plans[0] if len(plans) == 1 and not args.servers else plans
+    if args.plan_json:
+        try:
+            Path(args.plan_json).write_text(json.dumps(summary, indent=2), encoding='utf-8')
+            print(f"[INFO] Plan written to {args.plan_json}")
+        except OSError as e:
+            print(f"[ERROR] Could not write {args.plan_json}: {e}")
+            exit_code = EXIT_ERROR
+    return exit_code, summary
+
+def run_server(args, framework: str, root: Path) -> Tuple[int, dict]:
+    """Plan and run (or drift-check) one server, printing progress; returns the exit code and JSON summary."""
+    from FDS_engine import EXIT_ERROR, EngineError, RunResult, drift, execute, plan
+    from FDS_report import RunReport
     try:
-        conn = mysql.connector.connect(
-            user=db_cfg['user'],
-            password=db_cfg['password'],
-            host=db_cfg['host'],
-            port=db_cfg['port'],
-            database=db_cfg['database'],
-            charset=db_cfg['charset'],
-            autocommit=False
-        )
-    except Exception as e:
-        print(f"[ERROR] Database connection failed: {e}")
-        sys.exit(1)
-    results = []
-    for i, sql_path in enumerate(sql_files, 1):
-        print(f"[{i}/{len(sql_files)}] Executing: {sql_path.relative_to(scan_root)} ...", end=' ')
-        error = run_sql_file(sql_path, conn)
-        if error:
-            print(f"FAILED: {error}")
-            results.append((str(sql_path.relative_to(scan_root)), False, error))
+        server_plan = plan(root, framework, args.dsn, engine_options(args))
+    except EngineError as e:
+        print(f"[ERROR] {e}")
+        return EXIT_ERROR, RunResult(str(root), error=str(e)).to_dict()
+    print(f"\n[INFO] Using framework: {framework.capitalize()} | Scanning for .sql files in: {server_plan.root.resolve()}")
+    if args.drift:
+        result = drift(server_plan)
+        if result.error:
+            print(f"[ERROR] {result.error}")
+            return EXIT_ERROR, result.to_dict()
+        return print_drift(result), result.to_dict()
+    report = RunReport(framework, str(server_plan.root.resolve()), args.report) if args.report or args.prometheus_textfile else None
+    if args.jobs > 1:
+        print(f"[INFO] Running independent files in parallel on up to {args.jobs} connections.")
+    result = execute(server_plan, report, progress_printer(server_plan.root))
+    return print_run(args, result, report), result.to_dict()
+
+def progress_printer(root: Path):
+    def on_finished(done: int, queued: int, sql_path: Path, error: Optional[str], seconds: float, framework: Optional[str]):
+        status = f"FAILED: {error}" if error else "Success"
+        # The total grows while the tree is still being scanned.
+        print(f"[{done}/{queued}] {sql_path.relative_to(root)}: {status}")
+    return on_finished
+
+def print_run(args, result: 'RunResult', report: Optional['RunReport'] = None) -> int:
+    """Print the outcome of execute() for one server; returns the exit code."""
+    from FDS_engine import EXIT_ERROR, EXIT_OK
+    server_plan = result.plan
+    if result.error:
+        print(f"[ERROR] {result.error}")
+        return EXIT_ERROR
+    print_cache_stats(server_plan)
+    if not server_plan.found:
+        print("[INFO] No relevant .sql files found for the selected framework.")
+        return EXIT_OK
+    print(f"[INFO] Found {server_plan.found} .sql files to execute.")
+    if server_plan.unchanged:
+        print(f"[INFO] Skipping {len(server_plan.unchanged)} unchanged file(s) already recorded in {LEDGER_TABLE} (use --force to re-run them).")
+    for warning in result.warnings:
+        print(f"[WARN] {warning}")
+    if report:
+        write_report(report, args)
+    if not result.files:
+        print("[INFO] Nothing new or modified to execute.")
+        return EXIT_OK
+    for rel, resume_at in result.resumed:
+        if resume_at == FILE_DONE:
+            print(f"[INFO] {rel} was fully committed by an interrupted run; only recorded it in {LEDGER_TABLE}.")
         else:
-            print("Success")
-            results.append((str(sql_path.relative_to(scan_root)), True, None))
-    conn.close()
+            print(f"[INFO] Resumed {rel} at statement #{resume_at} from its last checkpoint.")
+    if result.statements_skipped:
+        print(f"[INFO] Schema pre-check skipped {result.statements_skipped} no-op statement(s), saving {result.round_trips_saved} round trip(s).")
+    if result.prepared:
+        prepared = result.prepared
+        print(f"[INFO] Prepared statements ({result.connector}): {prepared.prepares} prepared, {prepared.executions} execution(s) "
+              f"for {prepared.rows} row(s), ~{prepared.seconds_saved:.3f}s and {prepared.bytes_saved} byte(s) saved vs. text.")
+    if result.bulk:
+        bulk = result.bulk
+        print(f"[INFO] Bulk load: {bulk.rows} row(s) in {bulk.loads} LOAD DATA statement(s), {bulk.seconds:.3f}s.")
+        if bulk.fallbacks:
+            print(f"[WARN] Local infile was refused {bulk.fallbacks} time(s); those rows were sent as INSERTs. Enable local_infile on the server to bulk-load them.")
     print("\n=== SQL Execution Summary ===")
-    for file, ok, err in results:
-        status = "Success" if ok else f"FAILED: {err}"
+    for file, err, _ in result.files:
+        status = "Success" if err is None else f"FAILED: {err}"
         print(f"- {file}: {status}")
-    n_ok = sum(1 for _, ok, _ in results if ok)
-    n_fail = len(results) - n_ok
-    if n_fail:
-        print(f"\n[ERROR] {n_fail} file(s) failed.")
-        sys.exit(2)
+    if result.failed:
+        print(f"\n[ERROR] {result.failed} file(s) failed.")
     else:
         print(f"\n[INFO] All SQL files executed successfully!")
+    return result.exit_code
+
+def run_watch(args, framework: str, root: Path) -> int:
+    """Apply one server, then keep applying .sql files as they change until Ctrl+C."""
+    from FDS_engine import EXIT_ERROR, EXIT_OK, EngineError
+    from FDS_watch import WatchSession
+    try:
+        session = WatchSession(root, framework, args.dsn, engine_options(args), args.watch_mode, args.debounce)
+    except EngineError as e:
+        print(f"[ERROR] {e}")
+        return EXIT_ERROR
+    print(f"\n[INFO] Using framework: {framework.capitalize()} | Scanning for .sql files in: {session.root.resolve()}")
+    for warning in session.warnings:
+        print(f"[WARN] {warning}")
+    exit_code = EXIT_OK
+    try:
+        result = session.run_batch(on_finished=progress_printer(session.root))
+        exit_code = print_run(args, result)
+        print(f"\n[INFO] Watching {session.root.resolve()} for .sql changes ({session.watcher.name}). Press Ctrl+C to stop.")
+        while True:
+            changed = session.changes()
+            if not changed:
+                break
+            start = time.perf_counter()
+            result = session.run_batch(changed, progress_printer(session.root))
+            if result.error:
+                print(f"[ERROR] {result.error}")
+                continue
+            for warning in result.warnings:
+                print(f"[WARN] {warning}")
+            skipped = len(changed) - len(result.files)
+            note = f", {skipped} skipped (other framework, blacklisted or unchanged)" if skipped else ""
+            status = f"{result.failed} FAILED" if result.failed else "applied"
+            print(f"[WATCH] {len(changed)} changed file(s): {len(result.files)} {status}{note} in {time.perf_counter() - start:.2f}s")
+    except KeyboardInterrupt:
+        print("\n[INFO] Stopped watching.")
+    finally:
+        error = session.close()
+        if error:
+            print(f"[WARN] {error}")
+    return exit_code
+
+def run_servers(args, framework: str, targets: List[Tuple[Path, Optional[str]]]) -> Tuple[int, list]:
+    """Provision every target on a bounded pool; returns the worst exit code and one JSON summary per server."""
+    from FDS_engine import EXIT_DRIFT, EXIT_ERROR, EXIT_FAILED, EXIT_OK, FANOUT_WORKERS, provision
+    if args.report or args.prometheus_textfile:
+        print("[WARN] --report and --prometheus-textfile are only written for a single server.")
+    parallel = args.parallel_servers or FANOUT_WORKERS
+    print(f"[INFO] Provisioning {len(targets)} server(s) for {framework.capitalize()}, {parallel} at a time.")
+
+    def on_done(result: 'RunResult'):
+        if result.error:
+            print(f"[ERROR] {result.target}: {result.error}")
+        elif result.drift_only:
+            print(f"[INFO] {result.target}: {len(result.plan.to_run)} file(s) differ from {LEDGER_TABLE}")
+        else:
+            status = f"{result.failed} of {len(result.files)} file(s) FAILED" if result.failed else f"{len(result.files)} file(s) applied"
+            print(f"[{'ERROR' if result.failed else 'INFO'}] {result.target}: {status}, {len(result.plan.unchanged)} unchanged ({result.seconds:.1f}s)")
+
+    results = provision(targets, framework, engine_options(args), parallel, args.drift, on_done)
+    codes = {r.exit_code for r in results}
+    exit_code = next((code for code in (EXIT_ERROR, EXIT_FAILED, EXIT_DRIFT) if code in codes), EXIT_OK)
+    print(f"\n[INFO] {sum(1 for r in results if r.exit_code == EXIT_OK)} of {len(results)} server(s) finished cleanly.")
+    return exit_code, [r.to_dict() for r in results]
+
+def main():
+    args = parse_args()
+    if args.check_deps:
+        sys.exit(check_dependencies(REQUIRED))
+    from FDS_engine import EXIT_ERROR
+    if args.json and not args.framework:
+        print("[ERROR] --json needs --framework.", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if args.json and not (args.root or args.servers):
+        print("[ERROR] --json needs --root or --servers.", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    if args.watch and (args.servers or args.drift or args.dry_run or args.json):
+        print("[ERROR] --watch runs a single server and cannot be combined with --servers, --drift, --dry-run or --json.", file=sys.stderr)
+        sys.exit(EXIT_ERROR)
+    # With --json, everything but the final JSON document goes to stderr.
+    with redirect_stdout(sys.stderr if args.json else sys.stdout):
+        if not args.json:
+            print(BANNER)
+            print("Made by Mr. Green\n")
+            print("=== Fivem Database Setup ===\n")
+        framework = args.framework or prompt_framework()
+        if args.servers:
+            try:
+                targets = read_targets(args)
+            except (OSError, ValueError) as e:
+                print(f"[ERROR] Could not read --servers: {e}")
+                sys.exit(EXIT_ERROR)
+            if args.dry_run:
+                exit_code, summary = run_preview(args, framework, targets)
+            else:
+                exit_code, summary = run_servers(args, framework, targets)
+        else:
+            root = Path(args.root) if args.root else prompt_root()
+            if args.root and not root.is_dir():
+                print(f"[ERROR] Not a directory: {root}")
+                sys.exit(EXIT_ERROR)
+            if args.dry_run:
+                exit_code, summary = run_preview(args, framework, [(root, args.dsn)])
+            elif args.watch:
+                sys.exit(run_watch(args, framework, root))
+            else:
+                exit_code, summary = run_server(args, framework, root)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main() 
@@ -0,0 +1,47 @@
+import importlib
+import sys
+from typing import List, Tuple
+
+REQUIRED = [
+    ('mysql', 'mysql-connector-python'),
+    ('dotenv', 'python-dotenv'),
+]
+GUI_REQUIRED = REQUIRED + [
+    ('PySide6', 'PySide6'),
+]
+
+
+def missing_packages(required: List[Tuple[str, str]]) -> List[str]:
+    import importlib.util
+    return [package for module, package in required if importlib.util.find_spec(module) is None]
+
+
+def check_dependencies(required: List[Tuple[str, str]], install: bool = True) -> int:
+    """Report missing packages and pip-install them; returns a process exit code.
+
+    Only runs on --check-deps, so normal startup never pays for the probe.
+    """
+    import subprocess
+    missing = missing_packages(required)
+    if not missing:
+        print("[INFO] All required packages are installed.")
+        return 0
+    for package in missing:
+        if not install:
+            print(f"[ERROR] Missing package: {package}")
+            continue
+        print(f"[Auto-Installer] Installing missing package: {package}")
+        try:
+            subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"[ERROR] Could not install {package}: {e}")
+            return 1
+    return 0 if install else 1
+
+
+def require(module: str, package: str, entry_point: str = 'FDS_cli.py'):
+    """Import module on first use, with an install hint instead of a bare ImportError."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise RuntimeError(f"{package} is not installed; run {entry_point} --check-deps to install it") from e
@@ -0,0 +1,911 @@
+"""Headless FDS engine shared by FDS_cli.py and FDS_gui.py.
+
+    from FDS_engine import EngineOptions, plan, execute
+    result = execute(plan(Path('/srv/fivem/server1'), 'qbcore', options=EngineOptions(jobs=4)))
+    print(result.exit_code, result.to_dict())
+
+plan() starts connecting, scanning and classifying in the background and returns at
+once. execute() runs files as the plan yields them, so both overlap; call
+plan(...).resolve() instead to list every file without executing anything, or preview()
+to estimate a run without connecting to the database at all. provision() runs plan()
+and execute() for many servers on a bounded pool of worker threads.
+"""
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain, islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from FDS_cache import CACHE_FILENAME, ClassificationCache, open_cache
+from FDS_classifier import (
+    ALL_KEYWORDS, CLASSIFY_CHUNK, FRAMEWORKS, HEAD_WINDOW, OTHER_KEYWORDS, classification_pool, classify_files,
+    detect_framework_for_file,
+)
+from FDS_deps import require
+from FDS_executor import DependencyExecutor
+from FDS_history import HISTORY_FILENAME, RunHistory, StatementProfile, ThroughputModel, profile_sql_file, schedule
+from FDS_ledger import LEDGER_TABLE, AppliedLedger, file_checksum
+from FDS_pipeline import completed, in_background, threaded
+from FDS_report import FileTiming, RunReport
+from FDS_rules import RULES_FILENAME, RuleSet
+from FDS_scan import DEFAULT_EXCLUDES, locate_server_cfg, scan_files
+from FDS_schema import SchemaSnapshot
+from FDS_session import GROUP_FILES, SessionProfile, TransactionGroups
+from FDS_sql import (
+    BATCH_BYTES, BATCH_STATEMENTS, BULK_ROWS, CONNECTION_LOST, DEFAULT_MAX_PACKET, FILE_DONE, PACKET_HEADROOM,
+    PREPARED_ROWS, RETRIES, RETRY_DELAY, TRANSIENT_ERRORS, BatchPlanner, BulkLoader, BulkStats, CommitEvery,
+    PreparedInserts, PreparedStats, bulk_spool_dir, error_number, execute_statements, iter_sql_statements,
+    query_max_allowed_packet, resume_statements, rewrite_inserts,
+)
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_FAILED = 2
+EXIT_DRIFT = 3
+FANOUT_WORKERS = 4
+
+BLACKLISTED_FILES = [
+    os.path.normpath('ox_doorlock/sql/default.sql'),
+    os.path.normpath('ox_doorlock/sql/community_mrpd.sql'),
+]
+WHITELISTED_FILES = [
+    os.path.normpath('ox_doorlock/sql/ox_doorlock.sql'),
+]
+DEFAULT_RULES = RuleSet(BLACKLISTED_FILES, WHITELISTED_FILES)
+
+# (sql_path, path relative to the scan root, sha256 checksum, framework the classifier detected)
+PlannedFile = Tuple[Path, str, str, Optional[str]]
+FinishedHook = Callable[[int, int, Path, Optional[str], float, Optional[str]], None]
+
+
+class EngineError(Exception):
+    """A server could not be planned or executed at all (configuration, connection, ledger)."""
+
+
+def extract_mysql_url_from_cfg(cfg_path: Path) -> Optional[str]:
+    with cfg_path.open(encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            match = re.search(r'set\s+mysql_connection_string\s+(["\'])(.+?)\1', line)
+            if match:
+                url = match.group(2).strip()
+                return url
+            match2 = re.search(r'set\s+mysql_connection_string\s+([^\s#]+)', line)
+            if match2:
+                url = match2.group(1).strip()
+                return url
+    return None
+
+def parse_mysql_url(url: str):
+    from urllib.parse import urlparse, parse_qs
+    parsed = urlparse(url)
+    if parsed.scheme == 'mysql':
+        user = parsed.username or 'root'
+        password = parsed.password or ''
+        host = parsed.hostname or 'localhost'
+        port = parsed.port or 3306
+        database = parsed.path.lstrip('/')
+        params = parse_qs(parsed.query)
+        charset = params.get('charset', ['utf8mb4'])[0]
+        return dict(user=user, password=password, host=host, port=port, database=database, charset=charset)
+    if ';' in url and '=' in url:
+        parts = [p.strip() for p in url.split(';') if p.strip()]
+        kv = dict()
+        for part in parts:
+            if '=' in part:
+                k, v = part.split('=', 1)
+                kv[k.strip().lower()] = v.strip()
+        user = kv.get('user', 'root')
+        password = kv.get('password', '')
+        host = kv.get('host', 'localhost')
+        port = int(kv.get('port', 3306))
+        database = kv.get('database', '')
+        charset = kv.get('charset', 'utf8mb4')
+        if not database:
+            raise ValueError(f"Database name missing in connection string: {url}")
+        return dict(user=user, password=password, host=host, port=port, database=database, charset=charset)
+    raise ValueError(f"Unsupported DB connection string format. Must be mysql://... or user=...;host=...;port=...;database=...; (got: {url})")
+
+def is_dsn(value: str) -> bool:
+    """True for a connection string (mysql://... or key=value;...), False for a directory."""
+    return value.startswith('mysql://') or (';' in value and '=' in value)
+
+def describe_server(db_cfg: dict) -> str:
+    """user@host:port/database, without the password."""
+    return f"{db_cfg['user']}@{db_cfg['host']}:{db_cfg['port']}/{db_cfg['database']}"
+
+def find_files(pattern: str, base: Path, excludes: Optional[List[str]] = None, max_depth: Optional[int] = None) -> Iterator[Path]:
+    return scan_files(pattern, base, excludes=excludes, max_depth=max_depth)
+
+def find_server_cfg_files_upward(start_dir: Path, max_levels: int = 10) -> list:
+    """Search start_dir, then below it, then up to max_levels directories above it for server.cfg."""
+    return locate_server_cfg(start_dir, max_levels=max_levels)
+
+def get_db_url_and_cfg_dir(root: Path) -> (Optional[str], Optional[Path]):
+    try:
+        dotenv = require('dotenv', 'python-dotenv')
+    except RuntimeError as e:
+        raise EngineError(str(e))
+    dotenv.load_dotenv()
+    env_url = os.getenv('DATABASE_URL')
+    if env_url:
+        return env_url, None
+    cfg_files = find_server_cfg_files_upward(root)
+    for cfg in cfg_files:
+        url = extract_mysql_url_from_cfg(cfg)
+        if url:
+            return url, cfg.parent
+    return None, None
+
+def resolve_server(root: Path, dsn: Optional[str] = None) -> Tuple[dict, Path]:
+    """Connection settings and scan root for a server.
+
+    An explicit dsn wins and root is scanned as given. Otherwise DATABASE_URL/.env is used,
+    then the nearest server.cfg, whose directory becomes the scan root.
+    """
+    if not dsn:
+        dsn, cfg_dir = get_db_url_and_cfg_dir(root)
+        if not dsn:
+            raise EngineError("Could not find a MySQL connection string in .env or any server.cfg.")
+        root = cfg_dir or root
+    try:
+        return parse_mysql_url(dsn), root
+    except ValueError as e:
+        raise EngineError(f"Error parsing DB URL: {e}")
+
+def keep_sql_file(f: Path, framework: str, detected_fw: Optional[str]) -> bool:
+    my_keywords = FRAMEWORKS[framework]
+    other_keywords = OTHER_KEYWORDS[framework]
+    name = f.name.lower()
+    if detected_fw == 'esx' and framework != 'esx':
+        return False
+    if detected_fw and detected_fw != framework:
+        return False
+    if any(kw in name for kw in other_keywords):
+        return False
+    return (
+        any(kw in name for kw in my_keywords)
+        or not any(kw in name for kw in ALL_KEYWORDS)
+        or detected_fw == framework
+        or detected_fw is None
+    )
+
+def iter_filtered_sql_files(sql_files: Iterable[Path], framework: str, cache: Optional[ClassificationCache] = None,
+                            rules: Optional[RuleSet] = None, head_window: int = HEAD_WINDOW, workers: int = 1,
+                            chunksize: int = CLASSIFY_CHUNK,
+                            frameworks: Optional[Dict[Path, Optional[str]]] = None) -> Iterator[Path]:
+    """filter_sql_files() as a stream: files are yielded as soon as they are classified.
+
+    With workers > 1, files are classified a batch of workers * chunksize at a time.
+    frameworks, if given, receives each file's detected framework before the file is
+    yielded (files are not classified at all for 'other').
+    """
+    rules = rules or DEFAULT_RULES
+    if framework == 'other':
+        yield from rules.iter_apply((f, True) for f in sql_files)
+        return
+    batch_size = workers * chunksize if workers > 1 else 1
+    pool = classification_pool(workers) if workers > 1 else None
+    classify_many = partial(classify_files, workers=workers, chunksize=chunksize, head_window=head_window, pool=pool)
+
+    def decisions() -> Iterator[Tuple[Path, bool]]:
+        sql_iter = iter(sql_files)
+        while True:
+            batch = list(islice(sql_iter, batch_size))
+            if not batch:
+                return
+            verdicts = {}
+            if pool is not None:
+                if cache:
+                    cache.prefetch(batch, classify_many)
+                else:
+                    verdicts = dict(zip(batch, classify_many(batch)))
+            for f in batch:
+                keep = cache.decision_for(f, framework) if cache else None
+                if keep is None or frameworks is not None:
+                    if cache:
+                        detected_fw = cache.framework_for(f)
+                    elif f in verdicts:
+                        detected_fw = verdicts[f]
+                    else:
+                        detected_fw = detect_framework_for_file(f, head_window)
+                    if frameworks is not None:
+                        frameworks[f] = detected_fw
+                if keep is None:
+                    keep = keep_sql_file(f, framework, detected_fw)
+                    if cache:
+                        cache.store_decision(f, framework, keep)
+                yield f, keep
+
+    try:
+        yield from rules.iter_apply(decisions())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def filter_sql_files(sql_files: Iterable[Path], framework: str, cache: Optional[ClassificationCache] = None,
+                     rules: Optional[RuleSet] = None, head_window: int = HEAD_WINDOW, workers: int = 1,
+                     chunksize: int = CLASSIFY_CHUNK) -> List[Path]:
+    return list(iter_filtered_sql_files(sql_files, framework, cache, rules, head_window, workers, chunksize))
+
+def connect_db(db_cfg: dict, infile_dir: Optional[str] = None):
+    """infile_dir allows LOAD DATA LOCAL INFILE, but only for files in that directory."""
+    # Imported on first connect; mysql.connector alone costs more than the rest of startup.
+    connector = require('mysql.connector', 'mysql-connector-python')
+    extra = dict(allow_local_infile_in_path=infile_dir) if infile_dir else {}
+    return connector.connect(
+        user=db_cfg['user'],
+        password=db_cfg['password'],
+        host=db_cfg['host'],
+        port=db_cfg['port'],
+        database=db_cfg['database'],
+        charset=db_cfg['charset'],
+        autocommit=False,
+        # Prefer the C extension; use_pure=False would raise ImportError where it is not built.
+        use_pure=not getattr(connector, 'HAVE_CEXT', False),
+        **extra
+    )
+
+
+def connector_mode(conn) -> str:
+    return 'c-extension' if type(conn).__name__.startswith('CMySQL') else 'pure-python'
+
+def _run_sql_file_once(sql_path: Path, conn, planner: BatchPlanner, shadow: BatchPlanner, max_packet: int, rewrite: bool,
+                       snapshot: Optional[SchemaSnapshot], timing: Optional[FileTiming], prepared: Optional[PreparedInserts],
+                       bulk: Optional[BulkLoader], commit: bool, commit_every: Optional[CommitEvery],
+                       profile: Optional[StatementProfile]):
+    cursor = conn.cursor()
+    statements = enumerate(iter_sql_statements(sql_path), 1)
+    if profile:
+        statements = profile.count(statements)
+    if commit_every and commit_every.resume_at > 1:
+        statements = resume_statements(statements, commit_every.resume_at)
+    if rewrite:
+        statements = rewrite_inserts(statements, max_packet)
+    if snapshot:
+        statements = snapshot.prune(statements, shadow)
+    execute_statements(cursor, statements, planner=planner, on_statement=timing.statement if timing else None,
+                       prepared=prepared, bulk=bulk, commit_every=commit_every)
+    if commit_every and commit_every.checkpoint:
+        # If the ledger row never gets written, a rerun only replays the session statements.
+        commit_every.checkpoint(conn, FILE_DONE)
+    if commit:
+        conn.commit()
+    cursor.close()
+
+
+def _rollback(conn):
+    """Drop a failed file's open transaction; a connection that is gone has nothing left to drop."""
+    try:
+        conn.rollback()
+    except Exception:
+        pass
+
+def run_sql_file(sql_path: Path, conn, batch_statements: int = BATCH_STATEMENTS, batch_bytes: int = BATCH_BYTES,
+                 max_packet: int = DEFAULT_MAX_PACKET, rewrite: bool = True,
+                 snapshot: Optional[SchemaSnapshot] = None, timing: Optional[FileTiming] = None,
+                 prepared_rows: int = 0, prepared_stats: Optional[PreparedStats] = None,
+                 bulk_rows: int = 0, bulk_stats: Optional[BulkStats] = None, commit: bool = True,
+                 commit_statements: int = 0, commit_bytes: int = 0,
+                 checkpoint: Optional[Callable[[object, int], None]] = None, resume_at: int = 1, retries: int = 0,
+                 on_retry: Optional[Callable[[int, float, str], None]] = None,
+                 on_reconnect: Optional[Callable[[object], None]] = None,
+                 profile: Optional[StatementProfile] = None) -> Optional[str]:
+    """Run one file; prepared_rows > 0 sends repeated literal INSERT shapes as prepared statements, and
+    bulk_rows > 0 loads runs of at least that many literal rows with LOAD DATA LOCAL INFILE.
+
+    The file is committed at the end unless commit is False; commit_statements/commit_bytes
+    also commit part-way through it, calling checkpoint(conn, resume_at) inside each of
+    those transactions. Execution starts at statement resume_at. Transient errors
+    (TRANSIENT_ERRORS) are retried up to retries times with exponential backoff: the open
+    transaction is rolled back, or the connection re-established and on_reconnect(conn)
+    called, and the file resumes after its last commit. A file that fails for good is
+    rolled back to its last commit before the connection is handed on, unless commit is
+    False: then the caller's shared transaction decides. profile, if given, counts the
+    file's statements by kind as they are read.
+    """
+    batch_bytes = min(batch_bytes, max_packet - PACKET_HEADROOM)
+    planner = BatchPlanner(batch_statements, batch_bytes)
+    shadow = BatchPlanner(batch_statements, batch_bytes)
+    for attempt in range(retries + 1):
+        prepared = None
+        bulk = None
+        commit_every = None
+        if commit_statements or commit_bytes or retries or resume_at > 1:
+            commit_every = CommitEvery(conn, commit_statements, commit_bytes, checkpoint, resume_at)
+        if profile:
+            profile.reset()
+        try:
+            if prepared_rows > 0:
+                prepared = PreparedInserts(conn, prepared_rows, max_packet - PACKET_HEADROOM)
+            if bulk_rows > 0:
+                bulk = BulkLoader(conn, bulk_rows, batch_bytes)
+            _run_sql_file_once(sql_path, conn, planner, shadow, max_packet, rewrite, snapshot, timing, prepared, bulk,
+                               commit, commit_every, profile)
+            if snapshot:
+                snapshot.add_round_trips_saved(shadow.requests - planner.requests)
+            return None
+        except Exception as e:
+            if snapshot:
+                snapshot.invalidate()
+            errno = error_number(e)
+            if errno not in TRANSIENT_ERRORS or attempt == retries:
+                if commit:
+                    _rollback(conn)
+                return str(e)
+            delay = RETRY_DELAY * 2 ** attempt
+            if on_retry:
+                on_retry(attempt + 1, delay, str(e))
+            time.sleep(delay)
+            try:
+                if errno in CONNECTION_LOST or not conn.is_connected():
+                    conn.reconnect()
+                    if on_reconnect:
+                        on_reconnect(conn)
+                else:
+                    conn.rollback()
+            except Exception as reconnect_error:
+                return f"{e} (could not reconnect: {reconnect_error})"
+            if commit_every:
+                resume_at = commit_every.resume_after(e)
+        finally:
+            if prepared:
+                prepared.close()
+                if timing:
+                    timing.add_prepared(prepared)
+                if prepared_stats:
+                    prepared_stats.add(prepared)
+            if bulk:
+                bulk.close()
+                if timing:
+                    timing.add_bulk(bulk)
+                if bulk_stats:
+                    bulk_stats.add(bulk)
+
+
+class EngineOptions:
+    """Settings for plan() and execute(); the defaults match the CLI's."""
+
+    def __init__(self, excludes: Iterable[str] = (), max_depth: Optional[int] = None, rules_file: Optional[Path] = None,
+                 use_cache: bool = True, rebuild_cache: bool = False, head_window: int = HEAD_WINDOW,
+                 classify_workers: int = 1, classify_chunksize: int = CLASSIFY_CHUNK, force: bool = False,
+                 jobs: int = 1, batch_statements: int = BATCH_STATEMENTS, batch_bytes: int = BATCH_BYTES,
+                 rewrite: bool = True, schema_check: bool = True, prepared: bool = False,
+                 prepared_rows: int = PREPARED_ROWS, bulk_load: bool = False, bulk_rows: int = BULK_ROWS,
+                 commit_statements: int = 0, commit_bytes: int = 0, group_files: int = GROUP_FILES,
+                 bulk_session: bool = False, retries: int = RETRIES, history: bool = True):
+        self.excludes = list(excludes)
+        self.max_depth = max_depth
+        self.rules_file = rules_file
+        self.use_cache = use_cache
+        self.rebuild_cache = rebuild_cache
+        self.head_window = head_window
+        self.classify_workers = classify_workers or os.cpu_count() or 1
+        self.classify_chunksize = classify_chunksize
+        self.force = force
+        self.jobs = jobs
+        self.batch_statements = batch_statements
+        self.batch_bytes = batch_bytes
+        self.rewrite = rewrite
+        self.schema_check = schema_check
+        self.prepared = prepared
+        self.prepared_rows = prepared_rows
+        self.bulk_load = bulk_load
+        self.bulk_rows = bulk_rows
+        self.commit_statements = commit_statements
+        self.commit_bytes = commit_bytes
+        self.group_files = group_files
+        self.bulk_session = bulk_session
+        self.retries = retries
+        self.history = history
+
+
+class Plan:
+    """The files one server would run, discovered while they are scanned and classified.
+
+    Connecting, scanning and classifying start in the background when the plan is made.
+    entries() yields the files to run in order; each is checked against the fds_applied
+    ledger as it arrives, which is the first point that waits for the connection. Use a
+    plan from the thread that created it.
+
+    files replaces the scan with a given list, and conn/ledger/cache reuse ones the caller
+    keeps open across plans (FDS_watch); the caller then closes the cache itself.
+    """
+
+    def __init__(self, framework: str, root: Path, db_cfg: dict, options: EngineOptions, rules: RuleSet,
+                 files: Optional[Iterable[Path]] = None, conn=None, ledger: Optional[AppliedLedger] = None,
+                 cache: Optional[ClassificationCache] = None):
+        self.framework = framework
+        self.root = root
+        self.db_cfg = db_cfg
+        self.options = options
+        self.found = 0
+        self.to_run: List[PlannedFile] = []
+        self.status: Dict[str, str] = {}
+        self.unchanged: List[Tuple[Path, str, Optional[str]]] = []
+        self._frameworks: Dict[Path, Optional[str]] = {}
+        self.complete = False
+        self.conn = conn if ledger is not None else None
+        self.ledger = ledger
+        self.connect_seconds = 0.0
+        self.cache_error: Optional[str] = None
+        if cache is not None or not options.use_cache:
+            self.cache = cache
+        else:
+            self.cache, self.cache_error = open_cache(root, options.rebuild_cache, options.head_window)
+        self._cache_open = self.cache is not None and cache is None
+        self._pending_conn = completed(conn) if conn is not None else in_background(self._connect, name='fds-connect')
+        if files is not None:
+            scanned = iter(files)
+        else:
+            scanned = threaded(find_files('*.sql', root, excludes=DEFAULT_EXCLUDES + options.excludes, max_depth=options.max_depth),
+                               name='fds-scan')
+        self._candidates = threaded(iter_filtered_sql_files(scanned, framework, self.cache, rules, options.head_window,
+                                                            options.classify_workers, options.classify_chunksize,
+                                                            self._frameworks),
+                                    name='fds-classify')
+
+    @property
+    def server(self) -> str:
+        return describe_server(self.db_cfg)
+
+    def _connect(self):
+        start = time.perf_counter()
+        conn = connect_db(self.db_cfg, bulk_spool_dir() if self.options.bulk_load else None)
+        self.connect_seconds = time.perf_counter() - start
+        return conn
+
+    def connection(self):
+        """The plan's connection, waiting for the background connect; raises EngineError if it failed."""
+        if self.conn is None:
+            try:
+                conn = self._pending_conn.result()
+            except Exception as e:
+                raise EngineError(f"Database connection failed: {e}")
+            try:
+                self.ledger = AppliedLedger(conn)
+            except Exception as e:
+                conn.close()
+                raise EngineError(f"Could not read the {LEDGER_TABLE} ledger table: {e}")
+            self.conn = conn
+        return self.conn
+
+    def entries(self) -> Iterator[PlannedFile]:
+        """Yield every file to run, as soon as it is classified and checked against the ledger."""
+        if self.complete:
+            yield from self.to_run
+            return
+        try:
+            for sql_path in self._candidates:
+                self.found += 1
+                self.connection()
+                rel = sql_path.relative_to(self.root).as_posix()
+                checksum = file_checksum(sql_path)
+                status = self.ledger.status(rel, checksum)
+                detected = self._frameworks.pop(sql_path, None)
+                if status == 'unchanged' and not self.options.force:
+                    self.unchanged.append((sql_path, rel, detected))
+                    continue
+                self.status[rel] = status
+                self.to_run.append((sql_path, rel, checksum, detected))
+                yield sql_path, rel, checksum, detected
+            self.complete = True
+            self._close_cache()
+        finally:
+            if not self.complete:
+                # Stop scanning; the classify thread may still hold the cache, so it is not saved.
+                self._candidates.close()
+
+    def resolve(self) -> 'Plan':
+        """Finish scanning and classifying without executing anything."""
+        for _ in self.entries():
+            pass
+        return self
+
+    def _close_cache(self):
+        if self._cache_open:
+            self._cache_open = False
+            try:
+                self.cache.close()
+            except Exception as e:
+                self.cache_error = f"Could not save the classification cache: {e}"
+
+    def close(self):
+        """Close the plan's connection when it is not handed to execute()."""
+        conn, self.conn = self.conn, None
+        if conn is None and self._pending_conn.done() and not self._pending_conn.exception():
+            conn = self._pending_conn.result()
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def to_dict(self) -> Dict:
+        return dict(
+            server=self.server, root=str(self.root), framework=self.framework, complete=self.complete, found=self.found,
+            to_run=[dict(path=rel, status=self.status[rel], checksum=checksum) for _, rel, checksum, _ in self.to_run],
+            unchanged=[rel for _, rel, _ in self.unchanged],
+        )
+
+
+class RunResult:
+    """Outcome of execute() or drift() for one server; exit_code follows the CLI's exit codes."""
+
+    def __init__(self, target: str, plan: Optional[Plan] = None, error: Optional[str] = None):
+        self.target = target
+        self.plan = plan
+        self.error = error
+        self.files: List[Tuple[str, Optional[str], float]] = []
+        self.warnings: List[str] = []
+        self.seconds = 0.0
+        self.drift_only = False
+        self.statements_skipped = 0
+        self.round_trips_saved = 0
+        self.connector: Optional[str] = None
+        self.prepared: Optional[PreparedStats] = None
+        self.bulk: Optional[BulkStats] = None
+        self.resumed: List[Tuple[str, int]] = []
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for _, error, _ in self.files if error)
+
+    @property
+    def exit_code(self) -> int:
+        if self.error:
+            return EXIT_ERROR
+        if self.drift_only:
+            return EXIT_DRIFT if self.plan.to_run else EXIT_OK
+        return EXIT_FAILED if self.failed else EXIT_OK
+
+    def to_dict(self) -> Dict:
+        data = dict(target=self.target, exit_code=self.exit_code, error=self.error, warnings=self.warnings,
+                    seconds=round(self.seconds, 3))
+        if self.plan:
+            data.update(server=self.plan.server, root=str(self.plan.root), framework=self.plan.framework,
+                        found=self.plan.found, unchanged=len(self.plan.unchanged))
+        if self.drift_only:
+            data['drifted'] = self.plan.to_dict()['to_run']
+        else:
+            data.update(
+                files=[dict(path=rel, ok=error is None, error=error, seconds=round(seconds, 3)) for rel, error, seconds in self.files],
+                failed=self.failed, statements_skipped=self.statements_skipped, round_trips_saved=self.round_trips_saved,
+                connector=self.connector, prepared=self.prepared.to_dict() if self.prepared else None,
+                bulk=self.bulk.to_dict() if self.bulk else None,
+                resumed=[dict(path=rel, resume_at=resume_at) for rel, resume_at in self.resumed],
+            )
+        return data
+
+
+class Preview:
+    """The outcome of preview(): files in the order they would run, and the ones left out."""
+
+    def __init__(self, framework: str, root: Path, server: Optional[str], jobs: int):
+        self.framework = framework
+        self.root = root
+        self.server = server
+        self.jobs = jobs
+        self.files: List[Dict] = []
+        self.excluded: List[Dict] = []
+        self.warnings: List[str] = []
+        self.seconds = 0.0
+
+    @property
+    def estimate_seconds(self) -> float:
+        return sum(f['estimate_seconds'] for f in self.files)
+
+    @property
+    def wall_seconds(self) -> float:
+        """estimate_seconds spread over the plan's jobs; see schedule()."""
+        return schedule((f['estimate_seconds'] for f in self.files), self.jobs)
+
+    def to_dict(self) -> Dict:
+        return dict(
+            server=self.server, root=str(self.root), framework=self.framework, dry_run=True, jobs=self.jobs,
+            warnings=self.warnings, seconds=round(self.seconds, 3), files=self.files, excluded=self.excluded,
+            statements=sum(f['statements'] for f in self.files), bytes=sum(f['bytes'] for f in self.files),
+            estimate_seconds=round(self.estimate_seconds, 3), wall_seconds=round(self.wall_seconds, 3),
+            unrecorded_estimate_seconds=round(sum(f['estimate_seconds'] for f in self.files if not f['recorded']), 3),
+        )
+
+
+def load_rules(scan_root: Path, options: EngineOptions) -> RuleSet:
+    rules_file = options.rules_file or scan_root / RULES_FILENAME
+    if options.rules_file and not rules_file.is_file():
+        raise EngineError(f"Rules file not found: {rules_file}")
+    try:
+        return RuleSet.load(BLACKLISTED_FILES, WHITELISTED_FILES, rules_file)
+    except (OSError, ValueError) as e:
+        raise EngineError(f"Could not load rules: {e}")
+
+def plan(root: Path, framework: str, dsn: Optional[str] = None, options: Optional[EngineOptions] = None) -> Plan:
+    """Start planning a server; raises EngineError for configuration problems."""
+    options = options or EngineOptions()
+    db_cfg, scan_root = resolve_server(root, dsn)
+    return Plan(framework, scan_root, db_cfg, options, load_rules(scan_root, options))
+
+def preview(root: Path, framework: str, dsn: Optional[str] = None, options: Optional[EngineOptions] = None) -> Preview:
+    """Work out what execute() would run without connecting to the database.
+
+    Every file is classified and checked against the rules, and each one that would run
+    is profiled and given an estimated duration from .fds_history.sqlite or the statement
+    throughput model. The ledger is not read, so files it would skip as unchanged are
+    listed too. The classification cache and run history are only read, and only if they
+    exist, so a dry run writes nothing. Raises EngineError for configuration problems.
+    """
+    options = options or EngineOptions()
+    start = time.perf_counter()
+    try:
+        db_cfg, scan_root = resolve_server(root, dsn)
+        server = describe_server(db_cfg)
+    except (EngineError, RuntimeError):
+        server, scan_root = None, root
+    rules = load_rules(scan_root, options)
+    result = Preview(framework, scan_root, server, options.jobs)
+    if server is None:
+        result.warnings.append(f"No usable connection string found; scanning {root} as given.")
+    sql_files = list(find_files('*.sql', scan_root, excludes=DEFAULT_EXCLUDES + options.excludes, max_depth=options.max_depth))
+    classify_many = partial(classify_files, workers=options.classify_workers, chunksize=options.classify_chunksize,
+                            head_window=options.head_window)
+    cache = None
+    if options.use_cache and not options.rebuild_cache and (scan_root / CACHE_FILENAME).is_file():
+        cache, cache_error = open_cache(scan_root, head_window=options.head_window, read_only=True)
+        if cache_error:
+            result.warnings.append(cache_error)
+    if cache is not None:
+        try:
+            cache.prefetch(sql_files, classify_many)
+            detected = [cache.framework_for(f) for f in sql_files]
+        finally:
+            cache.close()
+    else:
+        detected = classify_many(sql_files)
+    kept = [framework == 'other' or keep_sql_file(f, framework, fw) for f, fw in zip(sql_files, detected)]
+    history = None
+    if options.history and (scan_root / HISTORY_FILENAME).is_file():
+        try:
+            history = RunHistory(scan_root, read_only=True)
+        except sqlite3.Error as e:
+            result.warnings.append(f"Could not read run timings from {HISTORY_FILENAME}: {e}")
+    estimate = history.estimate if history else lambda rel, checksum, profile: ThroughputModel().estimate(profile)
+    try:
+        detected_by_file = dict(zip(sql_files, detected))
+        decisions = dict(zip(sql_files, kept))
+        for order, sql_path in enumerate(rules.iter_apply(zip(sql_files, kept)), 1):
+            rel = sql_path.relative_to(scan_root).as_posix()
+            checksum = file_checksum(sql_path)
+            profile = profile_sql_file(sql_path)
+            seconds, source = estimate(rel, checksum, profile)
+            result.files.append(dict(
+                order=order, path=rel, framework=detected_by_file[sql_path],
+                decision=rules.explain(sql_path, decisions.pop(sql_path)), checksum=checksum,
+                bytes=sql_path.stat().st_size, statements=profile.statements, kinds=profile.to_dict(),
+                estimate_seconds=round(seconds, 3), estimate_source=source,
+                recorded=bool(history) and history.files.get(rel, {}).get('checksum') == checksum,
+            ))
+    finally:
+        if history:
+            history.close()
+    for sql_path, keep in decisions.items():
+        result.excluded.append(dict(path=sql_path.relative_to(scan_root).as_posix(), framework=detected_by_file[sql_path],
+                                    decision=rules.explain(sql_path, keep)))
+    result.seconds = time.perf_counter() - start
+    return result
+
+def drift(plan: Plan) -> RunResult:
+    """Resolve plan and report the files that differ from the ledger; nothing is executed."""
+    start = time.perf_counter()
+    result = RunResult(plan.server, plan)
+    result.drift_only = True
+    try:
+        plan.resolve()
+    except EngineError as e:
+        result.error = str(e)
+    finally:
+        plan.close()
+    result.seconds = time.perf_counter() - start
+    return result
+
+def execute(plan: Plan, report: Optional[RunReport] = None, on_finished: Optional[FinishedHook] = None,
+            keep_connection: bool = False) -> RunResult:
+    """Run a plan's files, starting each one as soon as the plan yields it.
+
+    on_finished(done, queued, sql_path, error, seconds, framework) is called once per file
+    from an executor thread, with the framework the plan detected for it; queued keeps
+    growing while the plan is still being scanned. With
+    keep_connection the plan's own connection is left open in plan.conn afterwards.
+    """
+    options = plan.options
+    start = time.perf_counter()
+    result = RunResult(plan.server, plan)
+    entries = plan.entries()
+    try:
+        first = next(entries, None)
+        conn = plan.connection() if first is not None else None
+    except EngineError as e:
+        result.error = str(e)
+    if result.error or first is None:
+        if result.error or not keep_connection:
+            plan.close()
+        result.seconds = time.perf_counter() - start
+        return result
+    result.connector = connector_mode(conn)
+    if report:
+        report.connected(plan.connect_seconds)
+        report.connector = result.connector
+    if options.prepared:
+        result.prepared = PreparedStats()
+    if options.bulk_load:
+        result.bulk = BulkStats()
+
+    def connect():
+        connect_start = time.perf_counter()
+        new_conn = connect_db(plan.db_cfg, bulk_spool_dir() if options.bulk_load else None)
+        if report:
+            report.connected(time.perf_counter() - connect_start)
+        start_session(new_conn)
+        return new_conn
+
+    max_packet = query_max_allowed_packet(conn)
+    snapshot = None
+    if options.schema_check:
+        try:
+            snapshot = SchemaSnapshot(conn)
+        except Exception as e:
+            result.warnings.append(f"Schema pre-check disabled, could not read information_schema: {e}")
+    groups = None
+    if options.group_files > 1 and options.jobs > 1:
+        result.warnings.append("Grouping files into shared transactions needs --jobs 1; committing once per file instead.")
+    elif options.group_files > 1:
+        groups = TransactionGroups(options.group_files)
+    sessions: Dict[int, SessionProfile] = {}
+
+    def start_session(session_conn):
+        if not options.bulk_session:
+            return
+        # sql_log_bin cannot change inside a transaction, and the ledger read has opened one.
+        session_conn.commit()
+        sessions[id(session_conn)] = session = SessionProfile(session_conn)
+        for warning in session.apply():
+            if warning not in result.warnings:
+                result.warnings.append(warning)
+
+    def end_session(session_conn):
+        if groups:
+            groups.close(session_conn)
+        else:
+            # Only a failed file can have left a transaction open; drop it like closing would.
+            session_conn.rollback()
+        session = sessions.pop(id(session_conn), None)
+        error = session.restore() if session else None
+        if error:
+            result.warnings.append(error)
+
+    start_session(conn)
+    checksums = {}
+    detected: Dict[Path, Optional[str]] = {}
+    seconds = {}
+    profiles: Dict[Path, StatementProfile] = {}
+    finished = []
+
+    def run_file(sql_path: Path, file_conn) -> Optional[str]:
+        file_start = time.perf_counter()
+        rel, checksum = checksums[sql_path]
+        timing = report.start_file(rel) if report else None
+        profile = profiles[sql_path] = StatementProfile() if options.history else None
+        resume_at = plan.ledger.resume_at(rel, checksum)
+        if resume_at > 1:
+            result.resumed.append((rel, resume_at))
+        persist = options.commit_statements or options.commit_bytes or resume_at > 1
+
+        def checkpoint(checkpoint_conn, index: int):
+            plan.ledger.save_checkpoint(checkpoint_conn, rel, checksum, index)
+
+        def on_retry(attempt: int, delay: float, error: str):
+            result.warnings.append(f"{rel}: transient error, retry {attempt}/{options.retries} in {delay:.1f}s: {error}")
+
+        # A rollback would also drop the earlier files of a shared transaction, so groups are never retried.
+        error = run_sql_file(sql_path, file_conn, options.batch_statements, options.batch_bytes, max_packet,
+                             options.rewrite, snapshot, timing, options.prepared_rows if options.prepared else 0,
+                             result.prepared, options.bulk_rows if options.bulk_load else 0, result.bulk,
+                             commit=groups is None, commit_statements=options.commit_statements,
+                             commit_bytes=options.commit_bytes,
+                             checkpoint=checkpoint if persist else None, resume_at=resume_at,
+                             retries=options.retries if groups is None else 0, on_retry=on_retry,
+                             on_reconnect=start_session, profile=profile)
+        if report:
+            report.finish_file(timing, error)
+        seconds[sql_path] = time.perf_counter() - file_start
+        if not error:
+            ledger_error = plan.ledger.record(file_conn, rel, checksum, plan.framework, seconds[sql_path],
+                                              commit=groups is None)
+            if ledger_error:
+                result.warnings.append(f"Could not record {rel} in {LEDGER_TABLE}: {ledger_error}")
+            if groups:
+                error = groups.finished(file_conn, rel, sql_path.stat().st_size)
+        elif groups:
+            groups.abort(file_conn, rel)
+        return error
+
+    def on_done(index: int, sql_path: Path, error: Optional[str]):
+        finished.append(index)
+        if on_finished:
+            on_finished(len(finished), len(checksums), sql_path, error, seconds.get(sql_path, 0.0), detected[sql_path])
+
+    plan.conn = None  # The executor owns and closes it from here on.
+    executor = DependencyExecutor(connect, run_file, jobs=options.jobs, on_finished=on_done, connections=[conn])
+    try:
+        try:
+            for sql_path, rel, checksum, framework in chain([first], entries):
+                checksums[sql_path] = (rel, checksum)
+                detected[sql_path] = framework
+                executor.add(sql_path)
+        except EngineError as e:
+            result.error = str(e)
+        results = executor.wait()
+    finally:
+        executor.close(end_session, keep=[conn] if keep_connection else ())
+    if keep_connection:
+        plan.conn = conn
+    result.files = [(checksums[sql_path][0], error, seconds.get(sql_path, 0.0)) for sql_path, error in results]
+    if groups and groups.failed:
+        result.files = [(rel, groups.failed.get(rel, error), took) for rel, error, took in result.files]
+    if options.history:
+        # A resumed file's time only covers part of it, so it would skew the estimates.
+        resumed = {rel for rel, _ in result.resumed}
+        try:
+            history = RunHistory(plan.root)
+            try:
+                for (sql_path, _), (rel, error, took) in zip(results, result.files):
+                    if error is None and rel not in resumed and profiles.get(sql_path):
+                        history.record(rel, checksums[sql_path][1], took, profiles[sql_path])
+            finally:
+                history.close()
+        except Exception as e:
+            result.warnings.append(f"Could not save run timings to {HISTORY_FILENAME}: {e}")
+    if snapshot:
+        result.statements_skipped = snapshot.statements_skipped
+        result.round_trips_saved = snapshot.round_trips_saved
+    if plan.cache_error:
+        result.warnings.append(plan.cache_error)
+    if report:
+        report.skipped = len(plan.unchanged)
+        report.finish()
+    result.seconds = time.perf_counter() - start
+    return result
+
+def provision(targets: List[Tuple[Path, Optional[str]]], framework: str, options: Optional[EngineOptions] = None,
+              workers: int = FANOUT_WORKERS, check_drift: bool = False,
+              on_done: Optional[Callable[[RunResult], None]] = None) -> List[RunResult]:
+    """plan() and execute() (or drift()) every (root, dsn) target on up to workers threads.
+
+    Each server still uses up to options.jobs connections of its own. Results come back in
+    target order; on_done is called as each server finishes. Whatever goes wrong with one
+    server (a malformed DSN included) only ends up as that server's error.
+    """
+    def run_one(target: Tuple[Path, Optional[str]]) -> RunResult:
+        root, dsn = target
+        label = str(root)
+        try:
+            if dsn and is_dsn(dsn):
+                # The DSN itself is not a safe label: it can hold a password.
+                label = f"{root} (unparsable DSN)"
+                try:
+                    label = describe_server(parse_mysql_url(dsn))
+                except ValueError as e:
+                    raise EngineError(f"Error parsing DB URL: {e}")
+            server_plan = plan(root, framework, dsn, options)
+            result = drift(server_plan) if check_drift else execute(server_plan)
+            result.target = label
+        except Exception as e:
+            result = RunResult(label, error=str(e))
+        if on_done:
+            on_done(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='fds-server') as pool:
+        return list(pool.map(run_one, targets))
@@ -0,0 +1,250 @@
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from FDS_sql import iter_sql_statements
+
+_NAME = r'(?:`[^`]+`|[\w$]+)(?:\s*\.\s*(?:`[^`]+`|[\w$]+))?'
+_CREATE_TABLE = re.compile(r'CREATE\s+(?:TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(' + _NAME + ')', re.IGNORECASE)
+_DDL = re.compile(
+    r'(?:ALTER\s+(?:IGNORE\s+)?TABLE|TRUNCATE\s+(?:TABLE\s+)?|DROP\s+(?:TEMPORARY\s+)?TABLE\s+(?:IF\s+EXISTS\s+)?'
+    r'|CREATE\s+(?:UNIQUE\s+|FULLTEXT\s+|SPATIAL\s+)?INDEX\s+\S+\s+ON|DROP\s+INDEX\s+\S+\s+ON'
+    r'|CREATE\s+(?:DEFINER\s*=\s*\S+\s+)?TRIGGER\s+.+?\s+ON)\s*(' + _NAME + ')',
+    re.IGNORECASE | re.DOTALL,
+)
+_WRITE = re.compile(
+    r'(?:(?:INSERT|REPLACE)\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY)\s+)?(?:IGNORE\s+)?(?:INTO\s+)?'
+    r'|UPDATE\s+(?:LOW_PRIORITY\s+)?(?:IGNORE\s+)?|DELETE\s+(?:LOW_PRIORITY\s+)?(?:QUICK\s+)?(?:IGNORE\s+)?FROM\s+)(' + _NAME + ')',
+    re.IGNORECASE,
+)
+_REFERENCES = re.compile(r'\bREFERENCES\s+(' + _NAME + ')', re.IGNORECASE)
+_ALIAS = r'(?:\s+(?:AS\s+)?[\w$]+)?'
+# Tables a statement reads: FROM/JOIN lists (including comma joins) and CREATE TABLE ... LIKE.
+# The table list is only looked ahead at, so a JOIN mistaken for an alias is still matched itself.
+_READ = re.compile(
+    r'\b(?:FROM|JOIN|LIKE)\s+(?=(' + _NAME + ')(' + _ALIAS + r'(?:\s*,\s*' + _NAME + _ALIAS + ')*))', re.IGNORECASE
+)
+_LISTED = re.compile(r',\s*(' + _NAME + ')')
+# INSERT/REPLACE ... VALUES or SET reads nothing, so the (possibly huge) row list is not searched.
+_LITERAL_ROWS = re.compile(r'\s*(?:\([^)]*\)\s*)?(?:VALUES?|SET)\b', re.IGNORECASE)
+_RENAME = re.compile(r'RENAME\s+TABLE\s+(.+)', re.IGNORECASE | re.DOTALL)
+_SELECT = re.compile(r'\(?\s*SELECT\b', re.IGNORECASE)
+# Statements that only affect the current session and never order files.
+_SESSION_ONLY = re.compile(
+    r'(?:SET|START\s+TRANSACTION|BEGIN|COMMIT|ROLLBACK|(?:UN)?LOCK\s+TABLES?)\b|/\*!', re.IGNORECASE
+)
+HEAD_CHARS = 512
+
+
+def _table(name: str) -> str:
+    return name.replace('`', '').split('.')[-1].strip().lower()
+
+
+def _read_tables(statement: str) -> Set[str]:
+    tables = set()
+    for m in _READ.finditer(statement):
+        tables.add(_table(m.group(1)))
+        tables.update(_table(n) for n in _LISTED.findall(m.group(2)))
+    return tables
+
+
+class FileTables:
+    """Tables a .sql file creates, changes the structure of, writes/references, or reads."""
+
+    def __init__(self):
+        self.creates: Set[str] = set()
+        self.ddl: Set[str] = set()
+        self.uses: Set[str] = set()
+        self.reads: Set[str] = set()
+        self.barrier = False
+
+    @property
+    def structural(self) -> Set[str]:
+        return self.creates | self.ddl
+
+
+def scan_file_tables(sql_path: Path) -> FileTables:
+    tables = FileTables()
+    try:
+        for statement in iter_sql_statements(sql_path):
+            head = statement[:HEAD_CHARS]
+            m = _CREATE_TABLE.match(head)
+            if m:
+                tables.creates.add(_table(m.group(1)))
+                tables.uses.update(_table(r) for r in _REFERENCES.findall(statement))
+                tables.reads.update(_read_tables(statement))
+                continue
+            m = _DDL.match(head)
+            if m:
+                tables.ddl.add(_table(m.group(1)))
+                tables.uses.update(_table(r) for r in _REFERENCES.findall(statement))
+                continue
+            m = _WRITE.match(head)
+            if m:
+                target = _table(m.group(1))
+                if head[m.end():].lstrip().startswith(','):
+                    # Multi-table UPDATE: every listed table may be written.
+                    tables.barrier = True
+                    continue
+                tables.uses.add(target)
+                if not (head[:1].upper() in 'IR' and _LITERAL_ROWS.match(head, m.end())):
+                    tables.reads.update(_read_tables(statement) - {target})
+                continue
+            m = _RENAME.match(head)
+            if m:
+                tables.ddl.update(_table(n) for n in re.split(r'\s*(?:,|\bTO\b)\s*', m.group(1), flags=re.IGNORECASE) if n)
+                continue
+            if _SELECT.match(head):
+                tables.reads.update(_read_tables(statement))
+            elif not _SESSION_ONLY.match(head):
+                tables.barrier = True
+    except OSError:
+        tables.barrier = True
+    return tables
+
+
+class DependencyExecutor:
+    """Run .sql files on a bounded pool of connections, ordering only files that conflict.
+
+    Files are added in run order. A file waits for every earlier file that created or
+    altered a table it touches, for earlier files that touched a table it creates or
+    alters, for earlier files that wrote a table it reads (and read a table it writes),
+    and for any earlier file whose statements could not be understood (a
+    barrier, e.g. procedures or USE). Everything else runs concurrently; among files that
+    are ready at the same time the original order wins. With jobs=1 the files simply run
+    one after another.
+    """
+
+    def __init__(self, connect: Callable[[], Any], run_file: Callable[[Path, Any], Optional[str]], jobs: int = 1,
+                 on_finished: Optional[Callable[[int, Path, Optional[str]], None]] = None, connections: List[Any] = ()):
+        self.jobs = max(1, jobs)
+        self._connect = connect
+        self._run_file = run_file
+        self._on_finished = on_finished
+        self._pool = ThreadPoolExecutor(max_workers=self.jobs)
+        self._idle = queue.Queue()
+        self._connections = list(connections)
+        for conn in self._connections:
+            self._idle.put(conn)
+        self._cond = threading.Condition()
+        self._paths: List[Path] = []
+        self._errors: Dict[int, Optional[str]] = {}
+        self._waiting_on: Dict[int, Set[int]] = {}
+        self._dependents: Dict[int, List[int]] = {}
+        self._last_structural: Dict[str, int] = {}
+        self._users_since: Dict[str, Set[int]] = {}
+        self._writers_since: Dict[str, Set[int]] = {}
+        self._readers_since: Dict[str, Set[int]] = {}
+        self._last_barrier: Optional[int] = None
+        self._since_barrier: Set[int] = set()
+
+    def _dependencies(self, index: int, tables: FileTables) -> Set[int]:
+        if self.jobs == 1:
+            return {index - 1} if index else set()
+        if tables.barrier:
+            deps = set(self._since_barrier)
+            if self._last_barrier is not None:
+                deps.add(self._last_barrier)
+            self._last_barrier = index
+            self._since_barrier = set()
+            self._last_structural.clear()
+            self._users_since.clear()
+            self._writers_since.clear()
+            self._readers_since.clear()
+            return deps
+        deps = set()
+        if self._last_barrier is not None:
+            deps.add(self._last_barrier)
+        for table in tables.uses | tables.reads | tables.structural:
+            if table in self._last_structural:
+                deps.add(self._last_structural[table])
+        for table in tables.structural:
+            deps.update(self._users_since.get(table, ()))
+            self._last_structural[table] = index
+            self._users_since[table] = set()
+            self._writers_since[table] = set()
+            self._readers_since[table] = set()
+        writes = tables.uses - tables.structural
+        reads = tables.reads - tables.structural
+        for table in reads:
+            deps.update(self._writers_since.get(table, ()))
+        for table in writes:
+            deps.update(self._readers_since.get(table, ()))
+        for table in writes | reads:
+            self._users_since.setdefault(table, set()).add(index)
+        for table in writes:
+            self._writers_since.setdefault(table, set()).add(index)
+        for table in reads:
+            self._readers_since.setdefault(table, set()).add(index)
+        self._since_barrier.add(index)
+        return deps
+
+    def add(self, sql_path: Path, tables: Optional[FileTables] = None) -> int:
+        if tables is None and self.jobs > 1:
+            tables = scan_file_tables(sql_path)
+        with self._cond:
+            index = len(self._paths)
+            self._paths.append(sql_path)
+            deps = {d for d in self._dependencies(index, tables) if d not in self._errors}
+            self._waiting_on[index] = deps
+            for dep in deps:
+                self._dependents.setdefault(dep, []).append(index)
+            if not deps:
+                self._pool.submit(self._run, index)
+        return index
+
+    def _run(self, index: int):
+        sql_path = self._paths[index]
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                with self._cond:
+                    self._connections.append(conn)
+            try:
+                error = self._run_file(sql_path, conn)
+            finally:
+                # Even after an exception, so later files reuse the connection instead of opening another.
+                self._idle.put(conn)
+        except Exception as e:
+            error = str(e)
+        with self._cond:
+            self._errors[index] = error
+            ready = []
+            for dependent in self._dependents.pop(index, ()):
+                waiting = self._waiting_on[dependent]
+                waiting.discard(index)
+                if not waiting:
+                    ready.append(dependent)
+            for dependent in sorted(ready):
+                self._pool.submit(self._run, dependent)
+            if self._on_finished:
+                self._on_finished(index, sql_path, error)
+            self._cond.notify_all()
+
+    def wait(self) -> List[Tuple[Path, Optional[str]]]:
+        """Block until every added file has run; results come back in run order."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._errors) == len(self._paths))
+        return [(path, self._errors[i]) for i, path in enumerate(self._paths)]
+
+    def close(self, before_close: Optional[Callable[[Any], None]] = None, keep: Iterable[Any] = ()):
+        """Wait for running files, then close every connection except those in keep; before_close(conn) runs first on each."""
+        self._pool.shutdown(wait=True)
+        keep = [id(conn) for conn in keep]
+        for conn in self._connections:
+            try:
+                if before_close:
+                    before_close(conn)
+            except Exception:
+                pass
+            if id(conn) in keep:
+                continue
+            try:
+                conn.close()
+            except Exception:
+                pass
@@ -1,321 +1,151 @@
 import sys
-import subprocess
-import importlib.util
-import os
-import re
+import time
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Optional
+from FDS_deps import GUI_REQUIRED, check_dependencies
+
+# Handled before PySide6 is imported, so it also works when PySide6 itself is missing.
+if __name__ == "__main__" and '--check-deps' in sys.argv:
+    sys.exit(check_dependencies(GUI_REQUIRED))
+
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QFileDialog, QProgressBar, QTableWidget, QTableWidgetItem, QMessageBox, QHeaderView, QGroupBox, QSizePolicy, QFrame, QSpacerItem
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QFileDialog, QProgressBar, QTableView, QLineEdit, QMessageBox, QHeaderView, QGroupBox, QSizePolicy, QFrame, QSpacerItem, QSpinBox, QCheckBox
 )
-from PySide6.QtCore import Qt, QThread, Signal
-from PySide6.QtGui import QIcon, QFont
-import mysql.connector
-from dotenv import load_dotenv
-
-REQUIRED = [
-    ('PySide6', 'PySide6'),
-    ('mysql', 'mysql-connector-python'),
-    ('dotenv', 'python-dotenv'),
-]
-for module, package in REQUIRED:
-    if importlib.util.find_spec(module) is None:
-        print(f"[Auto-Installer] Installing missing package: {package}")
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', package])
-
-FRAMEWORKS = {
-    'qbcore': ['qbcore', 'qb'],
-    'qbx': ['qbx'],
-    'ox': ['ox', 'oxcore'],
-    'esx': ['esx'],
-    'other': []  # fallback: run all .sql files
-}
-
-FRAMEWORK_PATTERNS = {
-    'esx': [
-        r'\besx_', r'\busers\b', r'\bowned_vehicles\b', r'\baddon_account_data\b', r'\bdatastore_data\b', r'\bjobs\b', r'\bjob_grades\b',
-        r'INSERT INTO `users`', r'INSERT INTO `owned_vehicles`', r'INSERT INTO `addon_account_data`', r'INSERT INTO `datastore_data`',
-        r'CREATE TABLE IF NOT EXISTS `users`', r'CREATE TABLE IF NOT EXISTS `owned_vehicles`',
-        r'-- ESX', r'\besx_[a-z0-9_]+',
-        r'INSERT IGNORE [`\"]?items[`\"]?', r'CREATE TABLE IF NOT EXISTS [`\"]?items[`\"]?', r'ALTER TABLE [`\"]?items[`\"]?',
-        r'--.*esx', r'--.*item limit', r'--.*item weight', r'--.*es_extended',
-        r'\bdatastore_data\b', r'\baddon_inventory_items\b', r'\baddon_account_data\b',
-        r'\bowned_properties\b', r'\buser_licenses\b', r'\buser_vehicles\b',
-        r'\buser_inventory\b', r'\buser_accounts\b', r'\buser_.*',
-        r'\bproperty\b', r'\bphone_users_contacts\b',
-    ],
-    'qbcore': [
-        r'\bqbcore_', r'\bqb_', r'\bplayers\b', r'\bplayer_vehicles\b', r'INSERT INTO `players`', r'INSERT INTO `player_vehicles`',
-        r'CREATE TABLE IF NOT EXISTS `players`', r'CREATE TABLE IF NOT EXISTS `player_vehicles`',
-        r'JSON_', r'qbcore framework', r'-- QBCore',
-        r'\bmetadata\b', r'\binventory\b', r'\bplayer_outfits\b',
-        r'\bplayer_houses\b', r'\bplayer_motels\b', r'\bplayer_gangs\b',
-        r'\bplayer_contacts\b', r'\bplayer_.*',
-        r'\btrunkitems\b', r'\bgloveboxitems\b',
-    ],
-    'ox': [
-        r'\box_', r'\boxcore_', r'\box_inventory\b', r'\box_doorlock\b', r'INSERT INTO `ox_inventory`', r'INSERT INTO `ox_doorlock`',
-        r'CREATE TABLE IF NOT EXISTS `ox_inventory`', r'CREATE TABLE IF NOT EXISTS `ox_doorlock`',
-        r'-- OX', r'\box_[a-z0-9_]+',
-        r'\bowned_keys\b', r'\bowned_doors\b',
-        r'\bdoorlock\b', r'\binventory\b',
-    ],
-    'qbx': [
-        r'\bqbx_', r'\bqbx\b', r'-- QBX', r'QBX',
-        r'ox_inventory', r'ox_doorlock', r'qbcore', r'qb_',
-    ],
-}
-
-BLACKLISTED_FILES = [
-    os.path.normpath('ox_doorlock/sql/default.sql'),
-    os.path.normpath('ox_doorlock/sql/community_mrpd.sql'),
-]
-WHITELISTED_FILES = [
-    os.path.normpath('ox_doorlock/sql/ox_doorlock.sql'),
-]
-
-def extract_mysql_url_from_cfg(cfg_path: Path) -> Optional[str]:
-    with cfg_path.open(encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            match = re.search(r'set\s+mysql_connection_string\s+(["\'])(.+?)\1', line)
-            if match:
-                url = match.group(2).strip()
-                return url
-            match2 = re.search(r'set\s+mysql_connection_string\s+([^\s#]+)', line)
-            if match2:
-                url = match2.group(1).strip()
-                return url
-    return None
-
-def parse_mysql_url(url: str):
-    from urllib.parse import urlparse, parse_qs
-    print(f"[DEBUG] Parsing DB URL: {url}")
-    parsed = urlparse(url)
-    print(f"[DEBUG] Parsed scheme: {parsed.scheme}")
-    if parsed.scheme == 'mysql':
-        user = parsed.username or 'root'
-        password = parsed.password or ''
-        host = parsed.hostname or 'localhost'
-        port = parsed.port or 3306
-        database = parsed.path.lstrip('/')
-        params = parse_qs(parsed.query)
-        charset = params.get('charset', ['utf8mb4'])[0]
-        return dict(user=user, password=password, host=host, port=port, database=database, charset=charset)
-    if ';' in url and '=' in url:
-        parts = [p.strip() for p in url.split(';') if p.strip()]
-        kv = dict()
-        for part in parts:
-            if '=' in part:
-                k, v = part.split('=', 1)
-                kv[k.strip().lower()] = v.strip()
-        user = kv.get('user', 'root')
-        password = kv.get('password', '')
-        host = kv.get('host', 'localhost')
-        port = int(kv.get('port', 3306))
-        database = kv.get('database', '')
-        charset = kv.get('charset', 'utf8mb4')
-        if not database:
-            raise ValueError(f"Database name missing in connection string: {url}")
-        return dict(user=user, password=password, host=host, port=port, database=database, charset=charset)
-    raise ValueError(f"Unsupported DB connection string format. Must be mysql://... or user=...;host=...;port=...;database=...; (got: {url})")
-
-def find_files(pattern: str, base: Path) -> List[Path]:
-    return list(base.rglob(pattern))
-
-def find_server_cfg_files(root: Path, max_levels_up: int = 2) -> List[Path]:
-    found = set()
-    current = root.resolve()
-    for _ in range(max_levels_up + 1):
-        found.update(find_files('server.cfg', current))
-        if current.parent == current:
-            break
-        current = current.parent
-    return list(found)
-
-def get_db_url(root: Path) -> Optional[str]:
-    load_dotenv()
-    env_url = os.getenv('DATABASE_URL')
-    if env_url:
-        return env_url
-    cfg_files = find_server_cfg_files(root)
-    for cfg in cfg_files:
-        url = extract_mysql_url_from_cfg(cfg)
-        if url:
-            return url
-    return None
-
-def detect_framework_for_file(sql_path: Path) -> Optional[str]:
-    name = sql_path.name.lower()
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            if re.search(r'only for esx|esx where|esx only|es_extended', content, re.IGNORECASE):
-                return 'esx'
-            if re.search(r'insert\s+(ignore\s+)?[`\"]?items[`\"]?', content, re.IGNORECASE):
-                return 'esx'
-            if re.search(r'create table if not exists [`\"]?items[`\"]?', content, re.IGNORECASE):
-                return 'esx'
-            if (name in ['items_limit.sql', 'items_weight.sql']) and ('esx' in content.lower()):
-                return 'esx'
-            for pat in FRAMEWORK_PATTERNS['esx']:
-                if re.search(pat, content, re.IGNORECASE):
-                    return 'esx'
-            for line in content.splitlines():
-                if 'database.items' in line.lower():
-                    return 'esx'
-    except Exception:
-        pass
-    if 'qbx' in name:
-        return 'qbx'
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            for pat in FRAMEWORK_PATTERNS['qbx']:
-                if re.search(pat, content, re.IGNORECASE):
-                    return 'qbx'
-    except Exception:
-        pass
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            qbcore_match = any(re.search(pat, content, re.IGNORECASE) for pat in FRAMEWORK_PATTERNS['qbcore'])
-            ox_match = any(re.search(pat, content, re.IGNORECASE) for pat in FRAMEWORK_PATTERNS['ox'])
-            if qbcore_match and ox_match:
-                return 'qbx'
-    except Exception:
-        pass
-    for fw, keywords in FRAMEWORKS.items():
-        if fw in ('other', 'qbx'):
-            continue
-        if any(kw in name for kw in keywords):
-            return fw
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            content = f.read(4096)
-            for fw, patterns in FRAMEWORK_PATTERNS.items():
-                if fw == 'qbx':
-                    continue
-                for pat in patterns:
-                    if re.search(pat, content, re.IGNORECASE):
-                        return fw
-    except Exception:
-        pass
-    return None
-
-def filter_sql_files(sql_files: List[Path], framework: str) -> List[Path]:
-    if framework == 'other':
-        filtered = sql_files
-    else:
-        my_keywords = FRAMEWORKS[framework]
-        other_keywords = [kw for fw, kws in FRAMEWORKS.items() if fw != framework and fw != 'other' for kw in kws]
-        filtered = []
-        for f in sql_files:
-            name = f.name.lower()
-            rel_path = os.path.normpath(str(f.relative_to(f.parents[len(f.parts)-2]))) if len(f.parts) > 1 else f.name
-            detected_fw = detect_framework_for_file(f)
-            if detected_fw == 'esx' and framework != 'esx':
-                continue
-            if detected_fw is None:
-                try:
-                    with f.open(encoding='utf-8', errors='ignore') as file_check:
-                        for line in file_check:
-                            if 'database.items' in line.lower() and framework != 'esx':
-                                print(f"[DEBUG] Filter: Skipping {f} (contains database.items, not ESX)")
-                                raise StopIteration
-                except StopIteration:
-                    continue
-                except Exception:
-                    pass
-            if detected_fw and detected_fw != framework:
-                continue
-            if any(kw in name for kw in other_keywords):
-                continue
-            if (
-                any(kw in name for kw in my_keywords)
-                or not any(kw in name for kw in sum(FRAMEWORKS.values(), []))
-                or detected_fw == framework
-                or detected_fw is None
-            ):
-                filtered.append(f)
-    filtered = [f for f in filtered if os.path.normpath(str(f.as_posix().lower())).replace('\\','/') not in [b.lower().replace('\\','/') for b in BLACKLISTED_FILES]]
-    whitelist_paths = [os.path.normpath(w.lower().replace('\\','/')) for w in WHITELISTED_FILES]
-    filtered_paths = set(os.path.normpath(str(f.as_posix().lower())).replace('\\','/') for f in filtered)
-    for f in sql_files:
-        rel_path = os.path.normpath(str(f.as_posix().lower())).replace('\\','/')
-        if rel_path in whitelist_paths and rel_path not in filtered_paths:
-            filtered.append(f)
-    return filtered
-
-def run_sql_file(sql_path: Path, conn) -> Optional[str]:
-    try:
-        with sql_path.open(encoding='utf-8', errors='ignore') as f:
-            sql = f.read()
-        cursor = conn.cursor()
-        for statement in filter(None, map(str.strip, sql.split(';'))):
-            if statement:
-                cursor.execute(statement)
-        conn.commit()
-        cursor.close()
+from PySide6.QtCore import Qt, QThread, QTimer, Signal, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PySide6.QtGui import QIcon, QFont, QColor
+from FDS_engine import EngineError, EngineOptions, execute, plan
+
+ROW_BATCH = 200
+ROW_FLUSH_SECONDS = 0.1
+
+class ResultsModel(QAbstractTableModel):
+    """Result rows of (file, framework, status, seconds, error), appended in batches as files finish."""
+    HEADERS = ["File", "Framework", "Status", "Time (s)", "Error"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.failed = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        value = row[index.column()]
+        if role == Qt.DisplayRole:
+            if index.column() == 3:
+                return "" if value is None else f"{value:.2f}"
+            return value
+        if role == Qt.UserRole:
+            # Sort key: numbers sort as numbers, skipped files (no time) first.
+            return -1.0 if index.column() == 3 and value is None else value
+        if role == Qt.ToolTipRole and index.column() in (0, 4):
+            return value
+        if role == Qt.ForegroundRole and row[2] == "Failed":
+            return QColor("#ff7b7b")
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
         return None
-    except Exception as e:
-        return str(e)
+
+    def append_rows(self, rows):
+        if not rows:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.rows.extend(rows)
+        self.failed += sum(1 for row in rows if row[2] == "Failed")
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.failed = 0
+        self.endResetModel()
 
 class SQLRunnerThread(QThread):
     progress = Signal(int)
     progress_status = Signal(str)
-    result = Signal(list)
+    rows = Signal(list)
+    result = Signal(int, int)
     error = Signal(str)
 
-    def __init__(self, root: Path, framework: str):
+    def __init__(self, root: Path, framework: str, jobs: int = 1, force: bool = False):
         super().__init__()
         self.root = root
         self.framework = framework
+        self.jobs = jobs
+        self.force = force
+        self._pending_rows = []
+        self._last_flush = 0.0
+        self._total = 0
+        self._failed = 0
+        # Skipped rows come from the scan loop while finished rows come from executor threads.
+        self._rows_lock = threading.Lock()
+
+    def _add_row(self, row, flush: bool = False):
+        with self._rows_lock:
+            self._pending_rows.append(row)
+            self._total += 1
+            self._failed += row[2] == "Failed"
+            now = time.monotonic()
+            if flush or len(self._pending_rows) >= ROW_BATCH or now - self._last_flush >= ROW_FLUSH_SECONDS:
+                self._flush_locked(now)
+
+    def _flush_rows(self):
+        with self._rows_lock:
+            self._flush_locked()
+
+    def _flush_locked(self, now: Optional[float] = None):
+        if self._pending_rows:
+            self.rows.emit(self._pending_rows)
+            self._pending_rows = []
+        self._last_flush = now or time.monotonic()
 
     def run(self):
         try:
             self.progress_status.emit("Searching for database connection...")
-            db_url = get_db_url(self.root)
-            if not db_url:
-                self.error.emit("Could not find a MySQL connection string in .env or any server.cfg.")
+            try:
+                server_plan = plan(self.root, self.framework, options=EngineOptions(jobs=self.jobs, force=self.force))
+            except EngineError as e:
+                self.error.emit(str(e))
                 return
-            
-            self.progress_status.emit("Parsing database configuration...")
-            db_cfg = parse_mysql_url(db_url)
-            
-            self.progress_status.emit("Scanning for SQL files...")
-            sql_files = find_files('*.sql', self.root)
-            sql_files = filter_sql_files(sql_files, self.framework)
-            if not sql_files:
-                self.error.emit("No relevant .sql files found for the selected framework.")
+            # Connecting, scanning and classifying overlap; files start running as soon as they are classified.
+            self.progress_status.emit("Scanning for SQL files and connecting to database...")
+
+            def on_finished(done, queued, sql_path, error, seconds, framework):
+                self._add_row((
+                    str(sql_path.relative_to(server_plan.root)), framework or "Generic",
+                    "Failed" if error else "Success", seconds, error or "",
+                ))
+                # The total grows while the tree is still being scanned.
+                self.progress_status.emit(f"Processed {sql_path.name} ({done}/{queued})")
+                self.progress.emit(int(done/queued*100))
+
+            result = execute(server_plan, on_finished=on_finished)
+            if result.error:
+                self.error.emit(result.error)
                 return
-            
-            self.progress_status.emit("Connecting to database...")
-            try:
-                conn = mysql.connector.connect(
-                    user=db_cfg['user'],
-                    password=db_cfg['password'],
-                    host=db_cfg['host'],
-                    port=db_cfg['port'],
-                    database=db_cfg['database'],
-                    charset=db_cfg['charset'],
-                    autocommit=False
-                )
-            except Exception as e:
-                self.error.emit(f"Database connection failed: {e}")
+            if not server_plan.found:
+                self.error.emit("No relevant .sql files found for the selected framework.")
                 return
-            
-            results = []
-            total_files = len(sql_files)
-            for i, sql_path in enumerate(sql_files):
-                filename = sql_path.name
-                self.progress_status.emit(f"Processing {filename} ({i+1}/{total_files})")
-                error = run_sql_file(sql_path, conn)
-                results.append((str(sql_path.relative_to(self.root)), error is None, error or ""))
-                self.progress.emit(int((i+1)/total_files*100))
-            
-            self.progress_status.emit("Finalizing and closing connection...")
-            conn.close()
-            self.result.emit(results)
+            for sql_path, _, framework in server_plan.unchanged:
+                self._add_row((str(sql_path.relative_to(server_plan.root)), framework or "Generic", "Skipped", None, "Unchanged since last apply"))
+            self._flush_rows()
+            if result.statements_skipped:
+                self.progress_status.emit(f"Skipped {result.statements_skipped} already-applied schema statement(s). Finalizing...")
+            else:
+                self.progress_status.emit("Finalizing and closing connection...")
+            self.result.emit(self._total, self._failed)
         except Exception as e:
             self.error.emit(str(e))
 
@@ -345,8 +175,22 @@ class MainWindow(QWidget):
         self.fw_combo.addItem("Other (run all)", 'other')
         self.fw_combo.setToolTip("Choose your server's framework. Only relevant SQL files will be run.")
         self.fw_combo.setStyleSheet("font-size: 16px; padding: 8px 24px; border-radius: 16px; background: #232323; color: #e0e0e0; min-width: 220px; max-width: 320px; border: 1.5px solid #3a4d3c;")
+        jobs_label = QLabel("Parallel jobs:")
+        jobs_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        jobs_label.setStyleSheet("font-size: 15px; font-weight: 600; background: #232323; border-radius: 12px; padding: 8px 16px; margin-left: 10px; color: #b2ffcc;")
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, 16)
+        self.jobs_spin.setValue(1)
+        self.jobs_spin.setToolTip("Run SQL files that do not share tables in parallel on this many database connections.")
+        self.jobs_spin.setStyleSheet("font-size: 16px; padding: 8px 16px; border-radius: 16px; background: #232323; color: #e0e0e0; border: 1.5px solid #3a4d3c;")
         fw_layout.addWidget(fw_label)
         fw_layout.addWidget(self.fw_combo)
+        fw_layout.addWidget(jobs_label)
+        fw_layout.addWidget(self.jobs_spin)
+        self.force_check = QCheckBox("Re-run unchanged files")
+        self.force_check.setToolTip("Also run files that the fds_applied table records as already applied with the same checksum.")
+        self.force_check.setStyleSheet("font-size: 15px; margin-left: 10px; color: #b2ffcc;")
+        fw_layout.addWidget(self.force_check)
         fw_group.setLayout(fw_layout)
         main_layout.addWidget(fw_group)
 
@@ -416,12 +260,30 @@ class MainWindow(QWidget):
         main_layout.addWidget(progress_group)
         self.progress_group = progress_group
 
-        self.table = QTableWidget(0, 4)
-        self.table.setHorizontalHeaderLabels(["File", "Framework", "Status", "Error"])
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter results (file, framework, status or error)...")
+        self.filter_edit.setStyleSheet("font-size: 15px; padding: 8px 18px; border-radius: 14px; background: #232323; color: #e0e0e0; border: 1.5px solid #3a4d3c;")
+        self.filter_edit.setVisible(False)
+        main_layout.addWidget(self.filter_edit)
+
+        self.results_model = ResultsModel(self)
+        self.results_proxy = QSortFilterProxyModel(self)
+        self.results_proxy.setSourceModel(self.results_model)
+        self.results_proxy.setSortRole(Qt.UserRole)
+        self.results_proxy.setFilterKeyColumn(-1)
+        self.results_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.filter_edit.textChanged.connect(self.results_proxy.setFilterFixedString)
+
+        self.table = QTableView()
+        self.table.setModel(self.results_proxy)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(-1, Qt.AscendingOrder)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setVisible(False)
         self.table.setVisible(False)
         self.table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.table.setStyleSheet("QTableWidget { background: #181818; color: #fff; font-size: 16px; border-radius: 18px; } QHeaderView::section { background: #202c24; color: #6fcf97; font-weight: bold; font-size: 16px; border-radius: 18px; } QTableWidget::item { border-radius: 12px; }")
+        self.table.setStyleSheet("QTableView { background: #181818; color: #fff; font-size: 16px; border-radius: 18px; } QHeaderView::section { background: #202c24; color: #6fcf97; font-weight: bold; font-size: 16px; border-radius: 18px; } QTableView::item { border-radius: 12px; }")
         main_layout.addWidget(self.table)
 
         main_layout.addSpacerItem(QSpacerItem(20, 50, QSizePolicy.Minimum, QSizePolicy.Expanding))
@@ -461,30 +323,23 @@ class MainWindow(QWidget):
         self.progress.setValue(0)
         self.progress_group.setVisible(True)
         self.progress_status.setText("Initializing...")
-        self.table.setRowCount(0)
-        self.table.setVisible(False)
+        self.results_model.clear()
+        self.filter_edit.clear()
+        self.filter_edit.setVisible(True)
+        self.table.setVisible(True)
         self.run_btn.setEnabled(False)
-        self.runner_thread = SQLRunnerThread(self.root_path, framework)
+        self.runner_thread = SQLRunnerThread(self.root_path, framework, self.jobs_spin.value(), self.force_check.isChecked())
         self.runner_thread.progress.connect(self.progress.setValue)
         self.runner_thread.progress_status.connect(self.progress_status.setText)
+        self.runner_thread.rows.connect(self.results_model.append_rows)
         self.runner_thread.result.connect(self.show_results)
         self.runner_thread.error.connect(self.show_error)
         self.runner_thread.start()
 
-    def show_results(self, results):
+    def show_results(self, total, n_fail):
         self.progress_group.setVisible(False)
         self.progress_status.setText("Ready to process SQL files...")
-        self.table.setRowCount(len(results))
-        for i, (file, ok, err) in enumerate(results):
-            file_path = self.root_path / file
-            detected_fw = detect_framework_for_file(file_path)
-            self.table.setItem(i, 0, QTableWidgetItem(file))
-            self.table.setItem(i, 1, QTableWidgetItem(detected_fw if detected_fw else "Generic"))
-            self.table.setItem(i, 2, QTableWidgetItem("Success" if ok else "Failed"))
-            self.table.setItem(i, 3, QTableWidgetItem(err))
-        self.table.setVisible(True)
         self.run_btn.setEnabled(True)
-        n_fail = sum(1 for _, ok, _ in results if not ok)
         if n_fail:
             QMessageBox.warning(self, "SQL Runner", f"{n_fail} file(s) failed. See table for details.")
         else:
@@ -500,4 +355,7 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec()) 
+    if '--startup-probe' in sys.argv:
+        # Used by FDS_bench.py startup: quit as soon as the first frame has been painted.
+        QTimer.singleShot(0, app.quit)
+    sys.exit(app.exec())
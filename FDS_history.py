@@ -0,0 +1,171 @@
+import heapq
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from FDS_sql import iter_sql_statements
+
+HISTORY_FILENAME = '.fds_history.sqlite'
+# INSERT/REPLACE cost grows with the rows they carry, so they are modelled per byte; every
+# other kind per statement.
+BYTE_KINDS = ('insert', 'replace')
+# Seconds per byte (BYTE_KINDS) or per statement, used until runs have been recorded.
+DEFAULT_COSTS = {
+    'insert': 1 / (4 << 20),
+    'replace': 1 / (4 << 20),
+    'update': 0.005,
+    'delete': 0.005,
+    'create': 0.02,
+    'alter': 0.05,
+    'drop': 0.01,
+    'other': 0.001,
+}
+# Weight left on earlier records each time a file is folded into the per-kind model.
+DECAY = 0.8
+
+_KIND = re.compile(r'(?:\s+|--[^\n]*(?:\n|$)|#[^\n]*(?:\n|$)|/\*.*?\*/)*([A-Za-z]+)', re.DOTALL)
+
+
+def statement_kind(statement: str) -> str:
+    """insert, replace, update, delete, create, alter, drop or other, from the leading keyword."""
+    m = _KIND.match(statement)
+    kind = m.group(1).lower() if m else 'other'
+    return kind if kind in DEFAULT_COSTS else 'other'
+
+
+class StatementProfile:
+    """Statement and byte counts of one file per statement kind."""
+
+    def __init__(self):
+        self.kinds: Dict[str, List[int]] = {}
+
+    def add(self, statement: str):
+        counts = self.kinds.setdefault(statement_kind(statement), [0, 0])
+        counts[0] += 1
+        counts[1] += len(statement.encode('utf-8'))
+
+    def count(self, statements: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """Pass (index, statement) pairs through, counting each one."""
+        for index, statement in statements:
+            self.add(statement)
+            yield index, statement
+
+    def reset(self):
+        self.kinds = {}
+
+    @property
+    def statements(self) -> int:
+        return sum(n for n, _ in self.kinds.values())
+
+    @property
+    def bytes(self) -> int:
+        return sum(size for _, size in self.kinds.values())
+
+    def units(self, kind: str) -> int:
+        """What kind is costed by: its bytes for BYTE_KINDS, otherwise its statement count."""
+        n, size = self.kinds.get(kind, (0, 0))
+        return size if kind in BYTE_KINDS else n
+
+    def to_dict(self) -> Dict:
+        return {kind: dict(statements=n, bytes=size) for kind, (n, size) in sorted(self.kinds.items())}
+
+
+def profile_sql_file(sql_path: Path) -> StatementProfile:
+    profile = StatementProfile()
+    for statement in iter_sql_statements(sql_path):
+        profile.add(statement)
+    return profile
+
+
+class ThroughputModel:
+    """Seconds per unit for each statement kind, learned from recorded runs where there are any."""
+
+    def __init__(self, learned: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.costs = dict(DEFAULT_COSTS)
+        self.learned = set()
+        for kind, (units, seconds) in (learned or {}).items():
+            if kind in self.costs and units > 0:
+                self.costs[kind] = seconds / units
+                self.learned.add(kind)
+
+    def shares(self, profile: StatementProfile) -> Dict[str, float]:
+        return {kind: profile.units(kind) * self.costs[kind] for kind in profile.kinds}
+
+    def estimate(self, profile: StatementProfile) -> Tuple[float, str]:
+        """(seconds, source); source is 'model' when every kind in the file has been learned, else 'default'."""
+        source = 'model' if profile.kinds and set(profile.kinds) <= self.learned else 'default'
+        return sum(self.shares(profile).values()), source
+
+
+class RunHistory:
+    """Timings of earlier runs, kept in .fds_history.sqlite next to the classification cache.
+
+    Each successful file keeps the seconds it took for its last checksum, and is also
+    folded into a per-kind model: its time is split over its statement kinds in proportion
+    to what the current model predicts for them, and earlier records decay by DECAY.
+    Use it from one thread. A read_only history (used by dry runs) must already exist and
+    cannot record.
+    """
+
+    def __init__(self, history_dir: Path, read_only: bool = False):
+        self.path = history_dir / HISTORY_FILENAME
+        self.read_only = read_only
+        if read_only:
+            self._db = sqlite3.connect(f'{self.path.resolve().as_uri()}?mode=ro', uri=True)
+        else:
+            self._db = sqlite3.connect(str(self.path))
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, checksum TEXT, seconds REAL, statements INTEGER, bytes INTEGER, recorded_at REAL)'
+            )
+            self._db.execute('CREATE TABLE IF NOT EXISTS kinds (kind TEXT PRIMARY KEY, units REAL, seconds REAL)')
+        self.files = {
+            path: dict(checksum=checksum, seconds=seconds, statements=statements, bytes=size, recorded_at=recorded_at)
+            for path, checksum, seconds, statements, size, recorded_at in self._db.execute('SELECT * FROM files')
+        }
+        self.kinds = {kind: (units, seconds) for kind, units, seconds in self._db.execute('SELECT * FROM kinds')}
+        self.model = ThroughputModel(self.kinds)
+
+    def estimate(self, rel_path: str, checksum: str, profile: StatementProfile) -> Tuple[float, str]:
+        """(seconds, source) for a file: 'history' for a recorded checksum, 'history-scaled' by
+        bytes for a file that has changed since, else the throughput model."""
+        previous = self.files.get(rel_path)
+        if previous and previous['checksum'] == checksum:
+            return previous['seconds'], 'history'
+        if previous and previous['bytes']:
+            return previous['seconds'] * profile.bytes / previous['bytes'], 'history-scaled'
+        return self.model.estimate(profile)
+
+    def record(self, rel_path: str, checksum: str, seconds: float, profile: StatementProfile):
+        now = time.time()
+        self.files[rel_path] = dict(checksum=checksum, seconds=seconds, statements=profile.statements,
+                                    bytes=profile.bytes, recorded_at=now)
+        self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                         (rel_path, checksum, seconds, profile.statements, profile.bytes, now))
+        shares = self.model.shares(profile)
+        predicted = sum(shares.values())
+        if predicted <= 0:
+            return
+        for kind, share in shares.items():
+            units, kind_seconds = self.kinds.get(kind, (0.0, 0.0))
+            self.kinds[kind] = (units * DECAY + profile.units(kind), kind_seconds * DECAY + seconds * share / predicted)
+        self._db.executemany('INSERT OR REPLACE INTO kinds VALUES (?, ?, ?)',
+                             [(kind, units, kind_seconds) for kind, (units, kind_seconds) in self.kinds.items()])
+
+    def close(self):
+        if not self.read_only:
+            self._db.commit()
+        self._db.close()
+
+
+def schedule(seconds: Iterable[float], jobs: int) -> float:
+    """Wall time for running durations in order on jobs connections, each taking the next free one.
+
+    Dependencies between files are ignored, so this is a lower bound for jobs > 1.
+    """
+    free = [0.0] * max(1, jobs)
+    for took in seconds:
+        heapq.heappush(free, heapq.heappop(free) + took)
+    return max(free)
@@ -0,0 +1,97 @@
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LEDGER_TABLE = 'fds_applied'
+CHECKPOINT_TABLE = 'fds_checkpoints'
+HASH_CHUNK = 1 << 20
+
+
+def file_checksum(sql_path: Path) -> str:
+    digest = hashlib.sha256()
+    with sql_path.open('rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AppliedLedger:
+    """The fds_applied table: one row per applied .sql file, keyed by its path relative to the server root.
+
+    fds_checkpoints holds the statement a partly committed file resumes at; its row is
+    written in the same transaction as the statements it covers and removed by record().
+    """
+
+    def __init__(self, conn):
+        cursor = conn.cursor()
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS `{LEDGER_TABLE}` ("
+            "`path` VARCHAR(512) NOT NULL PRIMARY KEY, "
+            "`checksum` CHAR(64) NOT NULL, "
+            "`framework` VARCHAR(16) NOT NULL, "
+            "`duration_ms` INT NOT NULL, "
+            "`applied_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+            ") DEFAULT CHARSET=utf8mb4"
+        )
+        cursor.execute(f"SELECT `path`, `checksum` FROM `{LEDGER_TABLE}`")
+        self.applied: Dict[str, str] = dict(cursor.fetchall())
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS `{CHECKPOINT_TABLE}` ("
+            "`path` VARCHAR(512) NOT NULL PRIMARY KEY, "
+            "`checksum` CHAR(64) NOT NULL, "
+            "`resume_at` INT NOT NULL, "
+            "`updated_at` TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"
+            ") DEFAULT CHARSET=utf8mb4"
+        )
+        cursor.execute(f"SELECT `path`, `checksum`, `resume_at` FROM `{CHECKPOINT_TABLE}`")
+        self.checkpoints: Dict[str, Tuple[str, int]] = {path: (checksum, resume_at) for path, checksum, resume_at in cursor.fetchall()}
+        cursor.close()
+
+    def status(self, rel_path: str, checksum: str) -> str:
+        """'new', 'unchanged' or 'modified' compared to the last successful apply."""
+        previous = self.applied.get(rel_path)
+        if previous is None:
+            return 'new'
+        return 'unchanged' if previous == checksum else 'modified'
+
+    def partition(self, files: List[Tuple[Path, str, str]]) -> Tuple[List[Tuple[Path, str, str]], List[Tuple[Path, str, str]]]:
+        """Split (path, rel_path, checksum) entries into files to run and unchanged files to skip."""
+        to_run, unchanged = [], []
+        for entry in files:
+            (unchanged if self.status(entry[1], entry[2]) == 'unchanged' else to_run).append(entry)
+        return to_run, unchanged
+
+    def resume_at(self, rel_path: str, checksum: str) -> int:
+        """1-based statement index to start rel_path at; 1 unless an unchanged file was partly committed."""
+        saved = self.checkpoints.get(rel_path)
+        return saved[1] if saved and saved[0] == checksum else 1
+
+    def save_checkpoint(self, conn, rel_path: str, checksum: str, resume_at: int):
+        """Write the checkpoint into conn's open transaction; the caller commits it with the statements it covers."""
+        cursor = conn.cursor()
+        cursor.execute(
+            f"REPLACE INTO `{CHECKPOINT_TABLE}` (`path`, `checksum`, `resume_at`) VALUES (%s, %s, %s)",
+            (rel_path, checksum, resume_at),
+        )
+        cursor.close()
+        self.checkpoints[rel_path] = (checksum, resume_at)
+
+    def record(self, conn, rel_path: str, checksum: str, framework: str, duration: float,
+               commit: bool = True) -> Optional[str]:
+        """commit=False leaves the row in the caller's open transaction, e.g. a group of files."""
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"REPLACE INTO `{LEDGER_TABLE}` (`path`, `checksum`, `framework`, `duration_ms`) VALUES (%s, %s, %s, %s)",
+                (rel_path, checksum, framework, int(duration * 1000)),
+            )
+            if rel_path in self.checkpoints:
+                cursor.execute(f"DELETE FROM `{CHECKPOINT_TABLE}` WHERE `path` = %s", (rel_path,))
+            if commit:
+                conn.commit()
+            cursor.close()
+        except Exception as e:
+            return str(e)
+        self.applied[rel_path] = checksum
+        self.checkpoints.pop(rel_path, None)
+        return None
@@ -0,0 +1,106 @@
+import queue
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+PIPELINE_QUEUE = 256
+_PUT_TIMEOUT = 0.1
+
+T = TypeVar('T')
+
+
+class _Finished:
+    def __init__(self, error: BaseException = None):
+        self.error = error
+
+
+class _Stage(Iterator[T]):
+    """The consumer end of a threaded() stage. Closing it, or dropping it, stops the producer,
+    even before the first item was taken."""
+
+    def __init__(self, items: Iterator[T], stop: threading.Event):
+        self._items = items
+        self._stop = stop
+        weakref.finalize(self, stop.set)
+
+    def __next__(self) -> T:
+        return next(self._items)
+
+    def close(self):
+        self._stop.set()
+        self._items.close()
+
+
+def threaded(items: Iterable[T], maxsize: int = PIPELINE_QUEUE, name: str = 'fds-stage') -> Iterator[T]:
+    """Iterate items on a worker thread and hand them over through a bounded queue.
+
+    Chaining threaded() calls turns generator stages (scan, classify, ...) into a pipeline
+    whose stages overlap; a full queue makes a fast producer wait for its consumer. An
+    exception in the producer is re-raised in the consumer, and closing the returned
+    iterator early (or dropping it) stops the producer, which then closes items.
+    """
+    handoff = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    # Stopped by the consumer: let an upstream threaded() stage stop too.
+                    close = getattr(items, 'close', None)
+                    if close:
+                        close()
+                    return
+        except BaseException as e:
+            put(_Finished(e))
+            return
+        put(_Finished())
+
+    worker = threading.Thread(target=produce, name=name, daemon=True)
+    worker.start()
+
+    def consume() -> Iterator[T]:
+        try:
+            while True:
+                item = handoff.get()
+                if isinstance(item, _Finished):
+                    if item.error is not None:
+                        raise item.error
+                    return
+                yield item
+        finally:
+            stop.set()
+
+    return _Stage(consume(), stop)
+
+
+def completed(value: Any) -> Future:
+    """A future that already holds value, for callers that expect in_background()'s."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def in_background(fn: Callable[..., Any], *args, name: str = 'fds-background') -> Future:
+    """Start fn(*args) on its own thread; the returned future holds its result or exception."""
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+SLOWEST_STATEMENTS = 10
+SNIPPET_CHARS = 120
+METRIC_PREFIX = 'fds'
+
+
+def _snippet(statement: str) -> str:
+    return ' '.join(statement[:SNIPPET_CHARS * 2].split())[:SNIPPET_CHARS]
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class FileTiming:
+    """Timings for one .sql file; statement() is the execute_statements hook."""
+
+    def __init__(self, report: 'RunReport', path: str, framework: str):
+        self._report = report
+        self.path = path
+        self.framework = framework
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds = 0.0
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.rows = 0
+        self.bytes_sent = 0
+        self.prepared_executions = 0
+        self.prepared_seconds_saved = 0.0
+        self.prepared_bytes_saved = 0
+        self.bulk_loads = 0
+        self.bulk_rows = 0
+        self.bulk_fallbacks = 0
+        self.error: Optional[str] = None
+        self.slowest: List[Dict] = []
+
+    def statement(self, index: int, statement: str, seconds: float, rows: int):
+        size = len(statement.encode('utf-8'))
+        self.statements += 1
+        self.statement_seconds += seconds
+        self.rows += max(rows, 0)
+        self.bytes_sent += size
+        slow = len(self.slowest) < SLOWEST_STATEMENTS or seconds > self.slowest[-1]['seconds']
+        if not slow and not self._report.statement_events:
+            return
+        entry = dict(index=index, seconds=round(seconds, 6), rows=rows, bytes=size, sql=_snippet(statement))
+        if self._report.statement_events:
+            self._report.write_event(dict(event='statement', path=self.path, **entry))
+        if slow:
+            self.slowest.append(entry)
+            self.slowest.sort(key=lambda s: -s['seconds'])
+            del self.slowest[SLOWEST_STATEMENTS:]
+
+    def add_prepared(self, prepared):
+        """Take over a file's PreparedInserts counters."""
+        self.prepared_executions = prepared.executions
+        self.prepared_seconds_saved = prepared.seconds_saved
+        self.prepared_bytes_saved = prepared.bytes_saved
+
+    def add_bulk(self, bulk):
+        """Take over a file's BulkLoader counters."""
+        self.bulk_loads = bulk.loads
+        self.bulk_rows = bulk.rows
+        self.bulk_fallbacks = bulk.fallbacks
+
+    def to_dict(self) -> Dict:
+        return dict(
+            path=self.path, framework=self.framework, ok=self.error is None, error=self.error,
+            seconds=round(self.seconds, 6), statements=self.statements,
+            statement_seconds=round(self.statement_seconds, 6), rows=self.rows, bytes_sent=self.bytes_sent,
+            prepared_executions=self.prepared_executions, prepared_seconds_saved=round(self.prepared_seconds_saved, 6),
+            prepared_bytes_saved=self.prepared_bytes_saved, bulk_loads=self.bulk_loads, bulk_rows=self.bulk_rows,
+            bulk_fallbacks=self.bulk_fallbacks, slowest=self.slowest,
+        )
+
+
+class RunReport:
+    """Collects connect time, per-file wall time and per-statement latency for one run.
+
+    write() produces a JSON document, or NDJSON (one event per line, including every
+    statement) when the path ends in .ndjson/.jsonl. write_prometheus() renders the
+    totals for the node-exporter textfile collector. The NDJSON file is opened on the first
+    event; if it cannot be opened or written, events stop and write() raises that error.
+    """
+
+    def __init__(self, framework: str, root: str, path: Optional[str] = None):
+        self.framework = framework
+        self.root = root
+        self.path = path
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds = 0.0
+        self.connects: List[float] = []
+        self.files: List[FileTiming] = []
+        self.skipped = 0
+        self.connector: Optional[str] = None
+        self._lock = threading.Lock()
+        self._events = None
+        self._events_error: Optional[OSError] = None
+        self.statement_events = bool(path) and path.endswith(('.ndjson', '.jsonl'))
+        if self.statement_events:
+            self.write_event(dict(event='run_started', framework=framework, root=root, started=self.started))
+
+    def write_event(self, event: Dict):
+        with self._lock:
+            if not self.statement_events:
+                return
+            try:
+                if self._events is None:
+                    self._events = open(self.path, 'w', encoding='utf-8')
+                self._events.write(json.dumps(event) + '\n')
+            except OSError as e:
+                self._events_error = e
+                self.statement_events = False
+                if self._events:
+                    self._events.close()
+                    self._events = None
+
+    def connected(self, seconds: float):
+        with self._lock:
+            self.connects.append(seconds)
+        if self.statement_events:
+            self.write_event(dict(event='connect', seconds=round(seconds, 6)))
+
+    def start_file(self, path: str, framework: Optional[str] = None) -> FileTiming:
+        return FileTiming(self, path, framework or self.framework)
+
+    def finish_file(self, timing: FileTiming, error: Optional[str]):
+        timing.seconds = time.perf_counter() - timing._start
+        timing.error = error
+        with self._lock:
+            self.files.append(timing)
+        if self.statement_events:
+            self.write_event(dict(event='file', **timing.to_dict()))
+
+    def totals(self) -> Dict:
+        files = self.files
+        return dict(
+            framework=self.framework, root=self.root, started=self.started, seconds=round(self.seconds, 6),
+            connect_seconds=round(sum(self.connects), 6), connections=len(self.connects),
+            files=len(files), files_failed=sum(1 for f in files if f.error), files_skipped=self.skipped,
+            statements=sum(f.statements for f in files), rows=sum(f.rows for f in files),
+            bytes_sent=sum(f.bytes_sent for f in files), connector=self.connector,
+            prepared_executions=sum(f.prepared_executions for f in files),
+            prepared_seconds_saved=round(sum(f.prepared_seconds_saved for f in files), 6),
+            prepared_bytes_saved=sum(f.prepared_bytes_saved for f in files),
+            bulk_loads=sum(f.bulk_loads for f in files), bulk_rows=sum(f.bulk_rows for f in files),
+            bulk_fallbacks=sum(f.bulk_fallbacks for f in files),
+        )
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+        self.files.sort(key=lambda f: f.path)
+
+    def write(self):
+        """Write the report to self.path (no-op when there is none)."""
+        if self.statement_events:
+            self.write_event(dict(event='run_finished', **self.totals()))
+            self.statement_events = False
+        if self._events:
+            self._events.close()
+            self._events = None
+        if self._events_error:
+            raise self._events_error
+        if self.path and not self.path.endswith(('.ndjson', '.jsonl')):
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(dict(self.totals(), file_timings=[t.to_dict() for t in self.files]), f, indent=2)
+
+    def write_prometheus(self, textfile: str):
+        """Atomically replace textfile so node-exporter never reads a half-written file."""
+        totals = self.totals()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_label(str(v))}"' for k, v in labels.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{METRIC_PREFIX}_{name} {value}")
+
+        base = dict(framework=self.framework)
+        metric('last_run_timestamp_seconds', 'gauge', "Unix time the last run started.", [(base, round(self.started, 3))])
+        metric('run_duration_seconds', 'gauge', "Wall time of the last run.", [(base, totals['seconds'])])
+        metric('run_success', 'gauge', "1 if every file of the last run succeeded.", [(base, int(not totals['files_failed']))])
+        metric('connect_duration_seconds', 'gauge', "Total time spent opening database connections.", [(base, totals['connect_seconds'])])
+        metric('files', 'gauge', "Files in the last run by outcome.", [
+            (dict(base, status='ok'), totals['files'] - totals['files_failed']),
+            (dict(base, status='failed'), totals['files_failed']),
+            (dict(base, status='skipped'), totals['files_skipped']),
+        ])
+        metric('statements', 'gauge', "Statements executed in the last run.", [(base, totals['statements'])])
+        metric('rows_affected', 'gauge', "Rows affected in the last run.", [(base, totals['rows'])])
+        metric('bytes_sent', 'gauge', "SQL bytes sent in the last run.", [(base, totals['bytes_sent'])])
+        metric('prepared_executions', 'gauge', "Prepared-statement executions in the last run.",
+               [(base, totals['prepared_executions'])])
+        metric('prepared_seconds_saved', 'gauge', "Estimated statement time saved by prepared statements in the last run.",
+               [(base, totals['prepared_seconds_saved'])])
+        metric('prepared_bytes_saved', 'gauge', "SQL text bytes not sent thanks to prepared statements in the last run.",
+               [(base, totals['prepared_bytes_saved'])])
+        metric('bulk_loads', 'gauge', "LOAD DATA LOCAL INFILE statements in the last run.", [(base, totals['bulk_loads'])])
+        metric('bulk_rows', 'gauge', "Rows loaded with LOAD DATA LOCAL INFILE in the last run.", [(base, totals['bulk_rows'])])
+        metric('bulk_fallbacks', 'gauge', "Bulk loads replayed as INSERTs because local infile was refused.",
+               [(base, totals['bulk_fallbacks'])])
+        metric('file_duration_seconds', 'gauge', "Wall time per file in the last run.",
+               [(dict(base, path=t.path), round(t.seconds, 6)) for t in self.files])
+        tmp = f"{textfile}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, textfile)
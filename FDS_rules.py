@@ -0,0 +1,133 @@
+import re
+from fnmatch import translate
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+RULES_FILENAME = '.fdsrules'
+SECTIONS = ('blacklist', 'whitelist')
+
+
+def normalize_rule_path(path: str) -> str:
+    """Lower-case, forward slashes, no leading './' or '/', no duplicate separators."""
+    parts = [p for p in path.replace('\\', '/').lower().split('/') if p and p != '.']
+    return '/'.join(parts)
+
+
+def load_rules_file(path: Path) -> Tuple[List[str], List[str]]:
+    """Read [blacklist] and [whitelist] entries (one path or glob per line, '#' comments)."""
+    found = {section: [] for section in SECTIONS}
+    section = 'blacklist'
+    with path.open(encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                section = line[1:-1].strip().lower()
+                if section not in found:
+                    raise ValueError(f"{path}: unknown section [{section}], expected [blacklist] or [whitelist]")
+                continue
+            found[section].append(line)
+    return found['blacklist'], found['whitelist']
+
+
+class PathRules:
+    """A set of path rules matched against the trailing components of a file path.
+
+    Plain entries (``ox_doorlock/sql/default.sql`` or just ``default.sql``) go into a set
+    and match when they equal the path or one of its component-wise suffixes, so the same
+    rule works whether files are listed relative to the server root or as absolute paths.
+    Entries with ``*`` or ``?`` are folded into one compiled regex anchored at a component
+    boundary; ``[`` stays literal because FiveM category folders are named ``[core]``.
+    Matching costs a few set lookups and one regex search per file, no matter how many
+    rules there are.
+    """
+
+    def __init__(self, entries: Iterable[str]):
+        self.paths = set()
+        globs = []
+        for entry in entries:
+            entry = normalize_rule_path(entry)
+            if not entry:
+                continue
+            if '*' in entry or '?' in entry:
+                globs.append(translate(entry.replace('[', '[[]')))
+            else:
+                self.paths.add(entry)
+        self.depth = max((p.count('/') + 1 for p in self.paths), default=0)
+        self.glob = re.compile('(?:^|/)(?:' + '|'.join(globs) + ')') if globs else None
+
+    def __bool__(self) -> bool:
+        return bool(self.paths or self.glob)
+
+    def matches(self, path: str) -> bool:
+        """path must already be normalized with normalize_rule_path()."""
+        if self.paths:
+            start = len(path)
+            for _ in range(self.depth):
+                start = path.rfind('/', 0, start)
+                if path[start + 1:] in self.paths:
+                    return True
+                if start == -1:
+                    break
+        return bool(self.glob and self.glob.search(path))
+
+
+class RuleSet:
+    """Blacklist and whitelist rules, built once per run."""
+
+    def __init__(self, blacklist: Iterable[str] = (), whitelist: Iterable[str] = ()):
+        self.blacklist = PathRules(blacklist)
+        self.whitelist = PathRules(whitelist)
+
+    @classmethod
+    def load(cls, blacklist: Iterable[str], whitelist: Iterable[str], rules_file: Optional[Path] = None) -> 'RuleSet':
+        """Built-in lists plus the entries of rules_file, if it exists."""
+        blacklist, whitelist = list(blacklist), list(whitelist)
+        if rules_file is not None and rules_file.is_file():
+            extra_black, extra_white = load_rules_file(rules_file)
+            blacklist += extra_black
+            whitelist += extra_white
+        return cls(blacklist, whitelist)
+
+    def iter_apply(self, decisions: Iterable[Tuple[Path, bool]]) -> Iterator[Path]:
+        """Streaming apply() over (path, kept) pairs in scan order.
+
+        Kept files that are not blacklisted are yielded as they arrive; whitelisted files
+        that were dropped are held back and yielded at the end, as apply() appends them.
+        """
+        yielded = set()
+        held_back = []
+        for f, kept in decisions:
+            path = None
+            if kept:
+                path = normalize_rule_path(f.as_posix())
+                if not self.blacklist or not self.blacklist.matches(path):
+                    yielded.add(f)
+                    yield f
+                    continue
+            if self.whitelist:
+                if path is None:
+                    path = normalize_rule_path(f.as_posix())
+                if self.whitelist.matches(path):
+                    held_back.append(f)
+        for f in held_back:
+            if f not in yielded:
+                yielded.add(f)
+                yield f
+
+    def explain(self, f: Path, kept: bool) -> str:
+        """The decision iter_apply() makes for f: 'kept', 'blacklisted', 'whitelisted' (run last) or 'filtered'."""
+        path = normalize_rule_path(f.as_posix())
+        if kept and not (self.blacklist and self.blacklist.matches(path)):
+            return 'kept'
+        if self.whitelist and self.whitelist.matches(path):
+            return 'whitelisted'
+        return 'blacklisted' if kept else 'filtered'
+
+    def apply(self, sql_files: List[Path], kept: List[Path]) -> List[Path]:
+        """Drop blacklisted files from kept, then add back whitelisted files from sql_files."""
+        if not self.blacklist and not self.whitelist:
+            return kept
+        kept_set = set(kept)
+        return list(self.iter_apply((f, f in kept_set) for f in sql_files))
@@ -0,0 +1,201 @@
+import fnmatch
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Directory names that never contain resource SQL but can hold huge numbers of files.
+DEFAULT_EXCLUDES = [
+    '.git', '.svn', '.hg', 'node_modules', '__pycache__',
+    'cache', 'txData', 'stream', 'backups', 'logs',
+]
+IGNORE_FILENAME = '.fdsignore'
+SCAN_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+FANOUT_LEVELS = 3
+
+
+def load_ignore_file(root: Path) -> List[str]:
+    """Read glob patterns from <root>/.fdsignore (one per line, '#' comments)."""
+    ignore_path = root / IGNORE_FILENAME
+    try:
+        with ignore_path.open(encoding='utf-8', errors='ignore') as f:
+            lines = [line.strip() for line in f]
+    except OSError:
+        return []
+    return [line.rstrip('/') for line in lines if line and not line.startswith('#')]
+
+
+class _Pruner:
+    def __init__(self, root: str, excludes: Iterable[str]):
+        self.root = root
+        self.names = set()
+        self.globs = []
+        for pattern in excludes:
+            pattern = pattern.replace('\\', '/').strip('/')
+            if any(ch in pattern for ch in '*?[') or '/' in pattern:
+                self.globs.append(pattern)
+            else:
+                self.names.add(pattern)
+
+    def excluded(self, name: str, path: str) -> bool:
+        if name in self.names:
+            return True
+        if self.globs:
+            rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+            return any(fnmatch.fnmatch(name, g) or fnmatch.fnmatch(rel, g) for g in self.globs)
+        return False
+
+
+def _list_dir(current: str, pattern: str, pruner: _Pruner, level: int, max_depth: Optional[int]):
+    files, subdirs = [], []
+    try:
+        with os.scandir(current) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except OSError:
+        return files, subdirs
+    for entry in entries:
+        if pruner.excluded(entry.name, entry.path):
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if max_depth is None or level < max_depth:
+                    subdirs.append(entry.path)
+            elif fnmatch.fnmatchcase(entry.name, pattern):
+                files.append(entry.path)
+        except OSError:
+            continue
+    return files, subdirs
+
+
+def _walk(top: str, pattern: str, pruner: _Pruner, level: int, max_depth: Optional[int]) -> List[str]:
+    found = []
+    stack = [(top, level)]
+    while stack:
+        current, level = stack.pop()
+        files, subdirs = _list_dir(current, pattern, pruner, level, max_depth)
+        found.extend(files)
+        stack.extend((d, level + 1) for d in reversed(subdirs))
+    return found
+
+
+def scan_files(pattern: str, base: Path, excludes: Optional[Iterable[str]] = None, max_depth: Optional[int] = None,
+               workers: int = SCAN_WORKERS, use_ignore_file: bool = True) -> Iterator[Path]:
+    """Yield files under base whose name matches pattern, skipping excluded directories.
+
+    The first levels are expanded until there are enough resource folders to share out,
+    then each folder is walked on a thread pool. Results are yielded in a stable, sorted
+    depth-first order so the run order never depends on thread timing.
+    """
+    root = os.fspath(base)
+    patterns = list(DEFAULT_EXCLUDES if excludes is None else excludes)
+    if use_ignore_file:
+        patterns += load_ignore_file(Path(root))
+    pruner = _Pruner(root, patterns)
+    # Each item is either ('file', path) or ('dir', path, level) still to be walked.
+    items = [('dir', root, 0)]
+    for _ in range(FANOUT_LEVELS):
+        if sum(1 for item in items if item[0] == 'dir') >= workers:
+            break
+        expanded = []
+        for item in items:
+            if item[0] == 'file':
+                expanded.append(item)
+                continue
+            files, subdirs = _list_dir(item[1], pattern, pruner, item[2], max_depth)
+            expanded.extend(('file', f) for f in files)
+            expanded.extend(('dir', d, item[2] + 1) for d in subdirs)
+        items = expanded
+    if workers <= 1:
+        for item in items:
+            for path in ([item[1]] if item[0] == 'file' else _walk(item[1], pattern, pruner, item[2], max_depth)):
+                yield Path(path)
+        return
+    # Imported here: concurrent.futures is a large share of CLI startup and serial scans never need it.
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            None if item[0] == 'file' else pool.submit(_walk, item[1], pattern, pruner, item[2], max_depth)
+            for item in items
+        ]
+        for item, future in zip(items, futures):
+            for path in ([item[1]] if future is None else future.result()):
+                yield Path(path)
+
+
+def scan_order_key(path: Path) -> Tuple[Tuple[int, str], ...]:
+    """Sort key that puts paths of one tree in scan_files()'s order: a directory's files by
+    name, then its subdirectories by name, depth first."""
+    parts = path.parts
+    return tuple((1, part) for part in parts[:-1]) + ((0, parts[-1]),)
+
+
+class TreeWalker:
+    """scan_files()'s pruning rules for callers that list the tree one directory at a time, like FDS_watch."""
+
+    def __init__(self, base: Path, pattern: str, excludes: Optional[Iterable[str]] = None,
+                 max_depth: Optional[int] = None, use_ignore_file: bool = True):
+        self.root = os.fspath(base)
+        self.pattern = pattern
+        self.max_depth = max_depth
+        patterns = list(DEFAULT_EXCLUDES if excludes is None else excludes)
+        if use_ignore_file:
+            patterns += load_ignore_file(Path(self.root))
+        self._pruner = _Pruner(self.root, patterns)
+
+    def _level(self, directory: str) -> int:
+        rel = os.path.relpath(directory, self.root)
+        return 0 if rel == '.' else rel.count(os.sep) + 1
+
+    def matches(self, path: str) -> bool:
+        """True for a file list() would return."""
+        name = os.path.basename(path)
+        return fnmatch.fnmatchcase(name, self.pattern) and not self._pruner.excluded(name, path)
+
+    def descends(self, directory: str) -> bool:
+        """True for a directory list() would descend into."""
+        level = self._level(os.path.dirname(directory))
+        return (not self._pruner.excluded(os.path.basename(directory), directory)
+                and (self.max_depth is None or level < self.max_depth))
+
+    def list(self, directory: str) -> Tuple[List[str], List[str]]:
+        """(matching files, subdirectories to descend into) of one directory."""
+        return _list_dir(directory, self.pattern, self._pruner, self._level(directory), self.max_depth)
+
+    def walk(self, directory: str) -> Iterator[Tuple[str, List[str]]]:
+        """(directory, matching files) for directory and everything below it that is not pruned."""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            files, subdirs = self.list(current)
+            yield current, files
+            stack.extend(reversed(subdirs))
+
+
+CFG_FILENAME = 'server.cfg'
+CFG_SEARCH_DEPTH = 4
+
+
+def locate_server_cfg(start_dir: Path, max_levels: int = 10, max_depth: int = CFG_SEARCH_DEPTH) -> List[Path]:
+    """Find server.cfg for start_dir.
+
+    start_dir itself is checked first, then walked downward once, up to max_depth levels
+    with the default excludes applied, so a server picked inside a larger tree finds its
+    own server.cfg. Only then are up to max_levels ancestors checked directly (one stat
+    each). Nothing is remembered between calls, so a server.cfg created or removed since
+    the last lookup is seen.
+    """
+    start = start_dir.resolve()
+    cfg = start / CFG_FILENAME
+    if cfg.is_file():
+        return [cfg]
+    found = list(scan_files(CFG_FILENAME, start, max_depth=max_depth))
+    if found:
+        return found
+    current = start
+    for _ in range(max_levels):
+        if current.parent == current:
+            break
+        current = current.parent
+        cfg = current / CFG_FILENAME
+        if cfg.is_file():
+            return [cfg]
+    return []
@@ -0,0 +1,211 @@
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from FDS_sql import BatchPlanner
+
+_NAME = r'(`[^`]+`|[\w$]+)'
+# The optional group captures a database qualifier; the snapshot only covers DATABASE().
+_TABLE = r'((?:`[^`]+`|[\w$]+)\s*\.\s*)?' + _NAME
+_CREATE_TABLE = re.compile(r'CREATE\s+(TEMPORARY\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?' + _TABLE, re.IGNORECASE)
+_ALTER_TABLE = re.compile(r'ALTER\s+(?:ONLINE\s+)?(?:IGNORE\s+)?TABLE\s+(IF\s+EXISTS\s+)?' + _TABLE + r'\s+(.*)',
+                          re.IGNORECASE | re.DOTALL)
+_DROP_TABLE = re.compile(r'DROP\s+(TEMPORARY\s+)?TABLE\s+(?:IF\s+EXISTS\s+)?(.*)', re.IGNORECASE | re.DOTALL)
+_INDEX_ON = re.compile(
+    r'(CREATE|DROP)\s+(?:(?:UNIQUE|FULLTEXT|SPATIAL)\s+)?INDEX\s+(IF\s+(?:NOT\s+)?EXISTS\s+)?' + _NAME + r'\s+ON\s+' + _TABLE,
+    re.IGNORECASE,
+)
+_ADD_COLUMN_IF = re.compile(r'ADD\s+(?:COLUMN\s+)?IF\s+NOT\s+EXISTS\s+' + _NAME, re.IGNORECASE)
+_ADD_INDEX_IF = re.compile(r'ADD\s+(?:(?:UNIQUE|FULLTEXT|SPATIAL)\s+)?(?:INDEX|KEY)\s+IF\s+NOT\s+EXISTS\s+' + _NAME, re.IGNORECASE)
+_DROP_COLUMN_IF = re.compile(r'DROP\s+(?:COLUMN\s+)?IF\s+EXISTS\s+' + _NAME + r'\s*$', re.IGNORECASE)
+_DROP_INDEX_IF = re.compile(r'DROP\s+(?:INDEX|KEY)\s+IF\s+EXISTS\s+' + _NAME + r'\s*$', re.IGNORECASE)
+# Statements that never change which tables, columns or indexes exist.
+_SCHEMA_NEUTRAL = re.compile(
+    r'(?:INSERT|REPLACE|UPDATE|DELETE|SET|SELECT|START\s+TRANSACTION|BEGIN|COMMIT|ROLLBACK|(?:UN)?LOCK\s+TABLES?|TRUNCATE'
+    r'|(?:CREATE|DROP)\s+(?:DEFINER\s*=\s*\S+\s+)?(?:PROCEDURE|FUNCTION|TRIGGER|EVENT))\b'
+    r'|/\*!\d*\s*(?:SET\b|ALTER\s+TABLE\s+\S+\s+(?:DIS|EN)ABLE\s+KEYS\b)',
+    re.IGNORECASE,
+)
+_SPLIT_TOKENS = re.compile(r"""[(),'"`]""")
+
+
+def _name(name) -> str:
+    if isinstance(name, (bytes, bytearray)):
+        name = name.decode()
+    return name.strip().strip('`')
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses or quotes."""
+    parts = []
+    depth = 0
+    start = 0
+    i = 0
+    while True:
+        m = _SPLIT_TOKENS.search(text, i)
+        if not m:
+            break
+        ch = m.group()
+        i = m.end()
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',':
+            if depth == 0:
+                parts.append(text[start:m.start()].strip())
+                start = i
+        else:
+            while True:
+                end = text.find(ch, i)
+                if end == -1:
+                    i = len(text)
+                    break
+                if ch != '`' and text[end - 1] == '\\':
+                    i = end + 1
+                    continue
+                i = end + 1
+                break
+    parts.append(text[start:].strip())
+    return [p for p in parts if p]
+
+
+class SchemaSnapshot:
+    """In-memory copy of the target database's tables, columns and indexes.
+
+    Loaded with three information_schema queries, it lets prune() drop DDL that is
+    provably a no-op (CREATE TABLE IF NOT EXISTS on an existing table, ADD COLUMN/INDEX
+    IF NOT EXISTS on ones that exist, DROP ... IF EXISTS on ones that do not). Statements
+    that are kept update the snapshot; anything whose effect cannot be tracked (including
+    TEMPORARY tables, which shadow real ones, names qualified with a database, and MariaDB's
+    ALTER TABLE IF EXISTS) is never pruned and turns the pre-check off for the rest of the run.
+    """
+
+    def __init__(self, conn):
+        cursor = conn.cursor()
+        cursor.execute('SELECT @@lower_case_table_names')
+        (lower_case,) = cursor.fetchone()
+        self._fold_tables = int(lower_case) != 0
+        cursor.execute('SELECT TABLE_NAME FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()')
+        self.tables: Set[str] = {self._table(name) for (name,) in cursor.fetchall()}
+        self.columns: Dict[str, Optional[Set[str]]] = {t: set() for t in self.tables}
+        self.indexes: Dict[str, Optional[Set[str]]] = {t: set() for t in self.tables}
+        cursor.execute('SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()')
+        for table, column in cursor.fetchall():
+            self.columns.setdefault(self._table(table), set()).add(_name(column).lower())
+        cursor.execute('SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()')
+        for table, index in cursor.fetchall():
+            self.indexes.setdefault(self._table(table), set()).add(_name(index).lower())
+        cursor.close()
+        self.trusted = True
+        self.statements_skipped = 0
+        self.round_trips_saved = 0
+        self._lock = threading.Lock()
+
+    def _table(self, name) -> str:
+        name = _name(name)
+        return name.lower() if self._fold_tables else name
+
+    def _alter_clause_is_noop(self, table: str, clause: str) -> bool:
+        columns = self.columns.get(table)
+        indexes = self.indexes.get(table)
+        m = _ADD_COLUMN_IF.match(clause)
+        if m:
+            return columns is not None and _name(m.group(1)).lower() in columns
+        m = _ADD_INDEX_IF.match(clause)
+        if m:
+            return indexes is not None and _name(m.group(1)).lower() in indexes
+        m = _DROP_COLUMN_IF.match(clause)
+        if m:
+            return columns is not None and _name(m.group(1)).lower() not in columns
+        m = _DROP_INDEX_IF.match(clause)
+        if m:
+            return indexes is not None and _name(m.group(1)).lower() not in indexes
+        return False
+
+    def is_noop(self, statement: str) -> bool:
+        if not self.trusted:
+            return False
+        m = _CREATE_TABLE.match(statement)
+        if m:
+            return not (m.group(1) or m.group(3)) and bool(m.group(2)) and self._table(m.group(4)) in self.tables
+        m = _ALTER_TABLE.match(statement)
+        if m:
+            if m.group(1) or m.group(2):
+                return False
+            table = self._table(m.group(3))
+            if table not in self.tables:
+                return False
+            clauses = split_top_level(m.group(4))
+            return bool(clauses) and all(self._alter_clause_is_noop(table, c) for c in clauses)
+        m = _INDEX_ON.match(statement)
+        if m and m.group(2) and not m.group(4):
+            table = self._table(m.group(5))
+            indexes = self.indexes.get(table)
+            if table not in self.tables or indexes is None:
+                return False
+            exists = _name(m.group(3)).lower() in indexes
+            return exists if m.group(1).upper() == 'CREATE' else not exists
+        return False
+
+    def observe(self, statement: str):
+        """Apply the effect of a statement that is about to run."""
+        m = _CREATE_TABLE.match(statement)
+        if m:
+            if m.group(1) or m.group(3):
+                self.trusted = False
+                return
+            table = self._table(m.group(4))
+            if table not in self.tables:
+                self.tables.add(table)
+                self.columns[table] = None
+                self.indexes[table] = None
+            return
+        m = _ALTER_TABLE.match(statement)
+        if m:
+            if m.group(1) or m.group(2) or re.search(r'\bRENAME\b', m.group(4), re.IGNORECASE):
+                self.trusted = False
+            table = self._table(m.group(3))
+            self.columns[table] = None
+            self.indexes[table] = None
+            return
+        m = _DROP_TABLE.match(statement)
+        if m:
+            names = split_top_level(m.group(2))
+            if m.group(1) or any('.' in name for name in names):
+                self.trusted = False
+                return
+            for name in names:
+                table = self._table(name)
+                self.tables.discard(table)
+                self.columns[table] = None
+                self.indexes[table] = None
+            return
+        m = _INDEX_ON.match(statement)
+        if m:
+            if m.group(4):
+                self.trusted = False
+            self.indexes[self._table(m.group(5))] = None
+            return
+        if not _SCHEMA_NEUTRAL.match(statement):
+            self.trusted = False
+
+    def prune(self, statements: Iterable[Tuple[int, str]], shadow: BatchPlanner) -> Iterator[Tuple[int, str]]:
+        """Drop provably no-op statements; shadow accounts for the requests they would have cost."""
+        for index, statement in statements:
+            shadow.starts_request(statement)
+            with self._lock:
+                if self.is_noop(statement):
+                    self.statements_skipped += 1
+                    continue
+                self.observe(statement)
+            yield index, statement
+
+    def add_round_trips_saved(self, count: int):
+        with self._lock:
+            self.round_trips_saved += max(0, count)
+
+    def invalidate(self):
+        """Stop pruning, e.g. after a failed file left the schema in an unknown state."""
+        with self._lock:
+            self.trusted = False
@@ -0,0 +1,126 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Session settings for --bulk-session. sql_log_bin needs SUPER/SYSTEM_VARIABLES_ADMIN and is
+# simply left alone where that is not granted. InnoDB's flush and doublewrite settings are
+# global-only, so they are not touched.
+BULK_SESSION: List[Tuple[str, int]] = [
+    ('foreign_key_checks', 0),
+    ('unique_checks', 0),
+    ('sql_log_bin', 0),
+]
+GROUP_FILES = 1
+GROUP_BYTES = 4 * 1024 * 1024
+
+
+class SessionProfile:
+    """Session variables set on one connection for the length of a run, then put back.
+
+    apply() reads the current values in one query and sets the new ones, one by one if the
+    combined SET is refused; settings the account may not change are skipped and reported.
+    restore() writes back exactly the values apply() changed.
+    """
+
+    def __init__(self, conn, settings: List[Tuple[str, int]] = BULK_SESSION):
+        self.conn = conn
+        self.settings = settings
+        self.previous: List[Tuple[str, object]] = []
+
+    def apply(self) -> List[str]:
+        """Returns a warning per setting that could not be changed."""
+        cursor = self.conn.cursor()
+        try:
+            try:
+                cursor.execute('SELECT ' + ', '.join(f'@@SESSION.{name}' for name, _ in self.settings))
+                current = cursor.fetchone()
+            except Exception as e:
+                return [f"Bulk session disabled, could not read the session settings: {e}"]
+            try:
+                cursor.execute('SET SESSION ' + ', '.join(f'{name} = {value}' for name, value in self.settings))
+                self.previous = list(zip((name for name, _ in self.settings), current))
+                return []
+            except Exception:
+                pass
+            warnings = []
+            for (name, value), old in zip(self.settings, current):
+                try:
+                    cursor.execute(f'SET SESSION {name} = {value}')
+                    self.previous.append((name, old))
+                except Exception as e:
+                    warnings.append(f"Bulk session could not set {name}: {e}")
+            return warnings
+        finally:
+            cursor.close()
+
+    def restore(self) -> Optional[str]:
+        if not self.previous:
+            return None
+        assignments = ', '.join(f'{name} = %s' for name, _ in self.previous)
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f'SET SESSION {assignments}', tuple(old for _, old in self.previous))
+            cursor.close()
+        except Exception as e:
+            return f"Could not restore session settings ({', '.join(name for name, _ in self.previous)}): {e}"
+        self.previous = []
+        return None
+
+
+class TransactionGroups:
+    """Lets consecutive small files on a connection share one transaction.
+
+    A group is committed once it holds max_files files or max_bytes of SQL, so files=1 is
+    the usual one transaction per file. Only safe while files run on a single connection:
+    a file waiting on another connection's uncommitted rows would block.
+    """
+
+    def __init__(self, max_files: int = GROUP_FILES, max_bytes: int = GROUP_BYTES):
+        self.max_files = max(1, max_files)
+        self.max_bytes = max_bytes
+        self.commits = 0
+        self.failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[List[str], int]] = {}
+
+    def finished(self, conn, rel_path: str, size: int) -> Optional[str]:
+        """Add a successful file; commits when the group is full. Returns an error if that commit failed."""
+        with self._lock:
+            files, group_bytes = self._pending.pop(id(conn), ([], 0))
+        files.append(rel_path)
+        group_bytes += size
+        if len(files) < self.max_files and group_bytes < self.max_bytes:
+            with self._lock:
+                self._pending[id(conn)] = (files, group_bytes)
+            return None
+        return self._commit(conn, files)
+
+    def abort(self, conn, rel_path: str):
+        """A file failed inside conn's open group: roll the group back, files that had finished included."""
+        with self._lock:
+            files, _ = self._pending.pop(id(conn), ([], 0))
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        if files:
+            error = f"Rolled back with {rel_path}, which failed in the same transaction"
+            with self._lock:
+                self.failed.update(dict.fromkeys(files, error))
+
+    def close(self, conn) -> Optional[str]:
+        """Commit whatever group is still open on conn."""
+        with self._lock:
+            files, _ = self._pending.pop(id(conn), ([], 0))
+        return self._commit(conn, files) if files else None
+
+    def _commit(self, conn, files: List[str]) -> Optional[str]:
+        try:
+            conn.commit()
+        except Exception as e:
+            error = f"Commit of {len(files)} grouped file(s) failed, none of them were applied: {e}"
+            with self._lock:
+                self.failed.update(dict.fromkeys(files, error))
+            return error
+        with self._lock:
+            self.commits += 1
+        return None
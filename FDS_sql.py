@@ -0,0 +1,1120 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+READ_CHUNK = 1 << 20
+BATCH_BYTES = 64 * 1024
+BATCH_STATEMENTS = 200
+DEFAULT_MAX_PACKET = 4 * 1024 * 1024
+PACKET_HEADROOM = 1024
+COALESCE_BYTES = 1024 * 1024
+PREPARED_ROWS = 100
+PREPARED_CURSORS = 8
+MAX_PLACEHOLDERS = 65535
+BULK_ROWS = 5000
+# Local infile refused by the server (1148, 3948) or by the client connector (2068).
+LOCAL_INFILE_ERRORS = (1148, 2068, 3948)
+WHITESPACE = ' \t\r\n\f\v'
+
+_DELIMITER_COMMAND = re.compile(r'delimiter[ \t]+(\S+)[ \t]*$', re.IGNORECASE)
+_QUOTE_STOPS = {
+    "'": re.compile(r"['\\]"),
+    '"': re.compile(r'["\\]'),
+    '`': re.compile(r'`'),
+}
+# (index, statement, seconds, rows affected)
+StatementHook = Callable[[int, str, float, int], None]
+
+
+_DROPPED_COMMENT = re.compile(r'#|--(?:\s|$)|/\*(?![!+])')
+
+
+class SQLSplitter:
+    """Incremental statement splitter for MySQL scripts.
+
+    Text is fed in arbitrary chunks and complete statements are yielded as soon as their
+    delimiter is seen. Quotes, backticks, backslash escapes, ``--``/``#``/``/* */`` comments
+    and client-side ``DELIMITER`` commands are understood. ``/*! ... */`` and ``/*+ ... */``
+    comments are kept because the server executes them; other comments are dropped.
+    """
+
+    def __init__(self, delimiter: str = ';'):
+        self._pending = ''
+        self._parts: List[str] = []
+        self._blank = True
+        self._state = None  # None, a quote character, '--' or '/*'
+        self._keep_comment = False
+        self._set_delimiter(delimiter)
+
+    def _set_delimiter(self, delimiter: str):
+        self.delimiter = delimiter
+        self._tokens = re.compile('(' + re.escape(delimiter) + r""")|(['"`])|(#|--)|(/\*)""")
+
+    def _emit(self) -> Iterator[str]:
+        statement = ''.join(self._parts).strip()
+        self._parts = []
+        self._blank = True
+        if statement:
+            yield statement
+
+    def feed(self, data: str, final: bool = False) -> Iterator[str]:
+        buf = self._pending + data
+        self._pending = ''
+        n = len(buf)
+        i = 0
+        parts = self._parts
+        while i < n:
+            state = self._state
+            if state is None and self._blank:
+                j = i
+                while j < n and buf[j] in WHITESPACE:
+                    j += 1
+                if j == n:
+                    i = n
+                    break
+                if buf[j] in 'dD':
+                    nl = buf.find('\n', j)
+                    if nl == -1 and not final and 'delimiter'.startswith(buf[j:j + 9].lower()):
+                        self._pending = buf[j:]
+                        break
+                    end = n if nl == -1 else nl
+                    m = _DELIMITER_COMMAND.match(buf, j, end)
+                    if m:
+                        self._set_delimiter(m.group(1))
+                        i = end + 1
+                        continue
+                if not final and buf[j] in '-/' and n - j < 3:
+                    # Could be the start of a comment; wait for the characters that tell.
+                    self._pending = buf[j:]
+                    break
+                i = j
+                # A dropped comment leaves the statement blank, so a DELIMITER command can still follow it.
+                if not _DROPPED_COMMENT.match(buf, j):
+                    self._blank = False
+                parts = self._parts
+            if state is None:
+                m = self._tokens.search(buf, i)
+                if not m:
+                    hold = 0 if final else min(n - i, max(len(self.delimiter) - 1, 1))
+                    parts.append(buf[i:n - hold])
+                    self._pending = buf[n - hold:]
+                    break
+                start = m.start()
+                parts.append(buf[i:start])
+                if m.group(1) is not None:
+                    yield from self._emit()
+                    parts = self._parts
+                    i = m.end()
+                elif m.group(2) is not None:
+                    self._state = m.group(2)
+                    parts.append(m.group(2))
+                    i = m.end()
+                elif m.group(3) is not None:
+                    if m.group(3) == '--':
+                        if m.end() == n and not final:
+                            self._pending = buf[start:]
+                            break
+                        if m.end() < n and buf[m.end()] not in WHITESPACE:
+                            parts.append('-')
+                            i = start + 1
+                            continue
+                    self._state = '--'
+                    i = m.end()
+                else:
+                    if m.end() == n and not final:
+                        self._pending = buf[start:]
+                        break
+                    self._keep_comment = m.end() < n and buf[m.end()] in '!+'
+                    if self._keep_comment:
+                        parts.append('/*')
+                    self._state = '/*'
+                    i = m.end()
+            elif state == '--':
+                nl = buf.find('\n', i)
+                if nl == -1:
+                    i = n
+                    break
+                parts.append('\n')
+                self._state = None
+                i = nl + 1
+            elif state == '/*':
+                end = buf.find('*/', i)
+                if end == -1:
+                    hold = 0 if final else 1
+                    if self._keep_comment:
+                        parts.append(buf[i:n - hold])
+                    self._pending = buf[n - hold:]
+                    break
+                parts.append(buf[i:end + 2] if self._keep_comment else ' ')
+                self._state = None
+                i = end + 2
+            else:
+                m = _QUOTE_STOPS[state].search(buf, i)
+                if not m:
+                    parts.append(buf[i:])
+                    i = n
+                    break
+                start = m.start()
+                if start + 1 == n and not final:
+                    parts.append(buf[i:start])
+                    self._pending = buf[start:]
+                    break
+                if buf[start] == '\\' or (start + 1 < n and buf[start + 1] == state):
+                    parts.append(buf[i:start + 2])
+                    i = start + 2
+                    continue
+                parts.append(buf[i:start + 1])
+                self._state = None
+                i = start + 1
+        if final:
+            self._state = None
+            yield from self._emit()
+
+
+def iter_sql_statements(sql_path: Path, chunk_size: int = READ_CHUNK) -> Iterator[str]:
+    """Yield the statements of a .sql file one at a time, reading it in fixed-size chunks."""
+    splitter = SQLSplitter()
+    with sql_path.open(encoding='utf-8', errors='ignore') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield from splitter.feed(chunk)
+    yield from splitter.feed('', final=True)
+
+
+_INSERT_HEAD = re.compile(
+    r'INSERT\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY)\s+)?(?:IGNORE\s+)?(?:INTO\s+)?'
+    r'(?:`[^`]+`|[\w$]+)(?:\s*\.\s*(?:`[^`]+`|[\w$]+))?\s*(?:\([^()]*\)\s*)?VALUES?(?=\s|\()',
+    re.IGNORECASE,
+)
+_ROW_TOKENS = re.compile(r"""[()'"`]""")
+# Rows touching session state must stay in their own statement.
+_UNMERGEABLE_ROW = re.compile(r'@|last_insert_id|\bselect\b', re.IGNORECASE)
+# Statements that can observe how the INSERTs before them were sent (LAST_INSERT_ID() is the
+# first id of a multi-row INSERT, ROW_COUNT() its total), so the run before them stays unmerged.
+_READS_SESSION = re.compile(r'@|last_insert_id|row_count', re.IGNORECASE)
+# The next INSERT/REPLACE is the first statement that can set LAST_INSERT_ID() again.
+_SETS_INSERT_ID = re.compile(r'\s*(?:INSERT|REPLACE)\b', re.IGNORECASE)
+
+
+def _row_end(statement: str, start: int) -> int:
+    """Return the index just past the parenthesised row that opens at statement[start]."""
+    depth = 0
+    i = start
+    while True:
+        m = _ROW_TOKENS.search(statement, i)
+        if not m:
+            return -1
+        ch = m.group()
+        if ch == '(':
+            depth += 1
+            i = m.end()
+        elif ch == ')':
+            depth -= 1
+            i = m.end()
+            if depth == 0:
+                return i
+        else:
+            stops = _QUOTE_STOPS[ch]
+            i = m.end()
+            while True:
+                q = stops.search(statement, i)
+                if not q:
+                    return -1
+                if statement[q.start()] == '\\' or statement.startswith(ch * 2, q.start()):
+                    i = q.start() + 2
+                    continue
+                i = q.end()
+                break
+
+
+def split_insert(statement: str) -> Optional[Tuple[str, List[str], str]]:
+    """Split ``INSERT ... VALUES (..), (..) [tail]`` into its head, row tuples and tail.
+
+    Returns None for anything that is not a literal VALUES insert (INSERT ... SELECT/SET).
+    """
+    m = _INSERT_HEAD.match(statement)
+    if not m:
+        return None
+    rows = []
+    n = len(statement)
+    i = m.end()
+    while True:
+        while i < n and statement[i] in WHITESPACE:
+            i += 1
+        if i >= n or statement[i] != '(':
+            return None
+        end = _row_end(statement, i)
+        if end == -1:
+            return None
+        rows.append(statement[i:end])
+        i = end
+        while i < n and statement[i] in WHITESPACE:
+            i += 1
+        if i < n and statement[i] == ',':
+            i += 1
+            continue
+        break
+    return m.group(), rows, statement[i:].strip()
+
+
+def _join_insert(head: str, rows: List[str], tail: str = '') -> str:
+    sql = head + ' ' + ',\n'.join(rows)
+    return f"{sql} {tail}" if tail else sql
+
+
+_LITERAL = re.compile(
+    r"""\s*(?:'((?:[^'\\]|\\.|'')*)'|"((?:[^"\\]|\\.|"")*)"|(NULL|TRUE|FALSE)(?![\w$])"""
+    r"""|([-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)(?![\w$.]))\s*([,)])""",
+    re.IGNORECASE | re.DOTALL,
+)
+_BACKSLASH_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+# MySQL keeps the backslash of \% and \_ (they only matter to LIKE); any other unknown escape drops it.
+_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a', '%': '\\%', '_': '\\_'}
+_WORDS = {'null': None, 'true': 1, 'false': 0}
+
+
+def _unescape(text: str, quote: str) -> str:
+    if '\\' in text:
+        text = _BACKSLASH_ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), text)
+    return text.replace(quote * 2, quote)
+
+
+def parse_literal_row(row: str) -> Optional[tuple]:
+    """Python values of a ``(literal, ...)`` row, or None if any value is not a plain literal.
+
+    Strings, numbers, NULL, TRUE and FALSE are understood; functions, expressions, hex
+    and bit literals, charset introducers and variables are not.
+    """
+    values = []
+    i = 1
+    while True:
+        m = _LITERAL.match(row, i)
+        if not m:
+            return None
+        single, double, word, number, separator = m.groups()
+        if single is not None:
+            values.append(_unescape(single, "'"))
+        elif double is not None:
+            values.append(_unescape(double, '"'))
+        elif word is not None:
+            values.append(_WORDS[word.lower()])
+        elif '.' in number or 'e' in number or 'E' in number:
+            values.append(Decimal(number))
+        else:
+            value = int(number)
+            # Out-of-range integers are bound as DECIMAL and converted by the server, like the text.
+            values.append(value if -2 ** 63 <= value < 2 ** 63 else Decimal(number))
+        i = m.end()
+        if separator == ')':
+            return tuple(values) if not row[i:].strip() else None
+
+
+def _split_oversized(index: int, head: str, rows: List[str], tail: str, limit: int) -> Iterator[Tuple[int, str]]:
+    overhead = len(head.encode('utf-8')) + len(tail.encode('utf-8')) + 2
+    chunk = []
+    size = overhead
+    for row in rows:
+        row_size = len(row.encode('utf-8')) + 2
+        if chunk and size + row_size > limit:
+            yield index, _join_insert(head, chunk, tail)
+            chunk = []
+            size = overhead
+        chunk.append(row)
+        size += row_size
+    if chunk:
+        yield index, _join_insert(head, chunk, tail)
+
+
+def rewrite_inserts(statements: Iterable[Tuple[int, str]], max_packet: int = DEFAULT_MAX_PACKET,
+                    coalesce_bytes: int = COALESCE_BYTES) -> Iterator[Tuple[int, str]]:
+    """Merge runs of single-row INSERTs and split INSERTs that exceed max_allowed_packet.
+
+    Adjacent single-row INSERTs with the same head (table and column list) and no tail are
+    folded into multi-row INSERTs of up to coalesce_bytes. Any INSERT bigger than the
+    packet limit is cut into row chunks that fit. Rewritten statements keep the index of
+    the first source statement so errors still point into the file.
+
+    A run is sent as written if any statement between it and the next INSERT/REPLACE reads
+    session state (see _READS_SESSION), since LAST_INSERT_ID() keeps its value until then.
+    Those statements are held back to decide; if they grow past coalesce_bytes the run is
+    sent as written without waiting further.
+    """
+    limit = max_packet - PACKET_HEADROOM
+    target = min(coalesce_bytes, limit)
+    group_key = None
+    group = []
+    group_index = 0
+    group_size = 0
+    held = []
+    held_index = 0
+    trailing = []
+    trailing_size = 0
+
+    def flush(run, first_index: int, merge: bool = True):
+        if len(run) == 1 or not merge:
+            for index, _, statement, _ in run:
+                yield index, statement
+        elif run:
+            yield first_index, _join_insert(run[0][1], [row for _, _, _, row in run])
+
+    def release(merge: bool):
+        nonlocal held, trailing, trailing_size
+        yield from flush(held, held_index, merge)
+        yield from trailing
+        held = []
+        trailing = []
+        trailing_size = 0
+
+    for index, statement in statements:
+        if held:
+            if _READS_SESSION.search(statement):
+                yield from release(merge=False)
+            elif _SETS_INSERT_ID.match(statement):
+                yield from release(merge=True)
+            else:
+                trailing.append((index, statement))
+                trailing_size += len(statement)
+                if trailing_size > target:
+                    yield from release(merge=False)
+                continue
+        parsed = split_insert(statement) if statement[:6].upper() == 'INSERT' else None
+        if parsed and not parsed[2] and len(parsed[1]) == 1 and not _UNMERGEABLE_ROW.search(parsed[1][0]):
+            head, rows, _ = parsed
+            key = ' '.join(head.split())
+            row_size = len(rows[0].encode('utf-8')) + 2
+            if group and (key != group_key or group_size + row_size > target):
+                yield from flush(group, group_index)
+                group = []
+            if not group:
+                group_key = key
+                group_index = index
+                group_size = len(head.encode('utf-8')) + 1
+            group.append((index, head, statement, rows[0]))
+            group_size += row_size
+            continue
+        if group:
+            if _READS_SESSION.search(statement) or _SETS_INSERT_ID.match(statement):
+                yield from flush(group, group_index, merge=not _READS_SESSION.search(statement))
+            else:
+                held, held_index = group, group_index
+                trailing = [(index, statement)]
+                trailing_size = len(statement)
+                group = []
+                continue
+            group = []
+        if parsed and len(parsed[1]) > 1 and len(statement.encode('utf-8')) > limit:
+            yield from _split_oversized(index, *parsed, limit)
+        else:
+            yield index, statement
+    yield from release(merge=True)
+    yield from flush(group, group_index)
+
+
+def query_max_allowed_packet(conn) -> int:
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT @@max_allowed_packet')
+        (value,) = cursor.fetchone()
+        cursor.close()
+        return int(value)
+    except Exception:
+        return DEFAULT_MAX_PACKET
+
+
+class StatementError(Exception):
+    """A statement failed; carries its 1-based index within the source file."""
+
+    def __init__(self, index: int, statement: str, error: Exception):
+        self.index = index
+        self.statement = statement
+        self.error = error
+        snippet = ' '.join(statement.split())[:80]
+        super().__init__(f"statement #{index} ({snippet}): {error}")
+
+
+# Lock wait timeout, deadlock, server gone away, lost connection.
+TRANSIENT_ERRORS = (1205, 1213, 2006, 2013)
+CONNECTION_LOST = (2006, 2013)
+RETRIES = 5
+# Checkpoint of a file whose statements are all committed (the largest INT).
+FILE_DONE = 2 ** 31 - 1
+RETRY_DELAY = 0.5
+_SESSION_STATEMENT = re.compile(r'(?:USE|SET)\b', re.IGNORECASE)
+
+
+def error_number(error: BaseException) -> Optional[int]:
+    """The MySQL error number behind error, looking through StatementError."""
+    while error is not None:
+        errno = getattr(error, 'errno', None)
+        if isinstance(errno, int):
+            return errno
+        error = error.error if isinstance(error, StatementError) else error.__cause__
+    return None
+
+
+def resume_statements(statements: Iterable[Tuple[int, str]], resume_at: int) -> Iterator[Tuple[int, str]]:
+    """Statements from index resume_at on; earlier USE and SET statements are replayed so the session matches."""
+    for index, statement in statements:
+        if index >= resume_at or _SESSION_STATEMENT.match(statement):
+            yield index, statement
+
+
+def _drain(cursor) -> int:
+    if cursor.with_rows:
+        cursor.fetchall()
+    return cursor.rowcount
+
+
+def _execute_multi(cursor, sql: str) -> Iterator[int]:
+    """Send a multi-statement request and yield each statement's row count as its result arrives."""
+    try:
+        results = cursor.execute(sql, multi=True)
+    except TypeError:
+        # mysql-connector-python 9.2+ dropped multi=True; results are walked with nextset().
+        results = None
+    if results is not None:
+        for result in results:
+            yield _drain(result)
+        return
+    cursor.execute(sql)
+    while True:
+        yield _drain(cursor)
+        if not cursor.nextset():
+            break
+
+
+def _execute_batch(cursor, batch: List[Tuple[int, str]], on_statement: Optional[StatementHook] = None):
+    if len(batch) == 1:
+        index, statement = batch[0]
+        start = time.perf_counter()
+        try:
+            cursor.execute(statement)
+            rows = _drain(cursor)
+        except Exception as e:
+            raise StatementError(index, statement, e) from e
+        if on_statement:
+            on_statement(index, statement, time.perf_counter() - start, rows)
+        return
+    done = 0
+    start = time.perf_counter()
+    try:
+        for rows in _execute_multi(cursor, ';\n'.join(statement for _, statement in batch)):
+            if on_statement:
+                # Results stream back in order, so the gap since the previous one is this statement's latency.
+                now = time.perf_counter()
+                index, statement = batch[done]
+                on_statement(index, statement, now - start, rows)
+                start = now
+            done += 1
+    except Exception as e:
+        index, statement = batch[min(done, len(batch) - 1)]
+        raise StatementError(index, statement, e) from e
+
+
+LiteralInsert = Tuple[Tuple[str, int], str, List[Tuple[str, tuple]]]
+
+
+def parse_literal_insert(statement: str) -> Optional[LiteralInsert]:
+    """(shape key, head, [(row text, values)]) for an INSERT of plain literal rows, else None.
+
+    The shape key is the normalized head plus the column count; statements with the same
+    key can share one prepared statement or one LOAD DATA.
+    """
+    if statement[:6].upper() != 'INSERT':
+        return None
+    parsed = split_insert(statement)
+    if not parsed or parsed[2]:
+        return None
+    head, rows, _ = parsed
+    parsed_rows = []
+    for row in rows:
+        values = parse_literal_row(row)
+        if not values or (parsed_rows and len(values) != len(parsed_rows[0][1])):
+            return None
+        parsed_rows.append((row, values))
+    return (' '.join(head.split()), len(parsed_rows[0][1])), head, parsed_rows
+
+
+class PreparedStats:
+    """Prepared-statement totals across the files of a run; safe to update from executor threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.executions = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.seconds_saved = 0.0
+        self.bytes_saved = 0
+
+    def add(self, other):
+        with self._lock:
+            self.prepares += other.prepares
+            self.executions += other.executions
+            self.rows += other.rows
+            self.seconds += other.seconds
+            self.seconds_saved += other.seconds_saved
+            self.bytes_saved += other.bytes_saved
+
+    def to_dict(self) -> Dict:
+        return dict(prepares=self.prepares, executions=self.executions, rows=self.rows, seconds=round(self.seconds, 6),
+                    seconds_saved=round(self.seconds_saved, 6), bytes_saved=self.bytes_saved)
+
+
+class PreparedInserts:
+    """Runs repeated literal INSERT shapes as server-side prepared statements with bound values.
+
+    Rows of consecutive INSERTs with the same head and column count are regrouped into
+    chunks of a fixed number of rows, so each shape is prepared once and then only
+    executed. The first full chunk of a shape is sent as text and timed; every prepared
+    chunk after it is compared against that, which gives seconds_saved. Rows that do not
+    fill a chunk, and anything that is not a plain literal INSERT, stay on the text path.
+    """
+
+    def __init__(self, conn, rows_per_statement: int = PREPARED_ROWS, max_bytes: int = COALESCE_BYTES,
+                 max_cursors: int = PREPARED_CURSORS):
+        self.conn = conn
+        self.rows_per_statement = max(1, rows_per_statement)
+        self.max_bytes = max_bytes
+        self.max_cursors = max_cursors
+        self.prepares = 0
+        self.executions = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.seconds_saved = 0.0
+        self.bytes_saved = 0
+        self._cursors: 'OrderedDict[Tuple[str, int], Tuple[str, object]]' = OrderedDict()
+        self._row_seconds: Dict[Tuple[str, int], float] = {}
+        self._key: Optional[Tuple[str, int]] = None
+        self._head = ''
+        self._rows: List[Tuple[int, str, tuple]] = []
+        self._size = 0
+        try:
+            conn.cursor(prepared=True).close()
+            self.available = True
+        except Exception:
+            self.available = False
+
+    def parse(self, statement: str) -> Optional[LiteralInsert]:
+        return parse_literal_insert(statement) if self.available else None
+
+    def add(self, index: int, parsed, cursor, on_statement: Optional[StatementHook] = None):
+        key, head, rows = parsed
+        if key != self._key:
+            self.flush(cursor, on_statement)
+            self._key = key
+            self._head = head
+        chunk = max(1, min(self.rows_per_statement, MAX_PLACEHOLDERS // key[1]))
+        for row, values in rows:
+            row_size = len(row) + 2
+            if self._rows and self._size + row_size > self.max_bytes:
+                self._run_text(self._rows, cursor, on_statement)
+                self._rows = []
+                self._size = 0
+            self._rows.append((index, row, values))
+            self._size += row_size
+            if len(self._rows) == chunk:
+                self._run_chunk(self._rows, cursor, on_statement)
+                self._rows = []
+                self._size = 0
+
+    def flush(self, cursor, on_statement: Optional[StatementHook] = None):
+        if self._rows:
+            self._run_text(self._rows, cursor, on_statement)
+        self._rows = []
+        self._size = 0
+        self._key = None
+
+    def _run_text(self, rows: List[Tuple[int, str, tuple]], cursor, on_statement: Optional[StatementHook]) -> float:
+        sql = _join_insert(self._head, [row for _, row, _ in rows])
+        start = time.perf_counter()
+        try:
+            cursor.execute(sql)
+            affected = _drain(cursor)
+        except Exception as e:
+            raise StatementError(rows[0][0], sql, e) from e
+        elapsed = time.perf_counter() - start
+        if on_statement:
+            on_statement(rows[0][0], sql, elapsed, affected)
+        return elapsed
+
+    def _cursor(self, rows: int) -> Tuple[str, object]:
+        cached = self._cursors.get(self._key)
+        if cached is not None:
+            self._cursors.move_to_end(self._key)
+            return cached
+        placeholders = '(' + ', '.join(['?'] * self._key[1]) + ')'
+        # The connector only skips re-preparing when it is handed the very same string object again.
+        sql = self._head + ' ' + ', '.join([placeholders] * rows)
+        cached = self._cursors[self._key] = (sql, self.conn.cursor(prepared=True))
+        self.prepares += 1
+        if len(self._cursors) > self.max_cursors:
+            _, (_, evicted) = self._cursors.popitem(last=False)
+            evicted.close()
+        return cached
+
+    def _run_chunk(self, rows: List[Tuple[int, str, tuple]], cursor, on_statement: Optional[StatementHook]):
+        row_seconds = self._row_seconds.get(self._key)
+        if row_seconds is None:
+            self._row_seconds[self._key] = self._run_text(rows, cursor, on_statement) / len(rows)
+            return
+        sql, prepared = self._cursor(len(rows))
+        params = [value for _, _, values in rows for value in values]
+        start = time.perf_counter()
+        try:
+            prepared.execute(sql, params)
+            affected = prepared.rowcount
+        except Exception as e:
+            raise StatementError(rows[0][0], sql, e) from e
+        elapsed = time.perf_counter() - start
+        self.executions += 1
+        self.rows += len(rows)
+        self.seconds += elapsed
+        self.seconds_saved += row_seconds * len(rows) - elapsed
+        text_bytes = len(self._head.encode('utf-8')) + sum(len(row.encode('utf-8')) + 2 for _, row, _ in rows)
+        param_bytes = sum(len(v.encode('utf-8')) if isinstance(v, str) else 8 for v in params if v is not None)
+        self.bytes_saved += text_bytes - param_bytes
+        if on_statement:
+            on_statement(rows[0][0], sql, elapsed, affected)
+
+    def close(self):
+        for _, prepared in self._cursors.values():
+            try:
+                prepared.close()
+            except Exception:
+                pass
+        self._cursors.clear()
+
+
+_LOAD_HEAD = re.compile(
+    r'INSERT\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY)\s+)?(IGNORE\s+)?(?:INTO\s+)?'
+    r'((?:`[^`]+`|[\w$]+)(?:\s*\.\s*(?:`[^`]+`|[\w$]+))?)\s*(\([^()]*\))?\s*VALUES?$',
+    re.IGNORECASE,
+)
+_TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r', '\0': '\\0'})
+_TSV_ESCAPE = re.compile(r'\\(.)')
+_TSV_CHARS = {'t': '\t', 'n': '\n', 'r': '\r', '0': '\0'}
+
+
+@lru_cache(maxsize=None)
+def bulk_spool_dir() -> str:
+    """Private per-process directory for LOAD DATA spools, removed at exit.
+
+    It is the only directory the connector is allowed to send local files from.
+    """
+    import atexit
+    import shutil
+    import tempfile
+    path = tempfile.mkdtemp(prefix='fds-spool-')
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+
+def _tsv_field(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.translate(_TSV_ESCAPES)
+    return str(value)
+
+
+def _tsv_literal(field: str) -> str:
+    """SQL literal for a spooled field; quoted, so the server converts it like LOAD DATA would."""
+    if field == '\\N':
+        return 'NULL'
+    value = _TSV_ESCAPE.sub(lambda m: _TSV_CHARS.get(m.group(1), m.group(1)), field)
+    return "'" + value.replace('\\', '\\\\').replace("'", "\\'").replace('\0', '\\0') + "'"
+
+
+def local_infile_enabled(conn) -> bool:
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT @@local_infile')
+        (value,) = cursor.fetchone()
+        cursor.close()
+        return bool(int(value))
+    except Exception:
+        return False
+
+
+class BulkStats:
+    """LOAD DATA totals across the files of a run; safe to update from executor threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.fallbacks = 0
+
+    def add(self, other):
+        with self._lock:
+            self.loads += other.loads
+            self.rows += other.rows
+            self.seconds += other.seconds
+            self.fallbacks += other.fallbacks
+
+    def to_dict(self) -> Dict:
+        return dict(loads=self.loads, rows=self.rows, seconds=round(self.seconds, 6), fallbacks=self.fallbacks)
+
+
+def _check_load(cursor, index: int, sql: str, rows: int, affected: int):
+    """Raise StatementError unless LOAD DATA inserted every row without warnings."""
+    cursor.execute('SHOW WARNINGS')
+    warnings = cursor.fetchall()
+    if affected == rows and not warnings:
+        return
+    detail = f"{affected} of {rows} row(s) loaded"
+    if warnings:
+        level, code, message = warnings[0][:3]
+        detail += f", {len(warnings)} warning(s), first: {level} {code}: {message}"
+    raise StatementError(index, sql, ValueError(detail))
+
+
+class BulkLoader:
+    """Loads long runs of literal INSERTs into one table with LOAD DATA LOCAL INFILE.
+
+    Consecutive INSERTs with the same shape are held back until min_rows rows have been
+    seen; from then on their rows are streamed to a TSV spool file and the held statements
+    are dropped, so memory stays bounded by min_rows. When the run ends the spool is loaded
+    with one statement. Shorter runs are handed back unchanged. If local infile is refused
+    the spool is replayed as INSERTs of up to max_bytes, and bulk loading is switched off
+    for the connection.
+
+    LOAD DATA LOCAL turns duplicate keys and bad values into warnings, like INSERT IGNORE.
+    For a run without IGNORE, a load that did not insert every row or left warnings fails
+    the file, as the INSERTs would have.
+    """
+
+    def __init__(self, conn, min_rows: int = BULK_ROWS, max_bytes: int = COALESCE_BYTES,
+                 spool_dir: Optional[str] = None):
+        self.min_rows = max(1, min_rows)
+        self.max_bytes = max_bytes
+        self.spool_dir = spool_dir or bulk_spool_dir()
+        self.loads = 0
+        self.rows = 0
+        self.seconds = 0.0
+        self.fallbacks = 0
+        self.available = local_infile_enabled(conn)
+        self._key: Optional[Tuple[str, int]] = None
+        self._run: Optional[Tuple[int, str, Tuple[str, str, str]]] = None
+        self._held: List[Tuple[int, str]] = []
+        self._held_rows: List[tuple] = []
+        self._spool = None
+        self._spool_path = ''
+        self._spool_rows = 0
+        self._spool_statements = 0
+        self._ready: Optional[Tuple[str, int, int, Tuple[int, str, Tuple[str, str, str]]]] = None
+
+    @property
+    def ready(self) -> bool:
+        """A finished spool is waiting for load()."""
+        return self._ready is not None
+
+    def offer(self, index: int, statement: str) -> Tuple[List[Tuple[int, str]], List[str]]:
+        """Returns the statements to run now, in order, and the statements just moved into the spool.
+
+        When ready is set afterwards, load() has to run before the returned statements.
+        """
+        parsed = parse_literal_insert(statement) if self.available else None
+        match = _LOAD_HEAD.match(parsed[1]) if parsed else None
+        if not match:
+            return self._end_run() + [(index, statement)], []
+        key, head, rows = parsed
+        run_now = [] if key == self._key else self._end_run()
+        if self._key is None:
+            self._key = key
+            self._run = (index, head, match.groups())
+        values = [row_values for _, row_values in rows]
+        if self._spool:
+            self._write(values)
+            self._spool_statements += 1
+            return run_now, [statement]
+        self._held.append((index, statement))
+        self._held_rows.extend(values)
+        if len(self._held_rows) < self.min_rows:
+            return run_now, []
+        import tempfile
+        fd, self._spool_path = tempfile.mkstemp(suffix='.tsv', dir=self.spool_dir)
+        self._spool = open(fd, 'w', encoding='utf-8', newline='\n')
+        self._write(self._held_rows)
+        spooled = [held for _, held in self._held]
+        self._spool_statements = len(spooled)
+        self._held = []
+        self._held_rows = []
+        return run_now, spooled
+
+    def finish(self) -> List[Tuple[int, str]]:
+        """End of the statements; like offer() for a statement that ends the current run."""
+        return self._end_run()
+
+    def _write(self, rows: List[tuple]):
+        self._spool.writelines('\t'.join(_tsv_field(v) for v in row) + '\n' for row in rows)
+        self._spool_rows += len(rows)
+
+    def _end_run(self) -> List[Tuple[int, str]]:
+        held = self._held
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+            self._ready = (self._spool_path, self._spool_rows, self._spool_statements, self._run)
+            self._spool_rows = 0
+        self._key = None
+        self._held = []
+        self._held_rows = []
+        return held
+
+    def load(self, cursor, on_statement: Optional[StatementHook] = None) -> int:
+        """LOAD DATA the finished spool; returns the number of source statements it covered."""
+        path, rows, statements, (index, head, (ignore, table, columns)) = self._ready
+        self._ready = None
+        quoted = Path(path).as_posix().replace('\\', '\\\\').replace("'", "\\'")
+        sql = (f"LOAD DATA LOCAL INFILE '{quoted}' {'IGNORE ' if ignore else ''}INTO TABLE {table} "
+               "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n'"
+               + (f" {columns}" if columns else ''))
+        try:
+            start = time.perf_counter()
+            try:
+                cursor.execute(sql)
+                affected = _drain(cursor)
+            except Exception as e:
+                if getattr(e, 'errno', None) not in LOCAL_INFILE_ERRORS:
+                    raise StatementError(index, sql, e) from e
+                self.available = False
+                self.fallbacks += 1
+                self._replay(path, head, index, cursor, on_statement)
+                return statements
+            elapsed = time.perf_counter() - start
+            if not ignore:
+                _check_load(cursor, index, sql, rows, affected)
+        finally:
+            os.remove(path)
+        self.loads += 1
+        self.rows += rows
+        self.seconds += elapsed
+        if on_statement:
+            on_statement(index, sql, elapsed, affected)
+        return statements
+
+    def _replay(self, path: str, head: str, index: int, cursor, on_statement: Optional[StatementHook]):
+        rows = []
+        size = len(head)
+        with open(path, encoding='utf-8', newline='\n') as f:
+            for line in f:
+                row = '(' + ', '.join(_tsv_literal(field) for field in line[:-1].split('\t')) + ')'
+                if rows and size + len(row) + 2 > self.max_bytes:
+                    _execute_batch(cursor, [(index, _join_insert(head, rows))], on_statement)
+                    rows = []
+                    size = len(head)
+                rows.append(row)
+                size += len(row) + 2
+        if rows:
+            _execute_batch(cursor, [(index, _join_insert(head, rows))], on_statement)
+
+    def close(self):
+        """Remove spool files left behind by a failed run."""
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+            os.remove(self._spool_path)
+        if self._ready:
+            os.remove(self._ready[0])
+            self._ready = None
+
+
+_IMPLICIT_COMMIT = re.compile(
+    r'(?:(?:CREATE|ALTER|DROP)\b(?!\s+TEMPORARY\b)|RENAME\b|TRUNCATE\b|COMMIT\b|BEGIN\b|START\s+TRANSACTION\b'
+    r'|(?:UN)?LOCK\s+TABLES?\b)',
+    re.IGNORECASE,
+)
+
+
+class CommitEvery:
+    """Commits part-way through a file after every `statements` statements or max_bytes of SQL (0 disables a limit).
+
+    A commit that falls due is taken just before the next statement with a higher index
+    runs, so everything before that index is committed and nothing after it is.
+    checkpoint(conn, resume_at) is called inside the transaction being committed, which
+    lets a later run resume at exactly that statement. resume_at is the last committed one;
+    run_sql_file rolls a failed file back to it, so nothing after it is committed later.
+
+    Statements the server commits implicitly (DDL, COMMIT, LOCK TABLES) are tracked too:
+    resume_after() uses them so a retry never repeats committed work, and with a
+    checkpoint they are followed by a commit so the persisted one stays exact.
+    """
+
+    def __init__(self, conn, statements: int = 0, max_bytes: int = 0,
+                 checkpoint: Optional[Callable[[object, int], None]] = None, resume_at: int = 1):
+        self.conn = conn
+        self.statements = statements
+        self.max_bytes = max_bytes
+        self.checkpoint = checkpoint
+        self.resume_at = resume_at
+        self.commits = 0
+        self.pending = False
+        self.last_index = 0
+        self._count = 0
+        self._size = 0
+        self._implicit: Optional[int] = None
+        self._implicit_points: List[Tuple[int, int]] = []
+
+    def arrived(self, index: int):
+        """index is the next statement of the file, whichever path it takes."""
+        if self._implicit is not None:
+            self._implicit_points.append((self._implicit, index))
+            self._implicit = None
+
+    def executed(self, index: int, statement: str):
+        self.last_index = max(self.last_index, index)
+        self._count += 1
+        self._size += len(statement)
+        if self.statements and self._count >= self.statements or self.max_bytes and self._size >= self.max_bytes:
+            self.pending = True
+        if _IMPLICIT_COMMIT.match(statement):
+            self._implicit = index
+            if self.checkpoint:
+                self.pending = True
+
+    def resume_after(self, error: BaseException) -> int:
+        """Where a retry after error starts: the last commit, or a later implicit one that ran before the failure."""
+        failed = error.index if isinstance(error, StatementError) else None
+        resume_at = self.resume_at
+        if failed is not None:
+            for implicit, following in reversed(self._implicit_points):
+                if implicit < failed:
+                    resume_at = max(resume_at, following)
+                    break
+        return resume_at
+
+    def commit(self, resume_at: int):
+        if self.checkpoint:
+            self.checkpoint(self.conn, resume_at)
+        self.conn.commit()
+        self.commits += 1
+        self.resume_at = resume_at
+        self.pending = False
+        self._count = 0
+        self._size = 0
+
+
+class BatchPlanner:
+    """Decides where consecutive statements are cut into multi-statement requests."""
+
+    def __init__(self, batch_statements: int = BATCH_STATEMENTS, batch_bytes: int = BATCH_BYTES):
+        self.batch_statements = batch_statements
+        self.batch_bytes = batch_bytes
+        self.requests = 0
+        self._pending = 0
+        self._size = 0
+
+    def starts_request(self, statement: str) -> bool:
+        """Account for statement; True if it has to open a new request."""
+        new = (
+            not self._pending
+            or self._pending >= self.batch_statements
+            or self._size + len(statement) > self.batch_bytes
+        )
+        if new:
+            self.requests += 1
+            self._pending = 0
+            self._size = 0
+        self._pending += 1
+        self._size += len(statement) + 2
+        return new
+
+
+def execute_statements(cursor, statements: Iterable[Tuple[int, str]], batch_statements: int = BATCH_STATEMENTS,
+                       batch_bytes: int = BATCH_BYTES, planner: Optional[BatchPlanner] = None,
+                       on_statement: Optional[StatementHook] = None, prepared: Optional[PreparedInserts] = None,
+                       bulk: Optional[BulkLoader] = None, commit_every: Optional[CommitEvery] = None) -> int:
+    """Execute numbered statements, packing consecutive ones into multi-statement requests.
+
+    A request holds at most batch_statements statements and batch_bytes of SQL text;
+    batch_statements=1 sends one statement per round trip. Failures are raised as
+    StatementError pointing at the statement that caused them. Returns the number executed;
+    pass a planner to read back how many requests were sent. on_statement is called with
+    (index, statement, seconds, rows affected) after each statement completes. With
+    prepared, plain literal INSERTs go through PreparedInserts instead of the batches; with
+    bulk, long runs of them are loaded by BulkLoader first. commit_every commits between
+    requests once its limits are reached, and after every bulk load; the caller makes the
+    final commit.
+    """
+    planner = planner or BatchPlanner(batch_statements, batch_bytes)
+    batch = []
+    executed = 0
+
+    def flush():
+        nonlocal batch, executed
+        if batch:
+            _execute_batch(cursor, batch, on_statement)
+            executed += len(batch)
+            batch = []
+
+    def sync():
+        flush()
+        if prepared:
+            prepared.flush(cursor, on_statement)
+
+    def run(index: int, statement: str, as_written: bool = False):
+        nonlocal executed
+        # Pieces of one split INSERT share an index; never commit between them.
+        if commit_every and commit_every.pending and index > commit_every.last_index:
+            sync()
+            commit_every.commit(index)
+        parsed = prepared.parse(statement) if prepared and not as_written else None
+        # Prepared INSERTs are still planned, so planner.requests stays comparable to a shadow planner.
+        if planner.starts_request(statement) or parsed:
+            flush()
+        if parsed:
+            prepared.add(index, parsed, cursor, on_statement)
+            executed += 1
+        else:
+            if prepared:
+                prepared.flush(cursor, on_statement)
+            batch.append((index, statement))
+        if commit_every:
+            commit_every.executed(index, statement)
+
+    def load():
+        nonlocal executed
+        sync()
+        executed += bulk.load(cursor, on_statement)
+        if commit_every:
+            commit_every.pending = True
+
+    def offered(run_now: List[Tuple[int, str]], spooled: List[str]):
+        for statement in spooled:
+            planner.starts_request(statement)
+        if bulk.ready:
+            load()
+        for index, statement in run_now:
+            run(index, statement)
+
+    statements = iter(statements)
+    following = next(statements, None)
+    while following is not None:
+        index, statement = following
+        following = next(statements, None)
+        if commit_every:
+            commit_every.arrived(index)
+        # Regrouped rows would change what a following LAST_INSERT_ID()/ROW_COUNT() sees.
+        if (prepared or bulk) and following is not None and _READS_SESSION.search(following[1]):
+            if bulk:
+                offered(bulk.finish(), [])
+            run(index, statement, as_written=True)
+        elif bulk:
+            offered(*bulk.offer(index, statement))
+        else:
+            run(index, statement)
+    if bulk:
+        offered(bulk.finish(), [])
+    sync()
+    return executed
@@ -0,0 +1,339 @@
+"""Watch mode: apply a server's SQL once, then re-apply .sql files as they are created or edited.
+
+    from FDS_watch import WatchSession
+    session = WatchSession(Path('/srv/fivem/server1'), 'qbcore')
+    session.run_batch()
+    while True:
+        session.run_batch(session.changes())
+
+Changes come from inotify on Linux and from stat polling elsewhere. Bursts of events
+(an editor's save, a git checkout) are debounced into one batch.
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from FDS_cache import open_cache
+from FDS_scan import DEFAULT_EXCLUDES, TreeWalker, scan_order_key
+
+if TYPE_CHECKING:
+    from FDS_engine import EngineOptions, FinishedHook, RunResult
+
+WATCH_MODES = ('auto', 'inotify', 'poll')
+POLL_INTERVAL = 0.5
+DEBOUNCE = 0.3
+# A batch starts at the latest this long after its first change, even if edits keep coming.
+MAX_BATCH_WAIT = 2.0
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_EVENT = struct.Struct('iIII')
+_READ_BYTES = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def _libc():
+    # ctypes is only imported once inotify is actually wanted, to keep CLI startup lean. The
+    # process's own symbols include libc's, so no find_library() (which runs ldconfig) is needed.
+    import ctypes
+    return ctypes.CDLL(None, use_errno=True)
+
+
+def _errno() -> int:
+    import ctypes
+    return ctypes.get_errno()
+
+
+class PollingWatcher:
+    """Finds created and modified files by stat'ing the tree.
+
+    Every known file and directory is stat'ed once per poll. A directory is only listed
+    again when its mtime changed, which is when files were added, removed or renamed in it.
+    """
+
+    name = 'poll'
+
+    def __init__(self, walker: TreeWalker):
+        self.walker = walker
+        self.dirs: Dict[str, int] = {}
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self._add_tree(walker.root, set())
+
+    def _add_tree(self, directory: str, changed: Set[str]):
+        for current, files in self.walker.walk(directory):
+            try:
+                self.dirs[current] = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            for path in files:
+                self._check_file(path, changed)
+
+    def _check_file(self, path: str, changed: Set[str]):
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.files.pop(path, None)
+            return
+        signature = (st.st_size, st.st_mtime_ns)
+        if self.files.get(path) != signature:
+            changed.add(path)
+            self.files[path] = signature
+
+    def poll(self) -> Set[str]:
+        changed = set()
+        for directory, mtime in list(self.dirs.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                del self.dirs[directory]
+                continue
+            if current == mtime:
+                continue
+            self.dirs[directory] = current
+            files, subdirs = self.walker.list(directory)
+            for path in files:
+                if path not in self.files:
+                    self._check_file(path, changed)
+            for subdir in subdirs:
+                if subdir not in self.dirs:
+                    self._add_tree(subdir, changed)
+        for path in list(self.files):
+            self._check_file(path, changed)
+        return changed
+
+    def wait(self, timeout: float, stop: threading.Event) -> Set[str]:
+        if stop.wait(timeout):
+            return set()
+        return self.poll()
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify through ctypes: one watch per directory, reporting files once they are
+    closed after writing or moved into place. New directories are watched and listed as they appear.
+    """
+
+    name = 'inotify'
+    MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+    def __init__(self, walker: TreeWalker):
+        libc = _libc()
+        self._libc = libc
+        self.walker = walker
+        self.fd = libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            errno = _errno()
+            raise OSError(errno, f"inotify_init1 failed: {os.strerror(errno)}")
+        self.dirs: Dict[int, str] = {}
+        try:
+            self._add_tree(walker.root, set())
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _add_tree(self, directory: str, changed: Set[str]):
+        for current, files in self.walker.walk(directory):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(current), self.MASK)
+            if wd < 0:
+                errno = _errno()
+                if errno == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                    raise OSError(errno, "inotify watch limit reached (raise fs.inotify.max_user_watches)")
+                continue
+            self.dirs[wd] = current
+            # Files written before the watch existed would otherwise be missed.
+            changed.update(files)
+
+    def _read(self) -> Set[str]:
+        changed = set()
+        try:
+            data = os.read(self.fd, _READ_BYTES)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                # Events were dropped; report everything and let the ledger skip what did not change.
+                changed.update(path for _, files in self.walker.walk(self.walker.root) for path in files)
+                continue
+            if mask & _IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & _IN_ISDIR:
+                if self.walker.descends(path):
+                    try:
+                        self._add_tree(path, changed)
+                    except OSError:
+                        pass  # Out of watches: what is already watched keeps working.
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO) and self.walker.matches(path):
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout: float, stop: threading.Event) -> Set[str]:
+        deadline = time.monotonic() + timeout
+        while not stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            # Wake up now and then so stop is noticed.
+            ready, _, _ = select.select([self.fd], [], [], min(remaining, POLL_INTERVAL))
+            if ready:
+                return self._read()
+        return set()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def inotify_available() -> bool:
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        return hasattr(_libc(), 'inotify_init1')
+    except OSError:
+        return False
+
+
+def make_watcher(walker: TreeWalker, mode: str = 'auto') -> Tuple[object, Optional[str]]:
+    """(watcher, warning): inotify where it is available (or required by mode), else polling."""
+    from FDS_engine import EngineError
+    if mode == 'poll':
+        return PollingWatcher(walker), None
+    if not inotify_available():
+        if mode == 'inotify':
+            raise EngineError("inotify is not available on this system; use --watch-mode poll.")
+        return PollingWatcher(walker), None
+    try:
+        return InotifyWatcher(walker), None
+    except OSError as e:
+        if mode == 'inotify':
+            raise EngineError(f"Could not watch with inotify: {e}")
+        return PollingWatcher(walker), f"Could not watch with inotify ({e}); polling every {POLL_INTERVAL}s instead."
+
+
+class WatchSession:
+    """One server in watch mode.
+
+    The connection, the fds_applied ledger, the classification cache and the rules stay
+    open between batches, so a batch only reclassifies, checksums and runs the files that
+    changed, on a connection that is already warm. The watcher is started before the
+    first batch, so edits made while it runs are picked up by the next one.
+    """
+
+    def __init__(self, root: Path, framework: str, dsn: Optional[str] = None, options: Optional['EngineOptions'] = None,
+                 mode: str = 'auto', debounce: float = DEBOUNCE):
+        # The engine is imported on first use, so the CLI can read this module's constants cheaply.
+        from FDS_engine import EngineOptions, load_rules, resolve_server
+        self.framework = framework
+        self.options = options or EngineOptions()
+        self.debounce = debounce
+        self.db_cfg, self.root = resolve_server(root, dsn)
+        self.rules = load_rules(self.root, self.options)
+        walker = TreeWalker(self.root, '*.sql', DEFAULT_EXCLUDES + self.options.excludes, self.options.max_depth)
+        self.watcher, warning = make_watcher(walker, mode)
+        self.warnings = [warning] if warning else []
+        self.cache = None
+        if self.options.use_cache:
+            self.cache, warning = open_cache(self.root, self.options.rebuild_cache, self.options.head_window)
+            if warning:
+                self.warnings.append(warning)
+        self.conn = None
+        self.ledger = None
+        self.stop = threading.Event()
+
+    def changes(self) -> List[Path]:
+        """Block until files change, then return them once no new change arrived for debounce
+        seconds (or MAX_BATCH_WAIT passed). Returns [] once stop is set."""
+        changed: Set[str] = set()
+        while not changed:
+            if self.stop.is_set():
+                return []
+            changed = self.watcher.wait(POLL_INTERVAL, self.stop)
+        deadline = time.monotonic() + MAX_BATCH_WAIT
+        while not self.stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self.watcher.wait(min(self.debounce, remaining), self.stop)
+            if not more:
+                break
+            changed |= more
+        # The same order a full run uses, so a batch applies files in the order a fresh start would.
+        files = sorted((Path(p) for p in changed if os.path.isfile(p)), key=scan_order_key)
+        if self.cache is not None:
+            for sql_path in files:
+                self.cache.forget(sql_path)
+        return files
+
+    def _warm_connection(self):
+        """The open connection if it still answers; a dropped one is re-established by the next plan."""
+        if self.conn is None:
+            return None
+        try:
+            self.conn.ping(reconnect=True, attempts=1)
+            return self.conn
+        except Exception:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = self.ledger = None
+            return None
+
+    def run_batch(self, files: Optional[List[Path]] = None, on_finished: Optional['FinishedHook'] = None) -> 'RunResult':
+        """Filter and run files (the whole tree when None) like execute(), keeping the connection open."""
+        from FDS_engine import EngineError, Plan, execute
+        conn = self._warm_connection()
+        batch = Plan(self.framework, self.root, self.db_cfg, self.options, self.rules, files=files, conn=conn,
+                     ledger=self.ledger if conn is not None else None, cache=self.cache)
+        result = execute(batch, on_finished=on_finished, keep_connection=True)
+        if result.error:
+            batch.close()
+            self.conn = self.ledger = None
+            return result
+        try:
+            self.conn = batch.connection()
+            self.ledger = batch.ledger
+        except EngineError as e:
+            result.warnings.append(f"Could not keep the connection open: {e}")
+            batch.close()
+            self.conn = self.ledger = None
+        return result
+
+    def close(self) -> Optional[str]:
+        """Stop watching and close the connection; returns an error if the cache could not be saved."""
+        self.stop.set()
+        self.watcher.close()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+        if self.cache is not None:
+            try:
+                self.cache.close()
+            except Exception as e:
+                return f"Could not save the classification cache: {e}"
+        return None
@@ -0,0 +1,25 @@
+from FDS_cache import ClassificationCache, open_cache
+
+
+def test_unwritable_cache_dir_disables_the_cache(tmp_path):
+    cache, warning = open_cache(tmp_path / 'missing')
+    assert cache is None
+    assert 'Classification cache disabled' in warning
+
+
+def test_head_window_change_drops_entries(tmp_path):
+    sql_path = tmp_path / 'items.sql'
+    sql_path.write_text("INSERT INTO items (name) VALUES ('bread');")
+    cache = ClassificationCache(tmp_path, head_window=4096)
+    cache.framework_for(sql_path)
+    cache.close()
+
+    same = ClassificationCache(tmp_path, head_window=4096)
+    same.framework_for(sql_path)
+    assert (same.hits, same.misses) == (1, 0)
+    same.close()
+
+    changed = ClassificationCache(tmp_path, head_window=8192)
+    changed.framework_for(sql_path)
+    assert (changed.hits, changed.misses) == (0, 1)
+    changed.close()
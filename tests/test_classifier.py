@@ -0,0 +1,144 @@
+import random
+import re
+
+import pytest
+
+from FDS_classifier import (
+    ESX_MARKERS, FRAMEWORK_LITERALS, FRAMEWORK_PATTERNS, FRAMEWORKS, classify_files, classify_sql_buffer, classify_sql_file,
+)
+
+# Names and text fragments the corpus is assembled from: every framework's markers,
+# near misses of them, and neutral filler.
+NAMES = ['install.sql', 'items.sql', 'items_limit.sql', 'items_weight.sql', 'qbx_garages.sql', 'esx_jobs.sql',
+         'qb-phone.sql', 'ox_doorlock.sql', 'oxcore.sql', 'vehicles.sql', 'default.sql', 'box.sql']
+MARKERS = [
+    '-- ESX', '-- only for ESX', 'es_extended', 'INSERT INTO `users` VALUES (1);', 'INSERT IGNORE INTO items VALUES (1);',
+    "CREATE TABLE IF NOT EXISTS `items` (`name` VARCHAR(50));", 'ALTER TABLE `items` ADD `weight` INT;',
+    '-- item limit', 'UPDATE jobs SET label = 1;', 'job_grades', 'owned_vehicles', 'user_licenses', 'property',
+    'database.items', 'phone_users_contacts', 'addon_inventory_items',
+    '-- QBCore', 'qbcore framework', 'INSERT INTO `players` VALUES (1);', 'player_vehicles', 'JSON_EXTRACT(a, "$.b")',
+    'metadata', 'inventory', 'trunkitems', 'gloveboxitems', 'qb_', 'qbcore_', 'player_outfits',
+    '-- OX', 'ox_inventory', 'ox_doorlock', 'oxcore_x', 'owned_keys', 'doorlock',
+    '-- QBX', 'qbx_core', 'QBX',
+]
+NEAR_MISSES = ['esxx', 'usersx', 'jobsx', 'xqb_', 'boxer', 'players2', 'propertyx', 'itemsx', 'éusers', 'usersé',
+               'ESX'.lower() + 'é', 'qbxé', 'ſtuff', 'ıtems']
+FILLER = [
+    "INSERT INTO `garages` (`name`, `label`) VALUES ('pillbox', 'Pillbox Hill');",
+    "UPDATE `config` SET `value` = 'on' WHERE `key` = 'weather';",
+    'CREATE TABLE IF NOT EXISTS `garages` (`id` INT NOT NULL AUTO_INCREMENT, PRIMARY KEY (`id`));',
+    "-- generated by the map editor",
+    "INSERT INTO `shops` VALUES ('Café 24/7', 'Straße');",
+]
+
+
+def reference_classify(sql_path):
+    """The classifier as it shipped before it was precompiled, kept as the golden reference."""
+    name = sql_path.name.lower()
+    with sql_path.open(encoding='utf-8', errors='ignore') as f:
+        content = f.read()
+    if re.search(r'only for esx|esx where|esx only|es_extended', content, re.IGNORECASE):
+        return 'esx'
+    if re.search(r'insert\s+(ignore\s+)?[`\"]?items[`\"]?', content, re.IGNORECASE):
+        return 'esx'
+    if re.search(r'create table if not exists [`\"]?items[`\"]?', content, re.IGNORECASE):
+        return 'esx'
+    if name in ['items_limit.sql', 'items_weight.sql'] and 'esx' in content.lower():
+        return 'esx'
+    for pat in FRAMEWORK_PATTERNS['esx']:
+        if re.search(pat, content, re.IGNORECASE):
+            return 'esx'
+    for line in content.splitlines():
+        if 'database.items' in line.lower():
+            return 'esx'
+    if 'qbx' in name:
+        return 'qbx'
+    for pat in FRAMEWORK_PATTERNS['qbx']:
+        if re.search(pat, content, re.IGNORECASE):
+            return 'qbx'
+    qbcore_match = any(re.search(pat, content, re.IGNORECASE) for pat in FRAMEWORK_PATTERNS['qbcore'])
+    ox_match = any(re.search(pat, content, re.IGNORECASE) for pat in FRAMEWORK_PATTERNS['ox'])
+    if qbcore_match and ox_match:
+        return 'qbx'
+    for fw, keywords in FRAMEWORKS.items():
+        if fw in ('other', 'qbx'):
+            continue
+        if any(kw in name for kw in keywords):
+            return fw
+    with sql_path.open(encoding='utf-8', errors='ignore') as f:
+        prefix = f.read(4096)
+    for fw, patterns in FRAMEWORK_PATTERNS.items():
+        if fw == 'qbx':
+            continue
+        for pat in patterns:
+            if re.search(pat, prefix, re.IGNORECASE):
+                return fw
+    return None
+
+
+def generate_corpus(directory, count, seed=1):
+    """count .sql files mixing markers, near misses and filler; some put a marker right after
+    the first 4 KB, use CRLF line endings, upper case or contain invalid UTF-8."""
+    rng = random.Random(seed)
+    paths = []
+    for n in range(count):
+        lines = [rng.choice(FILLER) for _ in range(rng.randint(1, 150))]
+        for _ in range(rng.randint(0, 2)):
+            lines.insert(rng.randint(0, len(lines)), rng.choice(MARKERS + NEAR_MISSES))
+        text = '\n'.join(lines)
+        if rng.random() < 0.2:
+            text = text[:4096 - rng.randint(0, 8)] + rng.choice(MARKERS) + text[4096:]
+        if rng.random() < 0.2:
+            text = text.upper()
+        data = text.encode('utf-8')
+        if rng.random() < 0.2:
+            data = data.replace(b'\n', b'\r\n')
+        if rng.random() < 0.1:
+            cut = rng.randint(0, len(data))
+            data = data[:cut] + b'\xff\xc3' + data[cut:]
+        path = directory / f'{n:04d}' / rng.choice(NAMES)
+        path.parent.mkdir()
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    return generate_corpus(tmp_path_factory.mktemp('corpus'), 150)
+
+
+def test_verdicts_match_the_reference(corpus):
+    expected = [reference_classify(path) for path in corpus]
+    assert len(set(expected)) == 5  # every framework and None show up
+    assert [classify_sql_file(path) for path in corpus] == expected
+
+
+def test_byte_classifier_matches_the_reference(corpus):
+    # The memory-mapped path classifies raw bytes; CRLF files are left out, as bytes keep the \r.
+    plain = [path for path in corpus if b'\r' not in path.read_bytes()]
+    assert [classify_sql_buffer(p.name.lower(), p.read_bytes()) for p in plain] == [reference_classify(p) for p in plain]
+
+
+@pytest.mark.parametrize('text', [
+    'UPDATE jobſ SET a = 1;',
+    'CREATE TABLE IF NOT EXISTS İtems (a INT);',
+    'INSERT INTO owned_\u212aeys VALUES (1);',
+    'SELECT 1 FROM plaıers_x, ınventory;',
+])
+def test_case_folding_outside_ascii_matches_the_reference(tmp_path, text):
+    path = tmp_path / 'install.sql'
+    path.write_text(text, encoding='utf-8')
+    assert classify_sql_file(path) == reference_classify(path)
+
+
+@pytest.mark.parametrize('framework', sorted(FRAMEWORK_LITERALS))
+def test_every_pattern_requires_one_of_its_literals(framework):
+    patterns = FRAMEWORK_PATTERNS[framework] + (ESX_MARKERS if framework == 'esx' else [])
+    for pattern in patterns:
+        for alternative in pattern.lower().split('|'):
+            assert any(literal in alternative for literal in FRAMEWORK_LITERALS[framework]), alternative
+
+
+def test_classify_files_keeps_order(corpus):
+    assert classify_files(corpus[:100]) == [classify_sql_file(path) for path in corpus[:100]]
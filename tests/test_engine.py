@@ -0,0 +1,140 @@
+import sys
+
+import pytest
+
+from FDS_engine import run_sql_file
+
+
+class TransactionalCursor:
+    """Runs one statement per execute() into its connection's open transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.with_rows = False
+        self.rowcount = 1
+
+    def execute(self, sql, params=None):
+        if 'fail' in sql:
+            raise RuntimeError(f"1146: Table doesn't exist ({sql})")
+        self.conn.pending.append(sql)
+
+    def close(self):
+        pass
+
+
+class TransactionalConnection:
+    """A stand-in server that only keeps what was committed."""
+
+    def __init__(self):
+        self.pending = []
+        self.committed = []
+        self.rollbacks = 0
+
+    def cursor(self, prepared=False):
+        return TransactionalCursor(self)
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pending = []
+
+    def is_connected(self):
+        return True
+
+
+def write_sql(tmp_path, name, statements):
+    path = tmp_path / name
+    path.write_text(''.join(f'{s};\n' for s in statements))
+    return path
+
+
+def run(path, conn, **kwargs):
+    return run_sql_file(path, conn, batch_statements=1, rewrite=False, **kwargs)
+
+
+def test_failed_file_is_rolled_back_before_the_connection_is_reused(tmp_path):
+    conn = TransactionalConnection()
+    broken = write_sql(tmp_path, 'broken.sql', ['UPDATE a SET x = 1', 'UPDATE fail SET x = 1'])
+    assert run(broken, conn)
+    assert conn.rollbacks == 1
+    assert run(write_sql(tmp_path, 'next.sql', ['UPDATE b SET x = 1']), conn) is None
+    assert conn.committed == ['UPDATE b SET x = 1']
+
+
+def test_failed_file_in_a_shared_transaction_is_left_to_the_group(tmp_path):
+    conn = TransactionalConnection()
+    broken = write_sql(tmp_path, 'broken.sql', ['UPDATE a SET x = 1', 'UPDATE fail SET x = 1'])
+    assert run(broken, conn, commit=False)
+    assert conn.rollbacks == 0 and conn.pending == ['UPDATE a SET x = 1']
+
+
+def test_resume_after_a_mid_file_failure_repeats_nothing(tmp_path):
+    conn = TransactionalConnection()
+    checkpoints = {}
+
+    def checkpoint(checkpoint_conn, resume_at):
+        checkpoint_conn.pending.append(f'checkpoint {resume_at}')
+        checkpoints['saved'] = resume_at
+
+    statements = [f'UPDATE t SET x = {n}' for n in range(1, 7)]
+    broken = statements[:5] + ['UPDATE fail SET x = 6']
+    path = write_sql(tmp_path, 'items.sql', broken)
+    assert run(path, conn, commit_statements=2, checkpoint=checkpoint)
+    # Another file committing on the same connection must not carry the failed file's tail along.
+    assert run(write_sql(tmp_path, 'other.sql', ['UPDATE other SET x = 1']), conn) is None
+    resume_at = max(int(s.split()[1]) for s in conn.committed if s.startswith('checkpoint'))
+    assert [s for s in conn.committed if s.startswith('UPDATE t')] == statements[:resume_at - 1]
+
+    path.write_text(''.join(f'{s};\n' for s in statements))
+    assert run(path, conn, commit_statements=2, checkpoint=checkpoint, resume_at=resume_at) is None
+    assert [s for s in conn.committed if s.startswith('UPDATE t')] == statements
+
+
+def test_one_bad_server_does_not_stop_the_others(tmp_path, monkeypatch):
+    import FDS_engine
+
+    def fake_plan(root, framework, dsn, options):
+        if 'broken' in str(root):
+            raise OSError('Permission denied')
+        return root
+
+    monkeypatch.setattr(FDS_engine, 'plan', fake_plan)
+    monkeypatch.setattr(FDS_engine, 'execute', lambda server_plan: FDS_engine.RunResult(str(server_plan)))
+    targets = [(tmp_path / 'ok', None), (tmp_path, 'mysql://root@localhost:notaport/fivem'),
+               (tmp_path / 'broken', None), (tmp_path / 'ok2', None)]
+    results = FDS_engine.provision(targets, 'esx', workers=2)
+    assert [r.error is None for r in results] == [True, False, False, True]
+    assert 'Error parsing DB URL' in results[1].error and 'notaport' not in results[1].target
+    assert results[2].error == 'Permission denied'
+
+
+def test_filtered_files_carry_the_framework_detected_while_planning(tmp_path):
+    from FDS_cache import ClassificationCache
+    from FDS_engine import iter_filtered_sql_files
+
+    esx = tmp_path / 'esx_shops.sql'
+    esx.write_text("INSERT INTO `users` (`identifier`) VALUES ('a');\nUPDATE users SET job = 'unemployed';\n")
+    plain = tmp_path / 'plain.sql'
+    plain.write_text('CREATE TABLE notes (id INT);\n')
+    files = [esx, plain]
+    expected = {}
+    kept = list(iter_filtered_sql_files(files, 'esx', frameworks=expected))
+    assert expected == {esx: 'esx', plain: None}
+
+    for _ in range(2):  # The second pass reuses the cached decisions.
+        cache = ClassificationCache(tmp_path)
+        frameworks = {}
+        assert list(iter_filtered_sql_files(files, 'esx', cache, frameworks=frameworks)) == kept
+        cache.close()
+        assert frameworks == expected
+
+
+def test_missing_dotenv_is_an_engine_error(tmp_path, monkeypatch):
+    from FDS_engine import EngineError, resolve_server
+
+    monkeypatch.setitem(sys.modules, 'dotenv', None)
+    with pytest.raises(EngineError, match='python-dotenv is not installed'):
+        resolve_server(tmp_path)
@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pytest
+
+from FDS_executor import DependencyExecutor, scan_file_tables
+
+
+def test_connection_is_reused_after_a_file_raises():
+    opened = []
+    used = []
+
+    def connect():
+        opened.append(object())
+        return opened[-1]
+
+    def run_file(sql_path, conn):
+        used.append(conn)
+        if sql_path.name == 'broken.sql':
+            raise RuntimeError('server went away')
+        return None
+
+    executor = DependencyExecutor(connect, run_file, jobs=1)
+    for name in ('broken.sql', 'items.sql'):
+        executor.add(Path(name), tables=None)
+    results = executor.wait()
+    executor.close()
+    assert [error for _, error in results] == ['server went away', None]
+    assert len(opened) == 1 and used == [opened[0], opened[0]]
+
+
+@pytest.mark.parametrize('statement, writes, reads', [
+    ('INSERT INTO shop_stock (item) SELECT name FROM items WHERE price > 0', {'shop_stock'}, {'items'}),
+    ('UPDATE users u JOIN jobs j ON j.name = u.job SET u.salary = j.salary', {'users'}, {'jobs'}),
+    ('UPDATE users SET job = (SELECT name FROM jobs LIMIT 1)', {'users'}, {'jobs'}),
+    ('DELETE FROM owned_vehicles WHERE owner NOT IN (SELECT identifier FROM users)', {'owned_vehicles'}, {'users'}),
+    ('INSERT INTO items VALUES (\'bread\', \'taken from the shop\')', {'items'}, set()),
+    ('SELECT i.name FROM items i, `shops` s WHERE i.shop = s.id', set(), {'items', 'shops'}),
+])
+def test_write_statements_record_the_tables_they_read(tmp_path, statement, writes, reads):
+    sql = tmp_path / 'file.sql'
+    sql.write_text(statement + ';\n', encoding='utf-8')
+    tables = scan_file_tables(sql)
+    assert not tables.barrier
+    assert tables.uses == writes and tables.reads == reads
+
+
+@pytest.mark.parametrize('statement, creates, reads', [
+    ('CREATE TABLE items_backup LIKE items', {'items_backup'}, {'items'}),
+    ('CREATE TABLE rich AS SELECT identifier FROM users JOIN bank ON bank.owner = users.identifier',
+     {'rich'}, {'users', 'bank'}),
+])
+def test_create_table_records_the_tables_it_copies(tmp_path, statement, creates, reads):
+    sql = tmp_path / 'file.sql'
+    sql.write_text(statement + ';\n', encoding='utf-8')
+    tables = scan_file_tables(sql)
+    assert tables.creates == creates and tables.reads == reads
+
+
+def test_reader_waits_for_the_files_that_create_and_fill_its_source(tmp_path):
+    files = {
+        'a_items.sql': 'CREATE TABLE items (name VARCHAR(50));',
+        'b_fill.sql': "INSERT INTO items VALUES ('bread');",
+        'c_shop.sql': 'CREATE TABLE shop (name VARCHAR(50));',
+        'd_copy.sql': 'INSERT INTO shop (name) SELECT name FROM items;',
+        'e_clean.sql': "DELETE FROM items WHERE name = 'bread';",
+    }
+    executor = DependencyExecutor(lambda: object(), lambda path, conn: None, jobs=4)
+    deps = {}
+    for index, (name, statement) in enumerate(files.items()):
+        path = tmp_path / name
+        path.write_text(statement + '\n', encoding='utf-8')
+        deps[name] = executor._dependencies(index, scan_file_tables(path))
+    executor.close()
+    assert deps['b_fill.sql'] == {0}
+    assert deps['d_copy.sql'] == {0, 1, 2}
+    assert deps['e_clean.sql'] == {0, 3}
@@ -0,0 +1,44 @@
+import gc
+import threading
+
+import pytest
+
+from FDS_pipeline import threaded
+
+
+def endless(closed: threading.Event):
+    try:
+        n = 0
+        while True:
+            yield n
+            n += 1
+    finally:
+        closed.set()
+
+
+def test_items_come_through_in_order():
+    assert list(threaded(iter(range(1000)), maxsize=4)) == list(range(1000))
+
+
+def test_producer_error_is_raised_in_the_consumer():
+    def failing():
+        yield 1
+        raise ValueError('bad file')
+
+    with pytest.raises(ValueError, match='bad file'):
+        list(threaded(failing()))
+
+
+def test_closing_before_the_first_item_stops_the_producer():
+    closed = threading.Event()
+    stage = threaded(endless(closed), maxsize=2)
+    stage.close()
+    assert closed.wait(5)
+
+
+def test_dropping_a_chained_stage_stops_every_producer():
+    closed = threading.Event()
+    stage = threaded(threaded(endless(closed), maxsize=2), maxsize=2)
+    del stage
+    gc.collect()
+    assert closed.wait(5)
@@ -0,0 +1,37 @@
+from FDS_cache import CACHE_FILENAME, ClassificationCache
+from FDS_engine import EngineOptions, preview
+from FDS_history import HISTORY_FILENAME, RunHistory, StatementProfile
+from FDS_ledger import file_checksum
+
+DSN = 'mysql://root@localhost/fivem'
+
+
+def make_tree(tmp_path):
+    sql_path = tmp_path / 'resources' / 'esx_shops' / 'install.sql'
+    sql_path.parent.mkdir(parents=True)
+    sql_path.write_text("INSERT INTO `users` (`identifier`) VALUES ('a');\n")
+    return sql_path
+
+
+def test_preview_writes_nothing(tmp_path):
+    make_tree(tmp_path)
+    before = sorted(p.name for p in tmp_path.iterdir())
+    result = preview(tmp_path, 'esx', DSN, EngineOptions())
+    assert [f['path'] for f in result.files] == ['resources/esx_shops/install.sql']
+    assert sorted(p.name for p in tmp_path.iterdir()) == before
+
+
+def test_preview_reads_existing_history_and_cache_without_changing_them(tmp_path):
+    sql_path = make_tree(tmp_path)
+    cache = ClassificationCache(tmp_path)
+    cache.framework_for(sql_path)
+    cache.close()
+    history = RunHistory(tmp_path)
+    history.record('resources/esx_shops/install.sql', file_checksum(sql_path), 2.5, StatementProfile())
+    history.close()
+    stamps = {name: (tmp_path / name).stat().st_mtime_ns for name in (CACHE_FILENAME, HISTORY_FILENAME)}
+
+    result = preview(tmp_path, 'esx', DSN, EngineOptions())
+    assert result.files[0]['estimate_source'] == 'history'
+    assert result.files[0]['estimate_seconds'] == 2.5
+    assert {name: (tmp_path / name).stat().st_mtime_ns for name in stamps} == stamps
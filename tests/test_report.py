@@ -0,0 +1,28 @@
+import json
+
+import pytest
+
+from FDS_report import RunReport
+
+
+def test_ndjson_report_streams_every_event(tmp_path):
+    path = tmp_path / 'run.ndjson'
+    report = RunReport('esx', 'server', str(path))
+    report.connected(0.25)
+    timing = report.start_file('items.sql')
+    report.finish_file(timing, None)
+    report.finish()
+    report.write()
+    events = [json.loads(line)['event'] for line in path.read_text(encoding='utf-8').splitlines()]
+    assert events == ['run_started', 'connect', 'file', 'run_finished']
+
+
+def test_unwritable_ndjson_report_fails_on_write_not_during_the_run(tmp_path):
+    path = tmp_path / 'missing' / 'run.ndjson'
+    report = RunReport('esx', 'server', str(path))
+    report.connected(0.25)
+    report.finish_file(report.start_file('items.sql'), None)
+    report.finish()
+    assert report.totals()['files'] == 1
+    with pytest.raises(OSError):
+        report.write()
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from FDS_rules import PathRules, RuleSet, load_rules_file, normalize_rule_path
+
+
+def matches(entries, path):
+    return PathRules(entries).matches(normalize_rule_path(path))
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('ox_doorlock/sql/default.sql', True),
+    ('C:\\server\\resources\\ox_doorlock\\sql\\default.sql', True),
+    ('./resources/OX_DOORLOCK/sql/Default.sql', True),
+    ('other_doorlock/sql/default.sql', False),
+    ('ox_doorlock/default.sql', False),
+])
+def test_exact_entry_matches_the_path_or_a_component_suffix(path, expected):
+    assert matches(['ox_doorlock/sql/default.sql'], path) is expected
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('resources/esx_shops/install.sql', True),
+    ('install.sql', True),
+    ('resources/esx_shops/reinstall.sql', False),
+])
+def test_file_name_entry_matches_in_any_folder(path, expected):
+    assert matches(['install.sql'], path) is expected
+
+
+@pytest.mark.parametrize('entry, path, expected', [
+    ('esx_*/install.sql', 'resources/esx_shops/install.sql', True),
+    ('esx_*/install.sql', 'resources/qb_shops/install.sql', False),
+    ('*.sql', 'resources/anything.sql', True),
+    ('upgrade_?.sql', 'resources/esx_shops/upgrade_2.sql', True),
+    ('upgrade_?.sql', 'resources/esx_shops/upgrade_10.sql', False),
+    ('shops/*.sql', 'resources/esx_shops/install.sql', False),
+])
+def test_glob_entry_is_anchored_at_a_component_boundary(entry, path, expected):
+    assert matches([entry], path) is expected
+
+
+@pytest.mark.parametrize('entry, path, expected', [
+    ('[core]/esx_menu/menu.sql', 'resources/[core]/esx_menu/menu.sql', True),
+    ('[core]/*.sql', 'resources/[core]/esx_menu/menu.sql', True),
+    ('[core]/*.sql', 'resources/c/esx_menu/menu.sql', False),
+    ('[core]/*.sql', 'resources/[standalone]/esx_menu/menu.sql', False),
+])
+def test_bracketed_category_folders_are_literal(entry, path, expected):
+    assert matches([entry], path) is expected
+
+
+def test_rules_file_sections_and_whitelist_order(tmp_path):
+    rules_file = tmp_path / '.fdsrules'
+    rules_file.write_text('# comment\nbroken.sql\n[whitelist]\n[core]/*/needed.sql\n', encoding='utf-8')
+    assert load_rules_file(rules_file) == (['broken.sql'], ['[core]/*/needed.sql'])
+    rules = RuleSet.load([], [], rules_file)
+    decisions = [(Path('a/needed.sql'), False), (Path('[core]/x/needed.sql'), False),
+                 (Path('a/broken.sql'), True), (Path('a/kept.sql'), True)]
+    assert list(rules.iter_apply(decisions)) == [Path('a/kept.sql'), Path('[core]/x/needed.sql')]
+
+
+def test_unknown_section_is_rejected(tmp_path):
+    rules_file = tmp_path / '.fdsrules'
+    rules_file.write_text('[allow]\nx.sql\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='unknown section'):
+        load_rules_file(rules_file)
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from FDS_scan import CFG_FILENAME, DEFAULT_EXCLUDES, IGNORE_FILENAME, locate_server_cfg, scan_files, scan_order_key
+
+
+def make_files(root, *rel_paths):
+    for rel in rel_paths:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('SELECT 1;\n')
+
+
+def scanned(root, **kwargs):
+    return [p.relative_to(root).as_posix() for p in scan_files('*.sql', root, **kwargs)]
+
+
+def test_server_cfg_created_after_a_lookup_is_found(tmp_path):
+    server = tmp_path / 'server'
+    (server / 'resources').mkdir(parents=True)
+    assert locate_server_cfg(server / 'resources', max_levels=0) == []
+    (server / CFG_FILENAME).write_text('set mysql_connection_string "mysql://root@localhost/fivem"\n')
+    assert locate_server_cfg(server / 'resources') == [(server / CFG_FILENAME).resolve()]
+    assert locate_server_cfg(server) == [(server / CFG_FILENAME).resolve()]
+
+
+def test_removed_server_cfg_is_not_reported(tmp_path):
+    cfg = tmp_path / 'server' / CFG_FILENAME
+    cfg.parent.mkdir()
+    cfg.write_text('')
+    assert locate_server_cfg(tmp_path, max_levels=0) == [cfg.resolve()]
+    cfg.unlink()
+    assert locate_server_cfg(tmp_path, max_levels=0) == []
+
+
+def test_server_cfg_below_start_wins_over_one_above(tmp_path):
+    outer = tmp_path / CFG_FILENAME
+    outer.write_text('')
+    inner = tmp_path / 'servers' / 'main' / CFG_FILENAME
+    inner.parent.mkdir(parents=True)
+    inner.write_text('')
+    assert locate_server_cfg(tmp_path / 'servers') == [inner.resolve()]
+    assert locate_server_cfg(tmp_path) == [outer.resolve()]
+    assert locate_server_cfg(tmp_path / 'servers' / 'main') == [inner.resolve()]
+    inner.unlink()
+    assert locate_server_cfg(tmp_path / 'servers') == [outer.resolve()]
+
+
+def reference_order(root):
+    """Files before subdirectories, both sorted by name, depth first."""
+    found = []
+
+    def visit(directory):
+        entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        found.extend(e.path for e in entries if e.is_file() and e.name.endswith('.sql'))
+        for entry in entries:
+            if entry.is_dir():
+                visit(entry.path)
+
+    visit(root)
+    return [os.path.relpath(p, root).replace(os.sep, '/') for p in found]
+
+
+@pytest.mark.parametrize('workers', [1, 2, 16])
+def test_walker_order_is_stable_and_sorted_depth_first(tmp_path, workers):
+    make_files(tmp_path, 'z.sql', 'a.sql', 'notes.txt')
+    for category in ('[core]', '[esx]', 'standalone'):
+        for n in range(6):
+            make_files(tmp_path, f'resources/{category}/res_{n}/install.sql', f'resources/{category}/res_{n}/sql/b.sql',
+                       f'resources/{category}/res_{n}/sql/a.sql', f'resources/{category}/res_{n}/upgrade.sql')
+    found = scanned(tmp_path, workers=workers)
+    assert found == reference_order(tmp_path)
+    assert sorted(found, key=lambda rel: scan_order_key(tmp_path / rel)) == found
+    assert found[:2] == ['a.sql', 'z.sql'] and len(found) == 2 + 3 * 6 * 4
+
+
+def test_default_excludes_prune_heavy_folders(tmp_path):
+    make_files(tmp_path, 'resources/shop/install.sql', 'resources/shop/node_modules/pkg/seed.sql',
+               '.git/hooks/x.sql', 'cache/files/y.sql', 'txData/z.sql')
+    assert scanned(tmp_path) == ['resources/shop/install.sql']
+    assert len(scanned(tmp_path, excludes=[])) == 5
+    assert {'node_modules', '.git', 'cache', 'txData'} <= set(DEFAULT_EXCLUDES)
+
+
+def test_exclude_names_globs_and_paths(tmp_path):
+    make_files(tmp_path, 'resources/shop/install.sql', 'resources/shop_old/install.sql',
+               'resources/esx_jobs/sql/jobs.sql', 'resources/esx_jobs/install.sql', 'legacy/backup.sql')
+    found = scanned(tmp_path, excludes=['legacy', '*_old', 'resources/esx_*/sql'])
+    assert found == ['resources/esx_jobs/install.sql', 'resources/shop/install.sql']
+
+
+def test_fdsignore_adds_patterns_unless_disabled(tmp_path):
+    make_files(tmp_path, 'resources/shop/install.sql', 'resources/[test]/fixtures.sql', 'resources/old/x.sql')
+    (tmp_path / IGNORE_FILENAME).write_text('# test data\n\nold/\nresources/[[]test]\n', encoding='utf-8')
+    assert scanned(tmp_path) == ['resources/shop/install.sql']
+    assert len(scanned(tmp_path, use_ignore_file=False)) == 3
+
+
+def test_max_depth_limits_how_far_the_walk_descends(tmp_path):
+    make_files(tmp_path, 'top.sql', 'a/one.sql', 'a/b/two.sql', 'a/b/c/three.sql')
+    assert scanned(tmp_path, max_depth=0) == ['top.sql']
+    assert scanned(tmp_path, max_depth=2) == ['top.sql', 'a/one.sql', 'a/b/two.sql']
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    make_files(tmp_path, 'elsewhere/data.sql', 'server/resources/shop/install.sql')
+    try:
+        (tmp_path / 'server' / 'resources' / 'link').symlink_to(tmp_path / 'elsewhere', target_is_directory=True)
+    except (OSError, NotImplementedError):
+        pytest.skip('symlinks are not available')
+    assert scanned(tmp_path / 'server') == ['resources/shop/install.sql']
@@ -0,0 +1,64 @@
+import pytest
+
+from FDS_schema import SchemaSnapshot
+
+
+class SchemaCursor:
+    """information_schema of a database with players(id, name) and its PRIMARY index."""
+
+    def execute(self, sql):
+        self.sql = sql
+
+    def fetchone(self):
+        return (0,)
+
+    def fetchall(self):
+        if 'COLUMNS' in self.sql:
+            return [('players', 'id'), ('players', 'name')]
+        if 'STATISTICS' in self.sql:
+            return [('players', 'PRIMARY')]
+        return [('players',)]
+
+    def close(self):
+        pass
+
+
+class SchemaConnection:
+    def cursor(self):
+        return SchemaCursor()
+
+
+@pytest.fixture
+def snapshot():
+    return SchemaSnapshot(SchemaConnection())
+
+
+@pytest.mark.parametrize('statement', [
+    "CREATE TABLE IF NOT EXISTS players (id INT)",
+    "ALTER TABLE players ADD COLUMN IF NOT EXISTS name VARCHAR(50)",
+    "ALTER TABLE players DROP COLUMN IF EXISTS money",
+])
+def test_provable_noops_are_pruned(snapshot, statement):
+    assert snapshot.is_noop(statement)
+
+
+@pytest.mark.parametrize('statement', [
+    "CREATE TEMPORARY TABLE IF NOT EXISTS players (id INT)",
+    "CREATE TABLE IF NOT EXISTS other_db.players (id INT)",
+    "ALTER TABLE IF EXISTS players ADD COLUMN IF NOT EXISTS name VARCHAR(50)",
+    "ALTER TABLE other_db.players ADD COLUMN IF NOT EXISTS name VARCHAR(50)",
+    "CREATE INDEX IF NOT EXISTS PRIMARY ON other_db.players (id)",
+])
+def test_untracked_tables_are_never_pruned(snapshot, statement):
+    assert not snapshot.is_noop(statement)
+    snapshot.observe(statement)
+    assert not snapshot.trusted
+
+
+@pytest.mark.parametrize('statement', [
+    "DROP TEMPORARY TABLE IF EXISTS players",
+    "DROP TABLE IF EXISTS other_db.players",
+])
+def test_untracked_drops_stop_pruning(snapshot, statement):
+    snapshot.observe(statement)
+    assert not snapshot.is_noop("CREATE TABLE IF NOT EXISTS players (id INT)")
@@ -0,0 +1,132 @@
+from FDS_session import BULK_SESSION, TransactionGroups
+
+
+class GroupConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_failed_file_rolls_back_its_group():
+    conn = GroupConnection()
+    groups = TransactionGroups(max_files=3)
+    assert groups.finished(conn, 'a.sql', 10) is None
+    groups.abort(conn, 'b.sql')
+    assert conn.rollbacks == 1 and conn.commits == 0
+    assert 'b.sql' in groups.failed['a.sql']
+    assert groups.close(conn) is None and conn.commits == 0
+
+
+class SessionCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.with_rows = False
+        self.rowcount = 1
+        self.row = None
+
+    def execute(self, sql, params=None):
+        if sql.startswith('SELECT @@SESSION.'):
+            self.row = tuple(self.conn.session[name.strip()[len('@@SESSION.'):]] for name in sql[7:].split(','))
+        elif sql.startswith('SET SESSION '):
+            values = iter(params or ())
+            for assignment in sql[len('SET SESSION '):].split(','):
+                name, value = (part.strip() for part in assignment.split('='))
+                self.conn.session[name] = next(values) if value == '%s' else int(value)
+        elif sql.startswith('SELECT'):
+            self.row = (4 * 1024 * 1024,)
+        elif 'fail' in sql:
+            raise RuntimeError(f"1146: Table doesn't exist ({sql})")
+        else:
+            self.conn.pending.append(sql)
+            self.conn.seen = dict(self.conn.session)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class SessionConnection(GroupConnection):
+    """A stand-in server whose session variables, unlike rows, survive a rollback."""
+
+    def __init__(self):
+        super().__init__()
+        self.session = {name: 1 for name, _ in BULK_SESSION}
+        self.seen = None
+        self.pending = []
+        self.committed = []
+
+    def cursor(self, prepared=False):
+        return SessionCursor(self)
+
+    def commit(self):
+        super().commit()
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        super().rollback()
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class StubLedger:
+    def resume_at(self, rel, checksum):
+        return 1
+
+    def record(self, conn, rel, checksum, framework, seconds, commit=True):
+        return None
+
+
+class StubPlan:
+    """The parts of FDS_engine.Plan that execute() uses, over a fixed list of files."""
+
+    def __init__(self, root, files, conn, options):
+        self.root = root
+        self.options = options
+        self.server = 'stub'
+        self.framework = 'esx'
+        self.db_cfg = {}
+        self.conn = conn
+        self.ledger = StubLedger()
+        self.connect_seconds = 0.0
+        self.cache_error = None
+        self.unchanged = []
+        self._files = files
+
+    def entries(self):
+        for path in self._files:
+            yield path, path.name, 'checksum', None
+
+    def connection(self):
+        return self.conn
+
+    def close(self):
+        pass
+
+
+def test_session_settings_are_restored_when_a_grouped_file_fails(tmp_path):
+    from FDS_engine import EngineOptions, execute
+    files = []
+    for name, statement in [('a.sql', 'UPDATE a SET x = 1'), ('b.sql', 'UPDATE fail SET x = 1'),
+                            ('c.sql', 'UPDATE c SET x = 1')]:
+        files.append(tmp_path / name)
+        files[-1].write_text(statement + ';\n')
+    conn = SessionConnection()
+    options = EngineOptions(group_files=3, bulk_session=True, batch_statements=1, rewrite=False,
+                            schema_check=False, history=False, retries=0)
+    result = execute(StubPlan(tmp_path, files, conn, options), keep_connection=True)
+    assert [error is None for _, error, _ in result.files] == [False, False, True]
+    assert 'Rolled back with b.sql' in dict((rel, error) for rel, error, _ in result.files)['a.sql']
+    assert conn.committed == ['UPDATE c SET x = 1']
+    assert conn.seen == dict(BULK_SESSION)
+    assert conn.session == {name: 1 for name, _ in BULK_SESSION}
@@ -0,0 +1,358 @@
+import re
+
+import pytest
+
+from FDS_sql import PACKET_HEADROOM, PreparedInserts, SQLSplitter, execute_statements, rewrite_inserts
+
+PROCEDURE = "DELIMITER $$\nCREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END$$\nDELIMITER ;\nSELECT 3;"
+PROCEDURE_STATEMENTS = ['CREATE PROCEDURE p() BEGIN SELECT 1; SELECT 2; END', 'SELECT 3']
+
+
+def split(text, chunk=None):
+    splitter = SQLSplitter()
+    if chunk is None:
+        return list(splitter.feed(text, final=True))
+    out = []
+    for start in range(0, len(text), chunk):
+        out.extend(splitter.feed(text[start:start + chunk]))
+    out.extend(splitter.feed('', final=True))
+    return out
+
+
+@pytest.mark.parametrize('header', ['', '-- header\n', '# header\n', '/* header */\n', '-- a\n/* b */ # c\n\n'])
+@pytest.mark.parametrize('chunk', [None, 1, 7])
+def test_delimiter_after_leading_comments(header, chunk):
+    assert split(header + PROCEDURE, chunk) == PROCEDURE_STATEMENTS
+
+
+def test_executable_comment_is_statement_text():
+    assert split("/*!40101 SET NAMES utf8 */;\nSELECT 1;") == ['/*!40101 SET NAMES utf8 */', 'SELECT 1']
+
+
+def test_delimiter_inside_statement_is_not_a_command():
+    assert split("SELECT 1\nDELIMITER $$;") == ['SELECT 1\nDELIMITER $$']
+
+
+def rewrite(*statements):
+    return [statement for _, statement in rewrite_inserts(enumerate(statements, 1))]
+
+
+def test_single_row_inserts_are_merged():
+    assert rewrite(
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name) VALUES ('b')",
+    ) == ["INSERT INTO shops (name) VALUES ('a'),\n('b')"]
+
+
+def test_run_before_last_insert_id_is_not_merged():
+    statements = [
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name) VALUES ('b')",
+        "INSERT INTO shop_items VALUES (LAST_INSERT_ID(), 'bread')",
+    ]
+    assert rewrite(*statements) == statements
+
+
+def test_run_before_session_variable_is_not_merged():
+    statements = [
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name) VALUES ('b')",
+        "SET @shop = LAST_INSERT_ID()",
+        "INSERT INTO shop_items VALUES (@shop, 'bread')",
+    ]
+    assert rewrite(*statements) == statements
+
+
+
+def test_run_is_not_merged_when_a_later_statement_reads_its_insert_id():
+    statements = [
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name) VALUES ('b')",
+        "UPDATE shops SET label = name",
+        "SET @shop = LAST_INSERT_ID()",
+        "INSERT INTO shop_items VALUES (@shop, 'bread')",
+    ]
+    assert rewrite(*statements) == statements
+
+
+def test_insert_id_read_after_the_next_insert_does_not_stop_merging():
+    assert rewrite(
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name) VALUES ('b')",
+        "UPDATE shops SET label = name",
+        "INSERT INTO shop_items (item) VALUES ('bread')",
+        "SELECT LAST_INSERT_ID()",
+    ) == [
+        "INSERT INTO shops (name) VALUES ('a'),\n('b')",
+        "UPDATE shops SET label = name",
+        "INSERT INTO shop_items (item) VALUES ('bread')",
+        "SELECT LAST_INSERT_ID()",
+    ]
+
+
+def test_run_is_sent_as_written_when_the_lookahead_outgrows_coalesce_bytes():
+    updates = [f"UPDATE shops SET label = 'label {n}'" for n in range(5)]
+    statements = ["INSERT INTO shops (name) VALUES ('a')", "INSERT INTO shops (name) VALUES ('b')"] + updates
+    out = list(rewrite_inserts(enumerate(statements, 1), coalesce_bytes=100))
+    assert out == list(enumerate(statements, 1))
+
+def test_rewritten_statements_keep_their_index():
+    out = list(rewrite_inserts(enumerate([
+        "INSERT INTO t VALUES (1)",
+        "INSERT INTO t VALUES (2)",
+        "SELECT LAST_INSERT_ID()",
+    ], 1)))
+    assert [index for index, _ in out] == [1, 2, 3]
+
+
+class RecordingCursor:
+    """Just enough of a mysql.connector cursor for execute_statements()."""
+
+    def __init__(self, sent):
+        self.sent = sent
+        self.with_rows = False
+        self.rowcount = 1
+
+    def execute(self, sql, params=None):
+        self.sent.append(sql)
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.sent = []
+
+    def cursor(self, prepared=False):
+        return RecordingCursor(self.sent)
+
+
+def test_prepared_rows_before_last_insert_id_are_sent_as_written():
+    conn = RecordingConnection()
+    statements = [
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name) VALUES ('b')",
+        "INSERT INTO shop_items VALUES (LAST_INSERT_ID(), 'bread')",
+    ]
+    execute_statements(conn.cursor(), enumerate(statements, 1), batch_statements=1,
+                       prepared=PreparedInserts(conn, rows_per_statement=100))
+    assert conn.sent[-2:] == ["INSERT INTO shops (name) VALUES ('b')", statements[2]]
+
+
+def test_inserts_into_other_columns_or_with_a_tail_are_not_merged():
+    statements = [
+        "INSERT INTO shops (name) VALUES ('a')",
+        "INSERT INTO shops (name, label) VALUES ('b', 'B')",
+        "INSERT INTO shops (name) VALUES ('c') ON DUPLICATE KEY UPDATE name = name",
+        "INSERT INTO shops (name) VALUES ('d')",
+    ]
+    assert rewrite(*statements) == statements
+
+
+def test_merged_inserts_stay_within_coalesce_bytes():
+    statements = [f"INSERT INTO items (name) VALUES ('item_{i:02}')" for i in range(10)]
+    out = [sql for _, sql in rewrite_inserts(enumerate(statements, 1), coalesce_bytes=80)]
+    assert len(out) > 1 and all(len(sql) <= 80 for sql in out)
+    assert [row for sql in out for row in re.findall(r"'(item_\d+)'", sql)] == [f'item_{i:02}' for i in range(10)]
+
+
+def test_insert_over_max_allowed_packet_is_split_into_rows_that_fit():
+    rows = [f"({i}, '{'x' * 200}')" for i in range(40)]
+    statement = 'INSERT INTO big (id, data) VALUES ' + ', '.join(rows)
+    max_packet = PACKET_HEADROOM + 2000
+    out = list(rewrite_inserts([(7, statement)], max_packet=max_packet))
+    assert len(out) > 1
+    assert all(index == 7 and len(sql.encode('utf-8')) <= 2000 for index, sql in out)
+    assert all(sql.startswith('INSERT INTO big (id, data) VALUES (') for _, sql in out)
+    assert [int(i) for _, sql in out for i in re.findall(r'\((\d+), ', sql)] == list(range(40))
+
+
+class PreparedCursor:
+    def __init__(self, executed):
+        self.executed = executed
+        self.rowcount = 0
+
+    def execute(self, sql, params):
+        self.executed.append((sql, list(params)))
+        self.rowcount = len(params) // 2
+
+    def close(self):
+        pass
+
+
+class PreparingConnection(RecordingConnection):
+    """A connection whose connector supports server-side prepared cursors."""
+
+    def __init__(self):
+        super().__init__()
+        self.executed = []
+
+    def cursor(self, prepared=False):
+        return PreparedCursor(self.executed) if prepared else RecordingCursor(self.sent)
+
+
+class TextOnlyConnection(RecordingConnection):
+    """A connection that cannot create prepared cursors."""
+
+    def cursor(self, prepared=False):
+        if prepared:
+            raise NotImplementedError('prepared cursors are not supported')
+        return super().cursor()
+
+
+SHOP_ROWS = [f"INSERT INTO shops (name, price) VALUES ('item_{i}', {i})" for i in range(5)]
+
+
+def test_prepared_inserts_bind_values_after_the_first_timed_chunk():
+    conn = PreparingConnection()
+    prepared = PreparedInserts(conn, rows_per_statement=2)
+    assert prepared.available
+    assert execute_statements(conn.cursor(), enumerate(SHOP_ROWS, 1), prepared=prepared) == len(SHOP_ROWS)
+    prepared.close()
+    # The first chunk is sent as text to time it, the second is prepared, the last row is left over.
+    assert conn.sent == ["INSERT INTO shops (name, price) VALUES ('item_0', 0),\n('item_1', 1)",
+                         "INSERT INTO shops (name, price) VALUES ('item_4', 4)"]
+    assert conn.executed == [('INSERT INTO shops (name, price) VALUES (?, ?), (?, ?)', ['item_2', 2, 'item_3', 3])]
+    assert (prepared.prepares, prepared.executions, prepared.rows) == (1, 1, 2)
+
+
+def test_prepared_inserts_fall_back_to_text_without_prepared_cursors():
+    conn = TextOnlyConnection()
+    prepared = PreparedInserts(conn, rows_per_statement=2)
+    assert not prepared.available
+    execute_statements(conn.cursor(), enumerate(SHOP_ROWS, 1), batch_statements=1, prepared=prepared)
+    assert conn.sent == SHOP_ROWS
+    assert prepared.executions == 0
+
+
+class LoadCursor(RecordingCursor):
+    """A server with local_infile on, where LOAD DATA reports loaded rows and warnings."""
+
+    def __init__(self, sent, loaded, warnings=()):
+        super().__init__(sent)
+        self.loaded = loaded
+        self.warnings = list(warnings)
+
+    def execute(self, sql, params=None):
+        super().execute(sql, params)
+        self.rowcount = self.loaded if sql.startswith('LOAD DATA') else 1
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        return self.warnings
+
+
+def bulk_load(cursor, statements, tmp_path):
+    from FDS_sql import BulkLoader
+    conn = RecordingConnection()
+    conn.cursor = lambda prepared=False: cursor
+    loader = BulkLoader(conn, min_rows=2, spool_dir=str(tmp_path))
+    for index, statement in enumerate(statements, 1):
+        loader.offer(index, statement)
+    loader.finish()
+    return loader.load(cursor)
+
+
+def test_bulk_load_of_every_row_passes(tmp_path):
+    cursor = LoadCursor([], loaded=3)
+    statements = [f"INSERT INTO t VALUES ({n})" for n in range(3)]
+    assert bulk_load(cursor, statements, tmp_path) == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('loaded, warnings', [(2, []), (3, [('Warning', 1265, "Data truncated for column 'a'")])])
+def test_bulk_load_that_skipped_rows_fails(tmp_path, loaded, warnings):
+    from FDS_sql import StatementError
+    cursor = LoadCursor([], loaded=loaded, warnings=warnings)
+    statements = [f"INSERT INTO t VALUES ({n})" for n in range(3)]
+    with pytest.raises(StatementError, match='row'):
+        bulk_load(cursor, statements, tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bulk_load_ignore_keeps_skipped_rows(tmp_path):
+    cursor = LoadCursor([], loaded=1, warnings=[('Warning', 1062, 'Duplicate entry')])
+    statements = [f"INSERT IGNORE INTO t VALUES ({n})" for n in range(3)]
+    assert bulk_load(cursor, statements, tmp_path) == 3
+    assert 'SHOW WARNINGS' not in cursor.sent
+
+
+class RefusedLoad(Exception):
+    errno = 1148  # The used command is not allowed with this MySQL version.
+
+
+class SpoolCursor(RecordingCursor):
+    """Reads the spool when LOAD DATA runs (it is removed right after); can refuse local infile."""
+
+    def __init__(self, sent, local_infile=1, refuse=False):
+        super().__init__(sent)
+        self.local_infile = local_infile
+        self.refuse = refuse
+        self.spooled = []
+
+    def execute(self, sql, params=None):
+        super().execute(sql, params)
+        if sql.startswith('LOAD DATA'):
+            if self.refuse:
+                raise RefusedLoad('LOAD DATA LOCAL INFILE is forbidden')
+            with open(sql.split("'")[1], encoding='utf-8', newline='\n') as f:
+                self.spooled.append(f.read())
+            self.rowcount = self.spooled[-1].count('\n')
+
+    def fetchone(self):
+        return (self.local_infile,)
+
+    def fetchall(self):
+        return []
+
+
+ITEM_ROWS = [f"INSERT INTO items (name, label) VALUES ('item_{n}', 'Item\\t{n}')" for n in range(4)]
+BULK_FILE = ["CREATE TABLE items (name VARCHAR(50), label VARCHAR(50))"] + ITEM_ROWS + [
+    "INSERT INTO items (name) VALUES ('other')",  # A lone row of another shape stays an INSERT.
+    "UPDATE items SET label = name",
+]
+
+
+def run_bulk(cursor, tmp_path, statements=BULK_FILE):
+    from FDS_sql import BulkLoader
+    conn = RecordingConnection()
+    conn.cursor = lambda prepared=False: cursor
+    loader = BulkLoader(conn, min_rows=3, spool_dir=str(tmp_path))
+    executed = execute_statements(cursor, enumerate(statements, 1), batch_statements=1, bulk=loader)
+    return loader, executed
+
+
+def test_long_insert_run_is_loaded_with_load_data_local(tmp_path):
+    cursor = SpoolCursor([])
+    loader, executed = run_bulk(cursor, tmp_path)
+    sent = [sql for sql in cursor.sent if sql not in ('SELECT @@local_infile', 'SHOW WARNINGS')]
+    assert sent[0] == BULK_FILE[0] and sent[2:] == BULK_FILE[-2:]
+    assert sent[1].startswith("LOAD DATA LOCAL INFILE ") and 'INTO TABLE items ' in sent[1]
+    assert sent[1].endswith(' (name, label)')
+    assert cursor.spooled == [''.join(f'item_{n}\tItem\\t{n}\n' for n in range(4))]
+    assert (executed, loader.loads, loader.rows, loader.fallbacks) == (len(BULK_FILE), 1, 4, 0)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_refused_local_infile_replays_the_rows_as_inserts(tmp_path):
+    cursor = SpoolCursor([], refuse=True)
+    loader, executed = run_bulk(cursor, tmp_path, BULK_FILE + BULK_FILE[1:5])
+    sent = [sql for sql in cursor.sent if sql != 'SELECT @@local_infile']
+    # The replay quotes the parsed values, so the escaped tab is sent as a literal one.
+    rows = ",\n".join(f"('item_{n}', 'Item\t{n}')" for n in range(4))
+    assert sent[:3] == [BULK_FILE[0], next(s for s in sent if s.startswith('LOAD DATA')),
+                        f"INSERT INTO items (name, label) VALUES {rows}"]
+    # Bulk loading is off for the connection from then on, so the next run is sent as written.
+    assert sent[3:] == BULK_FILE[-2:] + ITEM_ROWS
+    assert (executed, loader.available, loader.loads, loader.fallbacks) == (len(BULK_FILE) + 4, False, 0, 1)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_server_without_local_infile_never_spools(tmp_path):
+    cursor = SpoolCursor([], local_infile=0)
+    loader, _ = run_bulk(cursor, tmp_path)
+    assert not loader.available
+    assert [sql for sql in cursor.sent if sql != 'SELECT @@local_infile'] == BULK_FILE
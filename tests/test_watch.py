@@ -0,0 +1,60 @@
+import pytest
+
+import FDS_watch
+from FDS_engine import EngineOptions
+from FDS_scan import TreeWalker
+from FDS_watch import PollingWatcher, WatchSession, make_watcher
+
+DSN = 'mysql://root@localhost/fivem'
+
+
+def write(path, text='SELECT 1;\n'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_polling_watcher_reports_new_and_edited_files(tmp_path):
+    write(tmp_path / 'resources' / 'shop' / 'install.sql')
+    write(tmp_path / 'resources' / 'shop' / 'README.md')
+    watcher = PollingWatcher(TreeWalker(tmp_path, '*.sql'))
+    assert watcher.poll() == set()
+    write(tmp_path / 'resources' / 'shop' / 'install.sql', 'SELECT 2; -- edited\n')
+    write(tmp_path / 'resources' / 'jobs' / 'sql' / 'jobs.sql')
+    write(tmp_path / 'resources' / 'jobs' / 'notes.txt')
+    write(tmp_path / 'node_modules' / 'pkg' / 'seed.sql')
+    assert watcher.poll() == {str(tmp_path / 'resources' / 'shop' / 'install.sql'),
+                              str(tmp_path / 'resources' / 'jobs' / 'sql' / 'jobs.sql')}
+    assert watcher.poll() == set()
+
+
+def test_auto_mode_falls_back_to_polling(tmp_path, monkeypatch):
+    walker = TreeWalker(tmp_path, '*.sql')
+    monkeypatch.setattr(FDS_watch, 'inotify_available', lambda: False)
+    watcher, warning = make_watcher(walker)
+    assert isinstance(watcher, PollingWatcher) and warning is None
+
+    def no_watches(walker):
+        raise OSError(28, 'inotify watch limit reached')
+
+    monkeypatch.setattr(FDS_watch, 'inotify_available', lambda: True)
+    monkeypatch.setattr(FDS_watch, 'InotifyWatcher', no_watches)
+    watcher, warning = make_watcher(walker)
+    assert isinstance(watcher, PollingWatcher) and 'polling' in warning
+
+
+@pytest.fixture
+def session(tmp_path):
+    session = WatchSession(tmp_path, 'esx', DSN, EngineOptions(use_cache=False), mode='poll', debounce=0.05)
+    yield session
+    session.close()
+
+
+def test_changed_files_come_in_scan_order(tmp_path, session):
+    for rel in ('resources/b_shop/install.sql', 'resources/a_jobs/sql/z.sql', 'resources/a_jobs/install.sql',
+                'resources/a_jobs/a.sql', 'zz.sql'):
+        write(tmp_path / rel)
+    files = session.changes()
+    assert [p.relative_to(tmp_path).as_posix() for p in files] == [
+        'zz.sql', 'resources/a_jobs/a.sql', 'resources/a_jobs/install.sql', 'resources/a_jobs/sql/z.sql',
+        'resources/b_shop/install.sql',
+    ]